@@ -2,12 +2,13 @@ from django.contrib import admin
 from modeltranslation.admin import TranslationAdmin
 from .models import (
     CustomUser, Tag, Restaurant, RedeemedReceipt, 
-    WalletTransaction, RestaurantImage, Review, RestaurantMenuImage
+    WalletTransaction, RestaurantImage, Review, RestaurantMenuImage,
+    ReceiptVerificationJob, ReceiptPageArchive
 )
 
 @admin.register(CustomUser)
 class CustomUserAdmin(admin.ModelAdmin):
-    list_display = ('phone_number', 'card_number', 'wallet_balance', 'is_staff', 'is_active')
+    list_display = ('phone_number', 'card_number', 'wallet_balance', 'total_earned', 'total_transferred', 'is_staff', 'is_active')
     search_fields = ('phone_number',)
 
 @admin.register(Tag)
@@ -36,6 +37,19 @@ class RedeemedReceiptAdmin(admin.ModelAdmin):
     search_fields = ('receipt_id', 'user__phone_number', 'restaurant__name')
     list_filter = ('redeemed_at', 'restaurant')
 
+@admin.register(ReceiptVerificationJob)
+class ReceiptVerificationJobAdmin(admin.ModelAdmin):
+    list_display = ('job_id', 'user', 'status', 'error_code', 'attempts', 'created_at', 'finished_at')
+    search_fields = ('job_id', 'user__phone_number')
+    list_filter = ('status', 'created_at')
+
+@admin.register(ReceiptPageArchive)
+class ReceiptPageArchiveAdmin(admin.ModelAdmin):
+    list_display = ('qr_identity', 'status_code', 'page_size', 'elapsed_ms', 'attempts', 'fetched_at')
+    search_fields = ('qr_identity',)
+    list_filter = ('status_code', 'fetched_at')
+    exclude = ('compressed_page',)
+
 @admin.register(WalletTransaction)
 class WalletTransactionAdmin(admin.ModelAdmin):
     list_display = ('transaction_id', 'user', 'type', 'amount', 'status', 'created_at')
@@ -0,0 +1,95 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import translation
+from django.utils.http import parse_etags
+
+CATALOG_VERSION_KEY = 'catalog:version'
+
+# The query parameters the catalog views read. Others don't change the
+# response, so they're left out of the cache key.
+CATALOG_QUERY_PARAMS = (
+    'tags', 'tags_match', 'fields', 'view', 'limit', 'cursor', 'include_reviews', 'id', 'restaurant_id'
+)
+# Comma-separated query parameters whose order and repetitions don't matter
+SET_QUERY_PARAMS = ('tags', 'fields')
+
+
+def get_catalog_version():
+    """
+    Returns the current catalog version. Every cached catalog response is keyed
+    by it, so bumping the version invalidates all of them at once.
+    """
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        # Seed from the clock so a version lost to eviction or a restart
+        # never resurrects entries cached under an older number.
+        cache.add(CATALOG_VERSION_KEY, int(time.time() * 1000), timeout=None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    try:
+        return cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        return get_catalog_version()
+
+
+def normalize_catalog_query(query_params):
+    """
+    Builds a canonical representation of the catalog query string, so that
+    `?tags=b,a` and `?tags=a,b,a` share a cache entry, as do requests that
+    only differ in parameters outside CATALOG_QUERY_PARAMS.
+    """
+    parts = []
+    for name in sorted(query_params.keys() & set(CATALOG_QUERY_PARAMS)):
+        values = query_params.getlist(name)
+        if name in SET_QUERY_PARAMS:
+            items = {item.strip() for value in values for item in value.split(',')}
+            values = [','.join(sorted(item for item in items if item))]
+        parts.append(f"{name}={'&'.join(sorted(values))}")
+    return '&'.join(parts)
+
+
+def catalog_cache_key(name, request):
+    fingerprint = '|'.join([
+        request.get_host(),
+        request.path,
+        normalize_catalog_query(request.query_params),
+    ])
+    digest = hashlib.md5(fingerprint.encode('utf-8')).hexdigest()
+    return f"catalog:{get_catalog_version()}:{name}:{translation.get_language()}:{digest}"
+
+
+def catalog_etag(cache_key, personalization=''):
+    """
+    Strong ETag for a catalog response. It changes whenever the catalog
+    version, language or query changes, or when the per-user data overlaid on
+    the cached payload does.
+    """
+    digest = hashlib.md5(f"{cache_key}|{personalization}".encode('utf-8')).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(request, etag):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if not if_none_match:
+        return False
+    etags = parse_etags(if_none_match)
+    # If-None-Match uses the weak comparison function
+    return '*' in etags or any(candidate.removeprefix('W/') == etag for candidate in etags)
+
+
+def get_cached_catalog(key, build):
+    """
+    Returns the payload cached under `key`, calling `build` to produce and
+    store it on a miss.
+    """
+    payload = cache.get(key)
+    if payload is None:
+        payload = build()
+        cache.set(key, payload, settings.CATALOG_CACHE_TIMEOUT)
+    return payload
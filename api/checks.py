@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+# Backends whose entries live in a single process
+PER_PROCESS_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """
+    The Soliq circuit breaker, the single-flight locks and the catalog
+    version counter only work across workers with a shared cache.
+    """
+    if settings.DEBUG or settings.CACHES['default']['BACKEND'] not in PER_PROCESS_CACHE_BACKENDS:
+        return []
+    return [Error(
+        "The default cache isn't shared between worker processes.",
+        hint="Set CACHE_BACKEND to the database, redis or memcached cache backend.",
+        id='api.E001',
+    )]
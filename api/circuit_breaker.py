@@ -0,0 +1,117 @@
+"""
+A circuit breaker whose state lives in the Django cache, so every gunicorn
+worker sharing the cache backend trips and recovers together.
+
+closed     calls go through; outcomes are counted per fixed window and the
+           circuit opens once enough calls failed or were slow
+open       calls are rejected without touching the dependency until
+           `open_seconds` have passed
+half_open  a single probe call is let through; success closes the circuit,
+           failure opens it again
+"""
+import time
+
+from django.core.cache import cache
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, name, retry_after):
+        self.name = name
+        self.retry_after = retry_after
+        super().__init__(f"Circuit '{name}' is open, retry in {retry_after}s")
+
+
+class CircuitBreaker:
+    def __init__(self, name, failure_rate, slow_call_seconds, slow_call_rate, min_calls, window_seconds, open_seconds):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate = slow_call_rate
+        self.min_calls = min_calls
+        self.window_seconds = window_seconds
+        self.open_seconds = open_seconds
+
+    def key(self, *parts):
+        return ':'.join(('breaker', self.name) + tuple(str(part) for part in parts))
+
+    def get_state(self):
+        return cache.get(self.key('state')) or {'state': 'closed', 'generation': 0, 'opened_at': None}
+
+    def set_state(self, state, generation, now=None):
+        cache.set(
+            self.key('state'),
+            {'state': state, 'generation': generation, 'opened_at': now if state == 'open' else None},
+            timeout=None
+        )
+
+    def counter_keys(self, generation, now):
+        # Counters are per state generation, so a closed circuit starts from zero
+        window = int(now // self.window_seconds)
+        return {name: self.key(generation, window, name) for name in ('calls', 'failures', 'slow')}
+
+    def before_call(self):
+        """
+        Returns the state generation the call runs under, or raises
+        CircuitOpenError when the call must not be made.
+        """
+        state = self.get_state()
+        if state['state'] == 'closed':
+            return state['generation']
+
+        now = time.time()
+        if state['state'] == 'open' and now - state['opened_at'] < self.open_seconds:
+            raise CircuitOpenError(self.name, max(1, int(state['opened_at'] + self.open_seconds - now)))
+
+        # Open long enough: exactly one caller gets to probe
+        if cache.add(self.key('probe', state['generation']), True, timeout=self.open_seconds):
+            self.set_state('half_open', state['generation'])
+            return state['generation']
+        raise CircuitOpenError(self.name, 1)
+
+    def record(self, generation, success, elapsed):
+        state = self.get_state()
+        if state['generation'] != generation:
+            # The circuit changed state while this call was running
+            return
+        now = time.time()
+        if state['state'] == 'half_open':
+            if success and elapsed < self.slow_call_seconds:
+                self.set_state('closed', generation + 1)
+            else:
+                self.set_state('open', generation + 1, now)
+            return
+
+        keys = self.counter_keys(generation, now)
+        counts = {}
+        for name, increment in (('calls', True), ('failures', not success), ('slow', elapsed >= self.slow_call_seconds)):
+            if increment:
+                cache.add(keys[name], 0, timeout=self.window_seconds * 2)
+                counts[name] = cache.incr(keys[name])
+            else:
+                counts[name] = cache.get(keys[name], 0)
+
+        calls = counts['calls']
+        if calls >= self.min_calls and (
+            counts['failures'] / calls >= self.failure_rate or counts['slow'] / calls >= self.slow_call_rate
+        ):
+            self.set_state('open', generation + 1, now)
+
+    def snapshot(self):
+        """The current state and window counts, for monitoring."""
+        state = self.get_state()
+        now = time.time()
+        keys = self.counter_keys(state['generation'], now)
+        counts = cache.get_many(keys.values())
+        data = {
+            'name': self.name,
+            'state': state['state'],
+            **{name: counts.get(key, 0) for name, key in keys.items()},
+            'retry_after': None,
+        }
+        if state['state'] == 'open':
+            data['retry_after'] = max(0, int(state['opened_at'] + self.open_seconds - now))
+        return data
+
+    def reset(self):
+        state = self.get_state()
+        self.set_state('closed', state['generation'] + 1)
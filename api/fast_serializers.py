@@ -0,0 +1,193 @@
+"""
+Read-only serializers for the hot list endpoints.
+
+They render `values()` rows through field mappers compiled once per field
+list, instead of instantiating model objects and DRF serializers per row.
+Each one reproduces the JSON of the DRF serializer named in
+`serializer_class` byte for byte: the scalar conversions reuse that
+serializer's own field instances, so Decimal quantization and datetime
+formatting stay identical.
+"""
+import functools
+
+from django.db import models
+from modeltranslation.utils import build_localized_fieldname, get_language
+from rest_framework import serializers
+
+from .models import (
+    Restaurant, RestaurantQuerySet, RestaurantImage, RestaurantMenuImage, Review, Tag, WalletTransaction
+)
+from .serializers import (
+    TagSerializer, RestaurantSerializer, RestaurantImageSerializer,
+    RestaurantMenuImageSerializer, ReviewSerializer, WalletTransactionSerializer
+)
+
+
+@functools.lru_cache(maxsize=None)
+def _converter(serializer_class, field_name):
+    """The conversion DRF applies to a non-null value of this field."""
+    field = serializer_class().fields[field_name]
+    if isinstance(field, serializers.CharField):
+        # CharField.to_representation is str(value)
+        return str
+    return field.to_representation
+
+
+class FastSerializer:
+    """
+    Base class. Subclasses set `model` and `serializer_class`; the rendered
+    fields default to `serializer_class.Meta.fields`.
+    """
+    model = None
+    serializer_class = None
+
+    def __init__(self, fields=None, context=None):
+        self.context = context or {}
+        # Rendered in the serializer's declared order, like DRF does
+        self.field_names = tuple(
+            name for name in self.serializer_class.Meta.fields
+            if fields is None or name in fields
+        )
+        self.mappers = [(name, self.compile_field(name)) for name in self.field_names]
+
+    def get_columns(self):
+        return list(self.field_names)
+
+    def prepare(self, queryset):
+        """Turns a model queryset into the values() queryset this serializer renders."""
+        return queryset.prefetch_related(None).values(*self.get_columns())
+
+    def compile_field(self, name):
+        model_field = self.model._meta.get_field(name)
+        if isinstance(model_field, models.ImageField):
+            return self.compile_image(name, model_field.storage)
+        return self.compile_column(name, _converter(self.serializer_class, name))
+
+    def compile_column(self, column, convert):
+        def mapper(row):
+            value = row[column]
+            return None if value is None else convert(value)
+        return mapper
+
+    def compile_image(self, column, storage):
+        request = self.context.get('request')
+
+        def mapper(row):
+            name = row[column]
+            if not name:
+                return None
+            url = storage.url(name)
+            return request.build_absolute_uri(url) if request is not None else url
+        return mapper
+
+    def to_representation(self, rows):
+        mappers = self.mappers
+        return [{name: mapper(row) for name, mapper in mappers} for row in rows]
+
+
+class TagFastSerializer(FastSerializer):
+    model = Tag
+    serializer_class = TagSerializer
+
+
+class RestaurantImageFastSerializer(FastSerializer):
+    model = RestaurantImage
+    serializer_class = RestaurantImageSerializer
+
+
+class RestaurantMenuImageFastSerializer(FastSerializer):
+    model = RestaurantMenuImage
+    serializer_class = RestaurantMenuImageSerializer
+
+
+class ReviewFastSerializer(FastSerializer):
+    model = Review
+    serializer_class = ReviewSerializer
+
+
+class WalletTransactionFastSerializer(FastSerializer):
+    model = WalletTransaction
+    serializer_class = WalletTransactionSerializer
+
+    def get_columns(self):
+        # `created_at` and the ID are the keyset pagination position
+        return list(dict.fromkeys(('id', 'created_at') + self.field_names))
+
+
+class RestaurantFastSerializer(FastSerializer):
+    """
+    Renders `RestaurantSerializer` output. Related objects are loaded with one
+    values() query per requested relation, grouped by restaurant.
+    """
+    model = Restaurant
+    serializer_class = RestaurantSerializer
+
+    # relation -> (nested serializer, values() queryset for restaurant IDs, key holding the restaurant ID)
+    relations = {
+        'tags': (TagFastSerializer, lambda ids: Tag.objects.filter(restaurants__in=ids), 'restaurants'),
+        'media': (RestaurantImageFastSerializer, lambda ids: RestaurantImage.objects.filter(restaurant_id__in=ids), 'restaurant_id'),
+        'reviews': (ReviewFastSerializer, lambda ids: Review.objects.filter(restaurant_id__in=ids), 'restaurant_id'),
+        'menu_images': (RestaurantMenuImageFastSerializer, lambda ids: RestaurantMenuImage.objects.filter(restaurant_id__in=ids), 'restaurant_id'),
+    }
+
+    def __init__(self, fields=None, context=None):
+        self.related = {}
+        super().__init__(fields, context)
+
+    def get_columns(self):
+        computed = RestaurantQuerySet.CATALOG_COMPUTED_COLUMNS
+        # The ID keys related rows; the localized name column feeds the
+        # cursor pagination position.
+        columns = {'id', build_localized_fieldname('name', get_language())}
+        for name in self.field_names:
+            if name in computed:
+                columns.update(computed[name])
+            elif name not in self.relations:
+                columns.add(name)
+        return sorted(columns)
+
+    def compile_field(self, name):
+        if name in self.relations:
+            related = self.related
+
+            def mapper(row):
+                return related[name].get(row['id'], [])
+            return mapper
+        if name == 'is_liked':
+            return self.compile_is_liked()
+        if name == 'average_rating':
+            # Same value as Restaurant.average_rating, rendered by FloatField
+            def mapper(row):
+                count = row['rating_count']
+                return float(round(row['rating_sum'] / count, 1) if count else 0.0)
+            return mapper
+        if name == 'total_reviews':
+            return lambda row: int(row['rating_count'])
+        return super().compile_field(name)
+
+    def compile_is_liked(self):
+        liked_ids = self.context.get('liked_restaurant_ids')
+        if liked_ids is None:
+            request = self.context.get('request')
+            user = getattr(request, 'user', None)
+            liked_ids = (
+                set(user.liked_restaurants.values_list('id', flat=True))
+                if user is not None and user.is_authenticated else set()
+            )
+        return lambda row: row['id'] in liked_ids
+
+    def load_related(self, restaurant_ids):
+        for name, (serializer_class, build_queryset, key) in self.relations.items():
+            if name not in self.field_names:
+                continue
+            nested = serializer_class(context=self.context)
+            rows = list(build_queryset(restaurant_ids).values(key, *nested.get_columns())) if restaurant_ids else []
+            grouped = {}
+            for row, item in zip(rows, nested.to_representation(rows)):
+                grouped.setdefault(row[key], []).append(item)
+            self.related[name] = grouped
+
+    def to_representation(self, rows):
+        rows = list(rows)
+        self.load_related([row['id'] for row in rows])
+        return super().to_representation(rows)
@@ -0,0 +1,107 @@
+import time
+from decimal import Decimal
+
+import cloudinary
+import cloudinary_storage.storage  # noqa: F401 - configures cloudinary on import
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.fast_serializers import RestaurantFastSerializer, TagFastSerializer, WalletTransactionFastSerializer
+from api.models import Restaurant, RestaurantImage, Review, Tag, WalletTransaction
+from api.serializers import RestaurantSerializer, TagSerializer, WalletTransactionSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares the DRF serializers with the values()-based fast serializers on "
+        "a synthetic fixture and checks that both render identical JSON. The "
+        "fixture is created inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        # Image URLs are built locally; a placeholder cloud name is enough
+        if not cloudinary.config().cloud_name:
+            cloudinary.config(cloud_name='benchmark')
+
+        request = Request(APIRequestFactory().get('/'))
+        renderer = JSONRenderer()
+
+        with transaction.atomic():
+            user = self.create_fixture(options['rows'])
+            context = {'request': request, 'liked_restaurant_ids': frozenset()}
+            cases = [
+                ('restaurants', RestaurantSerializer, RestaurantFastSerializer,
+                 lambda: Restaurant.objects.for_catalog().order_by('name')),
+                ('tags', TagSerializer, TagFastSerializer, lambda: Tag.objects.all()),
+                ('wallet transactions', WalletTransactionSerializer, WalletTransactionFastSerializer,
+                 lambda: WalletTransaction.objects.filter(user=user).order_by('-created_at')),
+            ]
+
+            self.stdout.write(f"{'endpoint':<20} {'rows':>6} {'DRF (ms)':>10} {'fast (ms)':>10} {'speedup':>8}")
+            for name, serializer_class, fast_class, build_queryset in cases:
+                drf_ms, drf_json = self.measure(options['repeat'], lambda: renderer.render(
+                    serializer_class(build_queryset(), many=True, context=context).data
+                ))
+                fast_serializer = fast_class(context=context)
+                fast_ms, fast_json = self.measure(options['repeat'], lambda: renderer.render(
+                    fast_serializer.to_representation(fast_serializer.prepare(build_queryset()))
+                ))
+                if drf_json != fast_json:
+                    raise CommandError(f"{name}: fast serializer output differs from DRF")
+                rows = len(fast_serializer.to_representation(fast_serializer.prepare(build_queryset())))
+                self.stdout.write(f"{name:<20} {rows:>6} {drf_ms:>10.1f} {fast_ms:>10.1f} {drf_ms / fast_ms:>7.1f}x")
+
+            transaction.set_rollback(True)
+
+    def create_fixture(self, rows):
+        user = get_user_model().objects.create_user(phone_number="+998000000000", password=None)
+        tags = Tag.objects.bulk_create([
+            Tag(id=f"bench_tag_{i}", name_ru=f"Тег {i}", name_en=f"Tag {i}") for i in range(rows)
+        ])
+        restaurants = Restaurant.objects.bulk_create([
+            Restaurant(
+                id=f"bench_rest_{i}", tin=f"bench{i:09d}", name_ru=f"Ресторан {i:05d}",
+                description_ru="Описание " * 10, cashback_percentage=Decimal(i % 20) / 2,
+                logo=f"restaurant_logos/{i}.png", location_description_ru="Рядом с парком",
+            )
+            for i in range(rows)
+        ])
+        Restaurant.tags.through.objects.bulk_create([
+            Restaurant.tags.through(restaurant_id=restaurant.pk, tag_id=tags[(index + offset) % rows].pk)
+            for index, restaurant in enumerate(restaurants)
+            for offset in range(3)
+        ])
+        RestaurantImage.objects.bulk_create([
+            RestaurantImage(restaurant=restaurant, image=f"restaurant_media/{restaurant.pk}.jpg")
+            for restaurant in restaurants
+        ])
+        Review.objects.bulk_create([
+            Review(user=user, restaurant=restaurant, rating=(index % 5) + 1)
+            for index, restaurant in enumerate(restaurants)
+        ])
+        WalletTransaction.objects.bulk_create([
+            WalletTransaction(
+                transaction_id=f"bench_txn_{i}", user=user, type='cashback_add',
+                amount=Decimal(i) + Decimal('0.5'), balance_before=Decimal(i),
+                balance_after=Decimal(i) * 2, receipt_id=f"soliq_{i}",
+            )
+            for i in range(rows)
+        ])
+        return user
+
+    def measure(self, repeat, render):
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            output = render()
+            elapsed = (time.perf_counter() - started) * 1000
+            best = elapsed if best is None else min(best, elapsed)
+        return best, output
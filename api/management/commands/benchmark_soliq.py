@@ -0,0 +1,102 @@
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+
+from api.receipt_parser import extract_receipt_fields
+from api.services import SoliqVerificationError, scrape_soliq_receipt
+from api.soliq_standin import SoliqStandIn, load_corpus
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures the Soliq receipt scraper offline: parse time per recorded "
+        "page in api/testdata/soliq/, then end-to-end verification latency and "
+        "throughput against a local stand-in server with configurable latency "
+        "and failures. Fails if any page no longer parses to its expected result."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=200, help="Parses per corpus page.")
+        parser.add_argument('--requests', type=int, default=200, help="Verifications per end-to-end run.")
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--latency', type=float, default=0.05, help="Mean stand-in response delay in seconds.")
+        parser.add_argument('--error-rate', type=float, default=0.0, help="Share of 502 responses.")
+        parser.add_argument('--reset-rate', type=float, default=0.0, help="Share of dropped connections.")
+        parser.add_argument('--page', default='uz_labelled_stir.html', help="Corpus page used end to end.")
+
+    def handle(self, *args, **options):
+        corpus = load_corpus()
+        if options['page'] not in corpus:
+            raise CommandError(f"Unknown corpus page {options['page']!r}")
+
+        self.stdout.write(f"{'page':<28} {'bytes':>7} {'p50 (ms)':>9} {'p95 (ms)':>9}")
+        for name, (html, _) in corpus.items():
+            samples = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                extract_receipt_fields(html)
+                samples.append((time.perf_counter() - started) * 1000)
+            self.stdout.write(
+                f"{name:<28} {len(html.encode('utf-8')):>7} "
+                f"{percentile(samples, 50):>9.3f} {percentile(samples, 95):>9.3f}"
+            )
+
+        standin = SoliqStandIn(
+            latency=options['latency'], error_rate=options['error_rate'], reset_rate=options['reset_rate']
+        )
+        # Injected failures would otherwise trip the circuit breaker and turn
+        # the run into a measurement of failing fast
+        with standin, override_settings(SOLIQ_POOL_SIZE=max(10, options['concurrency']), SOLIQ_BREAKER_ENABLED=False):
+            self.check_corpus(standin, corpus)
+            self.stdout.write("")
+            self.stdout.write(f"{'concurrency':<12} {'requests':>8} {'failed':>7} {'p50 (ms)':>9} {'p95 (ms)':>9} {'req/s':>8}")
+            for concurrency in sorted({1, options['concurrency']}):
+                self.run_load(standin, options['page'], options['requests'], concurrency)
+
+    def check_corpus(self, standin, corpus):
+        """Verifies every corpus page through the stand-in and compares with expected.json."""
+        with override_settings(SOLIQ_MAX_RETRIES=10):
+            for name, (_, expected) in corpus.items():
+                try:
+                    data = scrape_soliq_receipt(standin.receipt_url(name))
+                    outcome = {'tin': data['tin'], 'total_amount': data['total_amount']}
+                except SoliqVerificationError as e:
+                    outcome = {'error': e.message}
+                if 'error' in expected:
+                    matches = expected['error'] in outcome.get('error', '')
+                else:
+                    matches = outcome == expected
+                if not matches:
+                    raise CommandError(f"{name}: expected {expected}, got {outcome}")
+
+    def run_load(self, standin, page, total, concurrency):
+        def verify(number):
+            started = time.perf_counter()
+            try:
+                scrape_soliq_receipt(standin.receipt_url(page, receipt_number=str(number)))
+                ok = True
+            except SoliqVerificationError:
+                ok = False
+            return ok, (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(verify, range(total)))
+        elapsed = time.perf_counter() - started
+
+        latencies = [ms for _, ms in results]
+        failed = sum(1 for ok, _ in results if not ok)
+        self.stdout.write(
+            f"{concurrency:<12} {total:>8} {failed:>7} {percentile(latencies, 50):>9.1f} "
+            f"{percentile(latencies, 95):>9.1f} {total / elapsed:>8.1f}"
+        )
+        if failed:
+            self.stdout.write(self.style.WARNING(f"  mean latency {statistics.mean(latencies):.1f} ms with {failed} failures"))
@@ -0,0 +1,70 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.models import Restaurant, Tag
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares the per-tag JOIN filter with the single grouped tag query on a "
+        "synthetic catalog. The fixture is created inside a transaction that is "
+        "rolled back, so the database is left untouched."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--restaurants', type=int, default=2000)
+        parser.add_argument('--tags', type=int, default=12)
+        parser.add_argument('--max-selected', type=int, default=6)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            tag_ids = self.create_fixture(options['restaurants'], options['tags'])
+
+            self.stdout.write(f"{'tags':>4} {'matches':>8} {'chained joins (ms)':>19} {'grouped (ms)':>13}")
+            for selected in range(1, min(options['max_selected'], len(tag_ids)) + 1):
+                wanted = tag_ids[:selected]
+                chained_ms, chained_ids = self.measure(lambda: self.chained_joins(wanted), options['repeat'])
+                grouped_ms, grouped_ids = self.measure(
+                    lambda: Restaurant.objects.with_tags(wanted).order_by('name'), options['repeat']
+                )
+                if chained_ids != grouped_ids:
+                    self.stderr.write(self.style.ERROR(f"Result mismatch for {selected} tag(s)"))
+                self.stdout.write(f"{selected:>4} {len(grouped_ids):>8} {chained_ms:>19.2f} {grouped_ms:>13.2f}")
+
+            transaction.set_rollback(True)
+
+    def create_fixture(self, restaurant_count, tag_count):
+        tags = Tag.objects.bulk_create([
+            Tag(id=f"bench_tag_{i}", name=f"Tag {i}") for i in range(tag_count)
+        ])
+        restaurants = Restaurant.objects.bulk_create([
+            Restaurant(id=f"bench_rest_{i}", tin=f"bench{i:09d}", name=f"Bench {i:05d}")
+            for i in range(restaurant_count)
+        ])
+        # Tag i is on every restaurant whose index is divisible by i + 1, so
+        # selecting more tags keeps narrowing the result
+        Restaurant.tags.through.objects.bulk_create([
+            Restaurant.tags.through(restaurant_id=restaurant.pk, tag_id=tag.pk)
+            for index, restaurant in enumerate(restaurants)
+            for step, tag in enumerate(tags, start=1)
+            if index % step == 0
+        ])
+        return [tag.pk for tag in tags]
+
+    def chained_joins(self, tag_ids):
+        queryset = Restaurant.objects.all()
+        for tag_id in tag_ids:
+            queryset = queryset.filter(tags__id=tag_id)
+        return queryset.distinct().order_by('name')
+
+    def measure(self, build_queryset, repeat):
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            ids = list(build_queryset().values_list('pk', flat=True))
+            elapsed = (time.perf_counter() - started) * 1000
+            best = elapsed if best is None else min(best, elapsed)
+        return best, ids
@@ -0,0 +1,63 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from api.models import WalletTransaction
+from api.services import confirm_pending_cashback
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        "Confirms the pending cashback credited by the receipt verification "
+        "fast path against the Soliq receipt page. Matching receipts are "
+        "credited, mismatched or fraudulent ones are marked failed and stay "
+        "redeemed. Receipts Soliq can't be reached for stay pending until "
+        "--max-attempts passes have tried them, then fail and are released."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Exit after one pass over the pending cashback.")
+        parser.add_argument('--batch', type=int, default=50, help="Transactions loaded per query.")
+        parser.add_argument('--poll-interval', type=float, default=30.0, help="Seconds to wait between passes.")
+        parser.add_argument('--max-attempts', type=int, default=5)
+
+    def handle(self, *args, **options):
+        counts = {'completed': 0, 'failed': 0, 'pending': 0}
+        while True:
+            close_old_connections()
+            for txn in self.pending_transactions(options['batch']):
+                counts[self.confirm(txn, options['max_attempts'])] += 1
+            if options['once']:
+                break
+            time.sleep(options['poll_interval'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Confirmed {counts['completed']}, reversed {counts['failed']}, "
+            f"left {counts['pending']} pending cashback transaction(s)."
+        ))
+
+    def pending_transactions(self, batch):
+        # Keyed on the primary key, so transactions settled during the pass
+        # don't shift the pages
+        last_pk = 0
+        while True:
+            txns = list(
+                WalletTransaction.objects
+                .filter(type='cashback_add', status='pending', metadata__has_key='qr_code', pk__gt=last_pk)
+                .order_by('pk')[:batch]
+            )
+            if not txns:
+                return
+            yield from txns
+            last_pk = txns[-1].pk
+
+    def confirm(self, txn, max_attempts):
+        try:
+            return confirm_pending_cashback(txn, max_attempts)
+        except Exception:
+            logger.exception("Confirming cashback %s failed", txn.transaction_id)
+            return 'pending'
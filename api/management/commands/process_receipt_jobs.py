@@ -0,0 +1,75 @@
+import logging
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from api.models import ReceiptVerificationJob
+from api.services import run_receipt_job
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs queued async receipt verifications. Jobs are claimed with "
+        "SELECT ... FOR UPDATE SKIP LOCKED, so several worker processes can "
+        "share the queue. Jobs left in processing by a crashed worker are "
+        "picked up again after --stale-after seconds."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Exit once the queue is empty.")
+        parser.add_argument('--batch', type=int, default=10, help="Jobs claimed per round.")
+        parser.add_argument('--poll-interval', type=float, default=1.0, help="Seconds to wait when the queue is empty.")
+        parser.add_argument('--stale-after', type=int, default=300)
+        parser.add_argument('--max-attempts', type=int, default=3)
+
+    def handle(self, *args, **options):
+        processed = 0
+        while True:
+            close_old_connections()
+            jobs = self.claim_jobs(options['batch'], options['stale_after'], options['max_attempts'])
+            if not jobs:
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+                continue
+            for job in jobs:
+                self.run(job)
+                processed += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} receipt job(s)."))
+
+    def claim_jobs(self, batch, stale_after, max_attempts):
+        now = timezone.now()
+        stale = Q(status='processing', started_at__lt=now - timedelta(seconds=stale_after))
+        with transaction.atomic():
+            # A job whose worker died on every try is given up instead of retried forever
+            ReceiptVerificationJob.objects.filter(stale, attempts__gte=max_attempts).update(
+                status='failed', error_code="VERIFICATION_TIMEOUT",
+                message="The receipt could not be verified in time.", http_status=504, finished_at=now
+            )
+            job_ids = list(
+                ReceiptVerificationJob.objects.select_for_update(skip_locked=True)
+                .filter(Q(status='pending') | stale)
+                .order_by('created_at')
+                .values_list('pk', flat=True)[:batch]
+            )
+            ReceiptVerificationJob.objects.filter(pk__in=job_ids).update(
+                status='processing', started_at=now, attempts=F('attempts') + 1
+            )
+        return list(ReceiptVerificationJob.objects.select_related('user').filter(pk__in=job_ids).order_by('created_at'))
+
+    def run(self, job):
+        try:
+            run_receipt_job(job)
+        except Exception:
+            logger.exception("Receipt job %s failed", job.job_id)
+            ReceiptVerificationJob.objects.filter(pk=job.pk).update(
+                status='failed', error_code="INTERNAL_ERROR",
+                message="The receipt could not be verified.", http_status=500, finished_at=timezone.now()
+            )
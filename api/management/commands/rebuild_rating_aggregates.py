@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from api.models import Restaurant
+
+
+class Command(BaseCommand):
+    help = "Recomputes the stored rating sum, count and histogram of restaurants from their reviews."
+
+    def add_arguments(self, parser):
+        parser.add_argument('restaurant_ids', nargs='*', help="Only rebuild these restaurants (default: all).")
+
+    def handle(self, *args, **options):
+        queryset = Restaurant.objects.order_by('pk')
+        if options['restaurant_ids']:
+            queryset = queryset.filter(pk__in=options['restaurant_ids'])
+
+        rebuilt = 0
+        for restaurant_id in queryset.values_list('pk', flat=True).iterator():
+            Restaurant.update_rating_aggregates(restaurant_id)
+            rebuilt += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt rating aggregates for {rebuilt} restaurant(s)."))
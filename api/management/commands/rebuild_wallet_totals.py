@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes the stored total earned and total transferred of users from "
+        "their completed wallet transactions and reports the users whose stored "
+        "totals had drifted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('user_ids', nargs='*', help="Only rebuild these users (default: all).")
+        parser.add_argument('--check', action='store_true', help="Only report drifted totals, don't fix them.")
+
+    def handle(self, *args, **options):
+        queryset = CustomUser.objects.order_by('pk')
+        if options['user_ids']:
+            queryset = queryset.filter(pk__in=options['user_ids'])
+
+        checked = drifted = 0
+        for user_id in queryset.values_list('pk', flat=True).iterator():
+            checked += 1
+            with transaction.atomic():
+                # Locked like a wallet update, so no transaction lands in between
+                stored = CustomUser.objects.select_for_update().values('total_earned', 'total_transferred').get(pk=user_id)
+                totals = CustomUser.compute_wallet_totals(user_id)
+                if stored == totals:
+                    continue
+                drifted += 1
+                self.stdout.write(
+                    f"User {user_id}: stored earned {stored['total_earned']} / transferred {stored['total_transferred']}, "
+                    f"ledger earned {totals['total_earned']} / transferred {totals['total_transferred']}"
+                )
+                if not options['check']:
+                    CustomUser.objects.filter(pk=user_id).update(**totals)
+
+        action = "Found" if options['check'] else "Fixed"
+        self.stdout.write(self.style.SUCCESS(f"Checked {checked} user(s). {action} {drifted} with drifted wallet totals."))
@@ -0,0 +1,73 @@
+import datetime
+import itertools
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from api.models import ReceiptPageArchive
+from api.receipt_parser import reparse_archived_page
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-runs the receipt parser over archived Soliq pages in parallel worker "
+        "processes and reports every page whose reading differs from the stored "
+        "outcome. No requests are made to Soliq."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--since', help="Only pages fetched at or after this ISO date or datetime.")
+        parser.add_argument('--batch', type=int, default=500, help="Pages read and handed to the pool at a time.")
+        parser.add_argument('--update', action='store_true', help="Store the new readings as the pages' outcome.")
+
+    def handle(self, *args, **options):
+        for name in ('workers', 'batch'):
+            if options[name] < 1:
+                raise CommandError(f"--{name} must be at least 1, not {options[name]}.")
+        queryset = ReceiptPageArchive.objects.filter(status_code=200).order_by('pk')
+        if options['since']:
+            queryset = queryset.filter(fetched_at__gte=self.parse_since(options['since']))
+        rows = (
+            (pk, bytes(compressed_page), outcome)
+            for pk, compressed_page, outcome in queryset.values_list('pk', 'compressed_page', 'outcome').iterator(chunk_size=options['batch'])
+        )
+
+        started = time.perf_counter()
+        total = changed = 0
+        # Spawned workers only import the stdlib parser, and don't inherit the
+        # parent's database connection the way forked ones would
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=options['workers'], mp_context=context) as executor:
+            chunksize = max(1, options['batch'] // options['workers'])
+            while batch := list(itertools.islice(rows, options['batch'])):
+                for pk, old, new in executor.map(reparse_archived_page, batch, chunksize=chunksize):
+                    total += 1
+                    if old == new:
+                        continue
+                    changed += 1
+                    self.stdout.write(f"page {pk}: {old} -> {new}")
+                    if options['update']:
+                        ReceiptPageArchive.objects.filter(pk=pk).update(outcome=new)
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Re-parsed {total} archived page(s) in {elapsed:.1f}s with {options['workers']} worker(s); "
+            f"{changed} reading(s) changed{' and were updated' if options['update'] and changed else ''}."
+        ))
+
+    def parse_since(self, value):
+        try:
+            # parse_datetime() would also take a plain date, as midnight
+            day = parse_date(value)
+            since = datetime.datetime.combine(day, datetime.time.min) if day else parse_datetime(value)
+        except ValueError:
+            since = None
+        if since is None:
+            raise CommandError(f"--since must be an ISO 8601 date or datetime, not {value!r}.")
+        return timezone.make_aware(since) if timezone.is_naive(since) else since
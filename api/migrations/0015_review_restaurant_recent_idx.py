@@ -0,0 +1,17 @@
+# Generated by Django 4.2.27 on 2026-10-17 19:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_catalog_change_tracking'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['restaurant', '-created_at', '-id'], name='review_restaurant_recent_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.27 on 2026-10-17 19:38
+
+from django.db import migrations, models
+
+
+def backfill_qr_identity(apps, schema_editor):
+    # receipt_id is "soliq_<tin>_<r>_<c>"; the oldest redemption of an r/c
+    # pair keeps the identity if the same pair was redeemed at two TINs
+    RedeemedReceipt = apps.get_model('api', 'RedeemedReceipt')
+    seen = set()
+    for pk, receipt_id in RedeemedReceipt.objects.order_by('redeemed_at', 'pk').values_list('pk', 'receipt_id').iterator():
+        parts = receipt_id.split('_')
+        if len(parts) != 4 or parts[0] != 'soliq':
+            continue
+        identity = f"{parts[2]}:{parts[3]}"
+        if identity in seen:
+            continue
+        seen.add(identity)
+        RedeemedReceipt.objects.filter(pk=pk).update(qr_identity=identity)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_receipt_verification_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='redeemedreceipt',
+            name='qr_identity',
+            field=models.CharField(blank=True, max_length=100, null=True, unique=True),
+        ),
+        migrations.RunPython(backfill_qr_identity, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.27 on 2026-10-17 19:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_redeemedreceipt_qr_identity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReceiptPageArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('qr_identity', models.CharField(db_index=True, max_length=100)),
+                ('url', models.TextField()),
+                ('status_code', models.PositiveSmallIntegerField()),
+                ('elapsed_ms', models.FloatField()),
+                ('attempts', models.PositiveSmallIntegerField(default=1)),
+                ('page_size', models.PositiveIntegerField()),
+                ('compressed_page', models.BinaryField()),
+                ('outcome', models.JSONField(blank=True, null=True)),
+                ('fetched_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.27 on 2026-10-17 19:47
+
+from django.db import migrations, models
+from django.db.models import Q, Sum
+
+
+def backfill_wallet_totals(apps, schema_editor):
+    CustomUser = apps.get_model('api', 'CustomUser')
+    WalletTransaction = apps.get_model('api', 'WalletTransaction')
+    rows = WalletTransaction.objects.filter(status='completed').values('user_id').annotate(
+        total_earned=Sum('amount', filter=Q(type='cashback_add')),
+        total_transferred=Sum('amount', filter=Q(type='transfer_out')),
+    )
+    for row in rows:
+        user_id = row.pop('user_id')
+        CustomUser.objects.filter(pk=user_id).update(**{name: value or 0 for name, value in row.items()})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_receipt_page_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='total_earned',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12, verbose_name='total earned'),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='total_transferred',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12, verbose_name='total transferred'),
+        ),
+        migrations.RunPython(backfill_wallet_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.27 on 2026-10-17 19:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0019_customuser_wallet_totals'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='wallettransaction',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='wallet_txn_user_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='wallettransaction',
+            index=models.Index(fields=['user', 'type', '-created_at', '-id'], name='wallet_txn_user_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='wallettransaction',
+            index=models.Index(fields=['user', 'status', '-created_at', '-id'], name='wallet_txn_user_status_idx'),
+        ),
+    ]
@@ -1,4 +1,7 @@
-from django.db import models
+from decimal import Decimal
+
+from django.db import models, transaction
+from django.utils import timezone
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.utils.translation import gettext_lazy as _
 
@@ -59,11 +62,27 @@ class CustomUser(AbstractUser):
     )
     liked_restaurants = models.ManyToManyField('Restaurant', related_name='liked_by', blank=True)
 
+    # Running totals of the completed wallet ledger, updated together with
+    # `wallet_balance`; `manage.py rebuild_wallet_totals` recomputes them.
+    total_earned = models.DecimalField(_("total earned"), max_digits=12, decimal_places=2, default=0, editable=False)
+    total_transferred = models.DecimalField(
+        _("total transferred"), max_digits=12, decimal_places=2, default=0, editable=False
+    )
+
     USERNAME_FIELD = 'phone_number'
     REQUIRED_FIELDS = []
 
     objects = CustomUserManager()
 
+    @classmethod
+    def compute_wallet_totals(cls, user_id):
+        """Computes `total_earned` and `total_transferred` from the user's completed transactions."""
+        totals = WalletTransaction.objects.filter(user_id=user_id, status='completed').aggregate(
+            total_earned=models.Sum('amount', filter=models.Q(type='cashback_add')),
+            total_transferred=models.Sum('amount', filter=models.Q(type='transfer_out')),
+        )
+        return {name: value or Decimal('0.00') for name, value in totals.items()}
+
     def __str__(self):
         return f"{self.phone_number} ({self.full_name or 'No Name'})"
 
@@ -82,11 +101,59 @@ class Tag(models.Model):
     id = models.CharField(max_length=50, primary_key=True)  # e.g., "tag_1", "halal"
     name = models.CharField(_("name"), max_length=100)
     icon_url = models.URLField(max_length=500, blank=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return self.name
 
 
+class RestaurantQuerySet(models.QuerySet):
+    # Related objects and computed values of the catalog representation, with
+    # the columns they are built from
+    CATALOG_RELATIONS = ('tags', 'media', 'menu_images', 'reviews')
+    CATALOG_COMPUTED_COLUMNS = {
+        'average_rating': ('rating_sum', 'rating_count'),
+        'total_reviews': ('rating_count',),
+        'is_liked': (),
+    }
+
+    def for_catalog(self, fields=None):
+        """
+        Loads everything `RestaurantSerializer` renders in a fixed number of
+        queries, regardless of how many restaurants are listed.
+        When `fields` (serializer field names) is given, only the matching
+        columns are selected and only the requested relations prefetched.
+        """
+        if fields is None:
+            return self.prefetch_related(*self.CATALOG_RELATIONS)
+
+        columns = {'name'}  # the catalog is ordered and paginated by name
+        for field in fields:
+            if field in self.CATALOG_COMPUTED_COLUMNS:
+                columns.update(self.CATALOG_COMPUTED_COLUMNS[field])
+            elif field not in self.CATALOG_RELATIONS:
+                columns.add(field)
+        return self.only(*columns).prefetch_related(
+            *[relation for relation in self.CATALOG_RELATIONS if relation in fields]
+        )
+
+    def with_tags(self, tag_ids, match='all'):
+        """
+        Filters restaurants by tags with a single subquery on the tag table,
+        whatever the number of tags. `match='all'` keeps restaurants having
+        every tag (GROUP BY ... HAVING COUNT = n), `match='any'` at least one.
+        """
+        tag_ids = set(tag_ids)
+        matches = Restaurant.tags.through.objects.filter(tag_id__in=tag_ids)
+        if match == 'all':
+            matches = (
+                matches.values('restaurant_id')
+                .annotate(matched_tags=models.Count('tag_id'))
+                .filter(matched_tags=len(tag_ids))
+            )
+        return self.filter(pk__in=matches.values('restaurant_id'))
+
+
 class Restaurant(models.Model):
     id = models.CharField(max_length=100, primary_key=True)  # e.g., "rest_123"
     tin = models.CharField(_("tax identification number (TIN)"), max_length=20, unique=True)
@@ -101,26 +168,82 @@ class Restaurant(models.Model):
     location_description_en = models.TextField(_("location description (EN)"), blank=True)
     location_description_ru = models.TextField(_("location description (RU)"), blank=True)
     location_description_uz = models.TextField(_("location description (UZ)"), blank=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    # Denormalized rating aggregates, maintained by `update_rating_aggregates`
+    # whenever a Review is saved or deleted.
+    rating_sum = models.PositiveIntegerField(_("rating sum"), default=0, editable=False)
+    rating_count = models.PositiveIntegerField(_("rating count"), default=0, editable=False)
+    rating_1_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_2_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_3_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_4_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_5_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = RestaurantQuerySet.as_manager()
 
     @property
     def average_rating(self):
-        reviews = self.reviews.all()
-        if reviews.exists():
-            total = sum(review.rating for review in reviews)
-            return round(total / reviews.count(), 1)
+        if self.rating_count:
+            return round(self.rating_sum / self.rating_count, 1)
         return 0.0
 
     @property
     def total_reviews(self):
-        return self.reviews.count()
+        return self.rating_count
+
+    @property
+    def rating_histogram(self):
+        return {star: getattr(self, f'rating_{star}_count') for star in range(1, 6)}
+
+    @classmethod
+    def compute_rating_aggregates(cls, restaurant_id):
+        """
+        Computes the rating aggregate columns for a restaurant from its reviews
+        with a single query.
+        """
+        aggregates = Review.objects.filter(restaurant_id=restaurant_id).aggregate(
+            rating_sum=models.Sum('rating'),
+            rating_count=models.Count('id'),
+            **{
+                f'rating_{star}_count': models.Count('id', filter=models.Q(rating=star))
+                for star in range(1, 6)
+            }
+        )
+        aggregates['rating_sum'] = aggregates['rating_sum'] or 0
+        return aggregates
+
+    @classmethod
+    def update_rating_aggregates(cls, restaurant_id):
+        """
+        Recomputes and stores the rating aggregates for a restaurant.
+        The restaurant row is locked first so concurrent reviews are applied one
+        after another and the stored values stay exact.
+        """
+        with transaction.atomic():
+            if not cls.objects.select_for_update().filter(pk=restaurant_id).exists():
+                return None
+            aggregates = cls.compute_rating_aggregates(restaurant_id)
+            cls.objects.filter(pk=restaurant_id).update(updated_at=timezone.now(), **aggregates)
+        return aggregates
 
     def __str__(self):
         return self.name
 
 
+class RestaurantTombstone(models.Model):
+    """Records deleted restaurants so clients syncing changes can drop them."""
+    restaurant_id = models.CharField(max_length=100, db_index=True)
+    deleted_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"Restaurant {self.restaurant_id} deleted at {self.deleted_at}"
+
+
 class RestaurantImage(models.Model):
     restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name='media')
     image = models.ImageField(_("image"), upload_to='restaurant_media/')
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"Image for {self.restaurant.name}"
@@ -129,6 +252,7 @@ class RestaurantImage(models.Model):
 class RestaurantMenuImage(models.Model):
     restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name='menu_images')
     image = models.ImageField(_("menu image"), upload_to='restaurant_menus/')
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"Menu Page for {self.restaurant.name}"
@@ -138,6 +262,8 @@ class RestaurantMenuImage(models.Model):
 class RedeemedReceipt(models.Model):
     receipt_id = models.CharField(max_length=100, unique=True)
     receipt_number = models.CharField(max_length=50)
+    # "<r>:<c>" from the QR code, known before Soliq is contacted
+    qr_identity = models.CharField(max_length=100, unique=True, null=True, blank=True)
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='redeemed_receipts')
     restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name='redeemed_receipts')
     total_paid = models.DecimalField(max_digits=12, decimal_places=2)
@@ -148,6 +274,61 @@ class RedeemedReceipt(models.Model):
         return f"Receipt {self.receipt_id} for {self.user.phone_number}"
 
 
+class ReceiptPageArchive(models.Model):
+    """
+    A Soliq receipt page as fetched, zlib-compressed, with the fetch metadata
+    and what the scraper read from it (`receipt_parser.read_receipt_page`),
+    so parser changes can be checked with `reparse_receipt_archive` instead
+    of fetching again.
+    """
+    qr_identity = models.CharField(max_length=100, db_index=True)
+    url = models.TextField()
+    status_code = models.PositiveSmallIntegerField()
+    elapsed_ms = models.FloatField()
+    attempts = models.PositiveSmallIntegerField(default=1)
+    page_size = models.PositiveIntegerField()
+    compressed_page = models.BinaryField()
+    outcome = models.JSONField(null=True, blank=True)
+    fetched_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"Soliq page {self.qr_identity} ({self.status_code}) at {self.fetched_at}"
+
+
+class ReceiptVerificationJob(models.Model):
+    """
+    A receipt verification queued by `POST receipt/verify/` in async mode and
+    run by the `process_receipt_jobs` worker. `result` holds the same data the
+    synchronous endpoint returns; failures keep its error code and message.
+    """
+    STATUSES = (
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    )
+
+    job_id = models.CharField(max_length=100, unique=True)
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='receipt_jobs')
+    qr_code = models.TextField()
+    restaurant_id = models.CharField(max_length=100, null=True, blank=True)
+    status = models.CharField(max_length=20, choices=STATUSES, default='pending')
+    result = models.JSONField(null=True, blank=True)
+    error_code = models.CharField(max_length=50, blank=True)
+    message = models.TextField(blank=True)
+    http_status = models.PositiveSmallIntegerField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'created_at'], name='receipt_job_queue_idx')]
+
+    def __str__(self):
+        return f"Receipt job {self.job_id} ({self.status})"
+
+
 class WalletTransaction(models.Model):
     TRANSACTION_TYPES = (
         ('cashback_add', 'Cashback Add'),
@@ -173,6 +354,15 @@ class WalletTransaction(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     metadata = models.JSONField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            # Serve the transaction history of a user, newest first, optionally
+            # filtered by type or status and a created_at range
+            models.Index(fields=['user', '-created_at', '-id'], name='wallet_txn_user_recent_idx'),
+            models.Index(fields=['user', 'type', '-created_at', '-id'], name='wallet_txn_user_type_idx'),
+            models.Index(fields=['user', 'status', '-created_at', '-id'], name='wallet_txn_user_status_idx'),
+        ]
+
     def __str__(self):
         return f"{self.type} of {self.amount} for {self.user.phone_number}"
 
@@ -205,6 +395,10 @@ class Review(models.Model):
     class Meta:
         unique_together = ('user', 'restaurant')
         ordering = ['-created_at']
+        indexes = [
+            # Serves the keyset-paginated review list of a restaurant
+            models.Index(fields=['restaurant', '-created_at', '-id'], name='review_restaurant_recent_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.phone_number} rated {self.restaurant.name} {self.rating}/5"
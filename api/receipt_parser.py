@@ -0,0 +1,223 @@
+"""
+Single-pass extraction of the TIN and total from a Soliq receipt page.
+
+`extract_receipt_fields` streams the HTML through the stdlib tokenizer and
+stops feeding it as soon as both values are known. It reproduces the
+original BeautifulSoup lookup: cells are numbered in start-tag order, a
+cell's text includes the text of nested cells, and script/style (and the
+other raw-text containers BeautifulSoup skips) don't count as text.
+"""
+import re
+import zlib
+from html.parser import HTMLParser
+
+FRAUD_MARKER = "Chek qalbaki ravishda yaratilgan"
+
+TIN_LABELS = ('STIR', 'INN', 'СТИР', 'ИНН')
+TOTAL_LABELS = ("Jami to`lov:", "Jami to'lov:", "Итого:")
+
+# 9 digits (TIN) or 14 digits (PINFL)
+TIN_RE = re.compile(r'^(?:\d{9}|\d{14})$')
+FALLBACK_TIN_RE = re.compile(r'^\d{9}$')
+
+# Elements that never get an end tag, and elements whose text BeautifulSoup
+# leaves out of `.text`
+VOID_ELEMENTS = frozenset((
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'keygen', 'link', 'menuitem',
+    'meta', 'param', 'source', 'track', 'wbr', 'basefont', 'bgsound', 'command', 'frame',
+    'image', 'isindex', 'nextid', 'spacer',
+))
+SKIPPED_TEXT_ELEMENTS = frozenset(('script', 'style', 'template', 'rt', 'rp'))
+
+# TIN candidates are looked for in the 3 cells after the label
+TIN_LOOKAHEAD = 3
+# The total is in the next cell, or one of the 2 after it when that isn't a number
+TOTAL_LOOKAHEAD = 3
+
+CHUNK_SIZE = 4 * 1024
+
+# A cell needed for the lookup whose text isn't final yet
+PENDING = object()
+
+
+def _parse_amount(text):
+    return float(text.strip().replace(',', '').replace(' ', ''))
+
+
+class ReceiptPageParser(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.stack = []          # open elements as (tag, cell index or None)
+        self.open_cells = {}     # open <td>/<i> elements, in opening order
+        self.skip_depth = 0
+        self.cells = {'td': [], 'i': []}
+        self.closed = {'td': [], 'i': []}
+        self.finished = False
+
+        self.tin = None
+        self.total_amount = None
+        self.tin_pos = 0
+        self.total_pos = 0
+
+    # Tokenizer callbacks
+
+    def handle_starttag(self, tag, attrs):
+        if tag in VOID_ELEMENTS:
+            return
+        index = None
+        if tag in self.cells:
+            index = len(self.cells[tag])
+            self.cells[tag].append([])
+            self.closed[tag].append(False)
+            self.open_cells[(tag, index)] = None
+        if tag in SKIPPED_TEXT_ELEMENTS:
+            self.skip_depth += 1
+        self.stack.append((tag, index))
+
+    def handle_endtag(self, tag):
+        # Like BeautifulSoup, an end tag closes the most recent open element
+        # of that name along with everything opened inside it
+        for pos in range(len(self.stack) - 1, -1, -1):
+            if self.stack[pos][0] == tag:
+                break
+        else:
+            return
+        while len(self.stack) > pos:
+            self.close_element(*self.stack.pop())
+        self.scan()
+
+    def handle_data(self, data):
+        if self.skip_depth:
+            return
+        for tag, index in self.open_cells:
+            self.cells[tag][index].append(data)
+
+    def unknown_decl(self, data):
+        if data.startswith('CDATA['):
+            self.handle_data(data[6:])
+
+    def close_element(self, tag, index):
+        if tag in SKIPPED_TEXT_ELEMENTS:
+            self.skip_depth -= 1
+        if index is not None:
+            del self.open_cells[(tag, index)]
+            self.closed[tag][index] = True
+
+    def close(self):
+        super().close()
+        while self.stack:
+            self.close_element(*self.stack.pop())
+        self.finished = True
+        self.scan()
+
+    # Extraction
+
+    def cell_text(self, index):
+        return ''.join(self.cells['td'][index])
+
+    def settled_text(self, index):
+        """
+        Final text of a cell, None when the page has no such cell, or PENDING
+        while it could still change.
+        """
+        closed = self.closed['td']
+        if index >= len(closed):
+            return None if self.finished else PENDING
+        return self.cell_text(index) if closed[index] else PENDING
+
+    def scan(self):
+        """Checks cells in document order, as far as their text is final."""
+        while self.tin is None and self.tin_pos < len(self.cells['td']):
+            result = self.find_tin(self.tin_pos)
+            if result is PENDING:
+                break
+            self.tin = result
+            self.tin_pos += 1
+        while self.total_amount is None and self.total_pos < len(self.cells['td']):
+            result = self.find_total(self.total_pos)
+            if result is PENDING:
+                break
+            self.total_amount = result
+            self.total_pos += 1
+
+    def find_tin(self, index):
+        text = self.settled_text(index)
+        if text is PENDING:
+            return PENDING
+        if not any(label in text for label in TIN_LABELS):
+            return None
+        for offset in range(1, TIN_LOOKAHEAD + 1):
+            candidate = self.settled_text(index + offset)
+            if candidate is PENDING:
+                return PENDING
+            if candidate is not None and TIN_RE.match(candidate.strip()):
+                return candidate.strip()
+        return None
+
+    def find_total(self, index):
+        text = self.settled_text(index)
+        if text is PENDING:
+            return PENDING
+        if not any(label in text for label in TOTAL_LABELS):
+            return None
+        for offset in range(1, TOTAL_LOOKAHEAD + 1):
+            candidate = self.settled_text(index + offset)
+            if candidate is PENDING:
+                return PENDING
+            if candidate is None:
+                break
+            try:
+                return _parse_amount(candidate)
+            except ValueError:
+                continue
+        return None
+
+    def fallback_tin(self):
+        """The first <i> holding exactly 9 digits, for layouts without a labelled cell."""
+        for parts in self.cells['i']:
+            text = ''.join(parts).strip()
+            if FALLBACK_TIN_RE.match(text):
+                return text
+        return None
+
+    @property
+    def done(self):
+        return self.tin is not None and self.total_amount is not None
+
+
+def extract_receipt_fields(html):
+    """
+    Returns `(tin, total_amount)` from a receipt page, either of them None
+    when the page doesn't have it.
+    """
+    parser = ReceiptPageParser()
+    for start in range(0, len(html), CHUNK_SIZE):
+        parser.feed(html[start:start + CHUNK_SIZE])
+        if parser.done:
+            return parser.tin, parser.total_amount
+    parser.close()
+    tin = parser.tin if parser.tin is not None else parser.fallback_tin()
+    return tin, parser.total_amount
+
+
+def read_receipt_page(html):
+    """
+    What the scraper reads from a receipt page: whether Soliq flagged it as
+    fraudulent, and otherwise its TIN and total (None when missing). This is
+    the outcome stored with archived pages.
+    """
+    # The marker check runs over the raw page, before any parsing
+    if FRAUD_MARKER in html:
+        return {'fraudulent': True, 'tin': None, 'total_amount': None}
+    tin, total_amount = extract_receipt_fields(html)
+    return {'fraudulent': False, 'tin': tin, 'total_amount': total_amount}
+
+
+def reparse_archived_page(row):
+    """
+    `(pk, zlib-compressed page, stored outcome)` -> `(pk, stored outcome,
+    current outcome)`. Used by `reparse_receipt_archive` in worker processes,
+    which is why it lives here and not next to the models.
+    """
+    pk, compressed_page, outcome = row
+    return pk, outcome, read_receipt_page(zlib.decompress(compressed_page).decode('utf-8'))
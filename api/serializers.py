@@ -60,7 +60,19 @@ class RestaurantMenuImageSerializer(serializers.ModelSerializer):
         model = RestaurantMenuImage
         fields = ['id', 'image']
 
-class RestaurantSerializer(serializers.ModelSerializer):
+class DynamicFieldsModelSerializer(serializers.ModelSerializer):
+    """
+    A ModelSerializer that takes an additional `fields` argument restricting
+    which of its fields are rendered.
+    """
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for field_name in set(self.fields) - set(fields):
+                self.fields.pop(field_name)
+
+class RestaurantSerializer(DynamicFieldsModelSerializer):
     tags = TagSerializer(many=True, read_only=True)
     media = RestaurantImageSerializer(many=True, read_only=True)
     is_liked = serializers.SerializerMethodField()
@@ -80,6 +92,10 @@ class RestaurantSerializer(serializers.ModelSerializer):
         ]
 
     def get_is_liked(self, obj):
+        # Catalog views load the user's liked IDs once per request
+        liked_ids = self.context.get('liked_restaurant_ids')
+        if liked_ids is not None:
+            return obj.id in liked_ids
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             return request.user.liked_restaurants.filter(id=obj.id).exists()
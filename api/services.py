@@ -1,15 +1,377 @@
+import logging
+import math
+import random
+import re
+import threading
+import time
+import uuid
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from urllib.parse import urlparse, parse_qs
 
 import requests
-from bs4 import BeautifulSoup
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, IntegrityError, connection, transaction
+from django.utils import timezone
+from requests.adapters import HTTPAdapter
+
+from .circuit_breaker import CircuitBreaker, CircuitOpenError
+from .models import ReceiptPageArchive, RedeemedReceipt, Restaurant, WalletTransaction
+from .receipt_parser import TIN_RE, read_receipt_page
+from .wallet import MAX_AMOUNT, credit_wallet, to_amount, wallet_balance
+
+logger = logging.getLogger(__name__)
+
+# Use a comprehensive set of headers to bypass basic bot protection on Render
+SOLIQ_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+    'Accept-Encoding': 'gzip, deflate, br',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1',
+    'Sec-Fetch-Dest': 'document',
+    'Sec-Fetch-Mode': 'navigate',
+    'Sec-Fetch-Site': 'none',
+    'Sec-Fetch-User': '?1',
+    'Cache-Control': 'max-age=0'
+}
 
 class SoliqVerificationError(Exception):
-    def __init__(self, message, raw_response=None):
+    def __init__(self, message, raw_response=None, attempts=None, retryable=False):
         self.message = message
         self.raw_response = raw_response
+        # Per-attempt timings of the Soliq fetch, see `fetch_soliq_page`
+        self.attempts = attempts or []
+        # The page couldn't be fetched, as opposed to a page that says no
+        self.retryable = retryable
         super().__init__(self.message)
 
-def verify_soliq_receipt(url):
+
+class SoliqUnavailableError(SoliqVerificationError):
+    """Raised without contacting Soliq while its circuit breaker is open."""
+
+    def __init__(self, retry_after):
+        self.retry_after = retry_after
+        super().__init__(
+            "Soliq receipt verification is temporarily unavailable. Please try again later.", retryable=True
+        )
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_soliq_session():
+    """
+    Returns the process-wide HTTP session used for Soliq, so verifications
+    reuse pooled keep-alive connections instead of a new TCP+TLS handshake
+    per receipt.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                # Retries are handled by `fetch_soliq_page` so every attempt is timed
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings.SOLIQ_POOL_SIZE, max_retries=0)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                session.headers.update(SOLIQ_HEADERS)
+                _session = session
+    return _session
+
+
+def get_soliq_breaker():
+    return CircuitBreaker(
+        'soliq',
+        failure_rate=settings.SOLIQ_BREAKER_FAILURE_RATE,
+        slow_call_seconds=settings.SOLIQ_BREAKER_SLOW_CALL_SECONDS,
+        slow_call_rate=settings.SOLIQ_BREAKER_SLOW_CALL_RATE,
+        min_calls=settings.SOLIQ_BREAKER_MIN_CALLS,
+        window_seconds=settings.SOLIQ_BREAKER_WINDOW,
+        open_seconds=settings.SOLIQ_BREAKER_OPEN_SECONDS,
+    )
+
+
+# Responses that mean Soliq is down or turning us away, rather than a bad receipt
+SOLIQ_UNHEALTHY_STATUSES = (403, 429)
+
+
+def fetch_soliq_page(url):
+    """
+    GETs a Soliq receipt page through the pooled session, guarded by the
+    Soliq circuit breaker: while it is open this raises SoliqUnavailableError
+    at once. Network errors, 5xx/403/429 responses and slow fetches count
+    against the breaker.
+    Returns `(response, attempts)`, see `fetch_soliq_page_with_retries`.
+    """
+    if not settings.SOLIQ_BREAKER_ENABLED:
+        return fetch_soliq_page_with_retries(url)
+
+    breaker = get_soliq_breaker()
+    try:
+        generation = breaker.before_call()
+    except CircuitOpenError as e:
+        raise SoliqUnavailableError(e.retry_after)
+
+    started = time.monotonic()
+    try:
+        response, attempts = fetch_soliq_page_with_retries(url)
+    except requests.RequestException:
+        breaker.record(generation, False, time.monotonic() - started)
+        raise
+    healthy = response.status_code < 500 and response.status_code not in SOLIQ_UNHEALTHY_STATUSES
+    breaker.record(generation, healthy, time.monotonic() - started)
+    return response, attempts
+
+
+def fetch_soliq_page_with_retries(url):
+    """
+    GETs a Soliq receipt page through the pooled session.
+    Connection failures (refused, reset, connect timeout) and 5xx responses
+    are retried up to SOLIQ_MAX_RETRIES times with jittered exponential
+    backoff; read timeouts are not, since they already cost a full timeout.
+    Returns `(response, attempts)` where `attempts` lists the timing and
+    outcome of every try.
+    """
+    session = get_soliq_session()
+    timeout = (settings.SOLIQ_CONNECT_TIMEOUT, settings.SOLIQ_READ_TIMEOUT)
+    max_attempts = settings.SOLIQ_MAX_RETRIES + 1
+    attempts = []
+
+    for attempt in range(1, max_attempts + 1):
+        started = time.monotonic()
+        try:
+            response = session.get(url, timeout=timeout)
+        except requests.RequestException as e:
+            attempts.append({"attempt": attempt, "elapsed_ms": round((time.monotonic() - started) * 1000, 1), "error": type(e).__name__})
+            logger.warning("Soliq fetch attempt %d failed after %.1f ms: %r", attempt, attempts[-1]['elapsed_ms'], e)
+            if not isinstance(e, requests.ConnectionError) or attempt == max_attempts:
+                e.attempts = attempts
+                raise
+        else:
+            attempts.append({"attempt": attempt, "elapsed_ms": round((time.monotonic() - started) * 1000, 1), "status": response.status_code})
+            logger.info("Soliq fetch attempt %d returned HTTP %d in %.1f ms", attempt, response.status_code, attempts[-1]['elapsed_ms'])
+            if response.status_code < 500 or attempt == max_attempts:
+                return response, attempts
+
+        # Full jitter keeps retries from many workers from arriving in lockstep
+        time.sleep(random.uniform(0, settings.SOLIQ_BACKOFF_FACTOR * (2 ** (attempt - 1))))
+
+def soliq_fetch_budget():
+    """
+    Worst-case seconds `fetch_soliq_page_with_retries` can take: every
+    attempt running into both timeouts, plus the longest backoff between them.
+    """
+    max_attempts = settings.SOLIQ_MAX_RETRIES + 1
+    per_attempt = settings.SOLIQ_CONNECT_TIMEOUT + settings.SOLIQ_READ_TIMEOUT
+    backoff = sum(settings.SOLIQ_BACKOFF_FACTOR * (2 ** (attempt - 1)) for attempt in range(1, max_attempts))
+    return max_attempts * per_attempt + backoff
+
+
+RECEIPT_CACHE_PREFIX = 'soliq:receipt'
+
+
+def receipt_qr_identity(url):
+    """
+    "<r>:<c>" (receipt number and timestamp) from a receipt QR URL, the same
+    for any host, param order or extra params. None when the URL has no
+    `r`/`c`.
+    """
+    query_params = parse_qs(urlparse(url.strip()).query)
+    r = query_params.get('r', [''])[0].strip()
+    c = query_params.get('c', [''])[0].strip()
+    if not r or not c:
+        return None
+    return f"{r}:{c}"
+
+
+def receipt_cache_key(url):
+    identity = receipt_qr_identity(url)
+    return f"{RECEIPT_CACHE_PREFIX}:{identity}" if identity else None
+
+
+def _from_cache_entry(entry):
+    if entry['ok']:
+        return dict(entry['data'])
+    raise SoliqVerificationError(entry['message'], retryable=entry.get('retryable', False))
+
+
+def verify_soliq_receipt(url, refresh=False):
+    """
+    Parsed receipt data for a Soliq QR URL.
+    Results are cached for SOLIQ_RECEIPT_CACHE_TIMEOUT seconds and failures for
+    SOLIQ_RECEIPT_NEGATIVE_CACHE_TIMEOUT, so previewing a receipt and then
+    redeeming it hits Soliq once. `refresh=True` skips the cached entry and
+    stores the fresh result.
+    Concurrent calls for the same receipt share one fetch, see `_single_flight`.
+    """
+    key = receipt_cache_key(url)
+    if key is None:
+        return scrape_soliq_receipt(url)
+
+    if not refresh:
+        cached = cache.get(key)
+        if cached is not None:
+            return _from_cache_entry(cached)
+
+    return _single_flight(url, key, refresh)
+
+
+def _single_flight_timeout():
+    # Waiting less than a fetch can take would start a second scrape of a
+    # receipt still being fetched; the second is slack for parsing and caching
+    return max(settings.SOLIQ_SINGLE_FLIGHT_TIMEOUT, soliq_fetch_budget() + 1)
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.data = None
+        self.error = None
+
+
+_flights = {}
+_flights_lock = threading.Lock()
+
+
+def _single_flight(url, key, refresh):
+    """
+    Fetches the receipt once per process: the first thread becomes the
+    leader and the others wait for its result. The leader in turn takes a
+    cache lock, so a leader in another worker process is waited for too and
+    its result read back from the receipt cache.
+    """
+    with _flights_lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = _Flight()
+
+    if not leader:
+        if flight.done.wait(_single_flight_timeout()):
+            if flight.error is not None:
+                raise flight.error
+            return dict(flight.data)
+        # The leader is stuck past any fetch budget; don't wait on it forever
+        return _fetch_and_cache(url, key)
+
+    try:
+        flight.data = _fetch_across_processes(url, key, refresh)
+        return dict(flight.data)
+    except BaseException as e:
+        # Whatever the leader failed with, the waiting callers fail with too
+        flight.error = e
+        raise
+    finally:
+        with _flights_lock:
+            del _flights[key]
+        flight.done.set()
+
+
+def _fetch_across_processes(url, key, refresh):
+    lock_key = f"{key}:lock"
+    # The lock outlives the slowest possible fetch, so it can't expire while
+    # its holder is still scraping
+    timeout = _single_flight_timeout()
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if cache.add(lock_key, True, timeout=timeout):
+            try:
+                return _fetch_and_cache(url, key)
+            finally:
+                cache.delete(lock_key)
+
+        # Another process is fetching this receipt; its result lands in the cache.
+        # A refresh can't tell that result from an older entry, so it fetches
+        # again once the lock is released.
+        while time.monotonic() < deadline and cache.get(lock_key) is not None:
+            time.sleep(0.05)
+        if not refresh:
+            cached = cache.get(key)
+            if cached is not None:
+                return _from_cache_entry(cached)
+    return _fetch_and_cache(url, key)
+
+
+def _fetch_and_cache(url, key):
+    try:
+        data = scrape_soliq_receipt(url)
+    except SoliqUnavailableError:
+        # Nothing was fetched, so there is no result to remember
+        raise
+    except SoliqVerificationError as e:
+        cache.set(
+            key, {'ok': False, 'message': e.message, 'retryable': e.retryable},
+            settings.SOLIQ_RECEIPT_NEGATIVE_CACHE_TIMEOUT
+        )
+        raise
+    cache.set(key, {'ok': True, 'data': data}, settings.SOLIQ_RECEIPT_CACHE_TIMEOUT)
+    return data
+
+
+_archive = threading.local()
+
+
+@contextmanager
+def archiving_receipt_pages():
+    """
+    Archives the Soliq pages fetched within the block, see
+    `archive_receipt_page`, once it exits. The rows are written on the
+    calling thread's connection, pages fetched on the pool threads of
+    `verify_receipts_concurrently` included. Pages fetched outside such a
+    block aren't archived.
+    """
+    if getattr(_archive, 'pages', None) is not None:
+        # Nested: the outermost block stores the pages
+        yield
+        return
+    _archive.pages = pages = []
+    try:
+        yield
+    finally:
+        _archive.pages = None
+        store_archived_pages(pages)
+
+
+def archive_receipt_page(url, response, attempts, page):
+    """
+    Queues the fetched page, compressed, with how it was fetched and what
+    the scraper read from it, for `reparse_receipt_archive`. It is stored
+    when the enclosing `archiving_receipt_pages` block exits.
+    """
+    pages = getattr(_archive, 'pages', None)
+    if pages is None or not settings.SOLIQ_ARCHIVE_ENABLED:
+        return
+    raw = response.text.encode('utf-8')
+    pages.append(ReceiptPageArchive(
+        qr_identity=receipt_qr_identity(url) or '',
+        url=url,
+        status_code=response.status_code,
+        elapsed_ms=sum(attempt['elapsed_ms'] for attempt in attempts),
+        attempts=len(attempts),
+        page_size=len(raw),
+        compressed_page=zlib.compress(raw, settings.SOLIQ_ARCHIVE_COMPRESSION_LEVEL),
+        outcome=page,
+    ))
+
+
+def store_archived_pages(pages):
+    """Writes queued archive rows. Failing to archive never fails the verification."""
+    if not pages:
+        return
+    try:
+        # A savepoint, so a failed write doesn't break the caller's transaction
+        with transaction.atomic():
+            ReceiptPageArchive.objects.bulk_create(pages)
+    except DatabaseError:
+        logger.exception("Could not archive %d Soliq page(s)", len(pages))
+
+
+def scrape_soliq_receipt(url):
     """
     Fetches a Soliq QR code URL and extracts data via HTML scraping.
     """
@@ -29,89 +391,26 @@ def verify_soliq_receipt(url):
         formatted_date = f"{datetime_str[:4]}-{datetime_str[4:6]}-{datetime_str[6:8]}T{datetime_str[8:10]}:{datetime_str[10:12]}:{datetime_str[12:14]}Z"
         
         # Now fetch the actual webpage to get the TIN and Total Amount safely
-        # Use a comprehensive set of headers to bypass basic bot protection on Render
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-            'Sec-Fetch-Dest': 'document',
-            'Sec-Fetch-Mode': 'navigate',
-            'Sec-Fetch-Site': 'none',
-            'Sec-Fetch-User': '?1',
-            'Cache-Control': 'max-age=0'
-        }
-        
-        tin = None
-        total_amount = None
+        response, attempts = fetch_soliq_page(url)
 
-        try:
-            response = requests.get(url, headers=headers, timeout=10)
-            
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.text, 'html.parser')
-                
-                # Check if receipt is marked as fake by Soliq
-                if "Chek qalbaki ravishda yaratilgan" in response.text:
-                     raise SoliqVerificationError("This receipt is marked as fraudulent (qalbaki) by Soliq.")
-                
-                # 1. Extract TIN - Highly robust text search approach
-                # Soliq has multiple receipt formats. Some put TIN in <i>, some in a labeled <td>
-                tds = soup.find_all('td')
-                for idx, td in enumerate(tds):
-                    text = td.text.strip()
-                    # Check for "Komitent STIR" or similar labels
-                    if 'STIR' in text or 'INN' in text or 'СТИР' in text or 'ИНН' in text:
-                        # Look ahead in the next few cells for a 9 or 14 digit number
-                        for offset in range(1, 4):
-                            if idx + offset < len(tds):
-                                cand_text = tds[idx + offset].text.strip()
-                                # 9 digits (TIN) or 14 digits (PINFL)
-                                import re
-                                if re.match(r'^\d{9}$', cand_text) or re.match(r'^\d{14}$', cand_text):
-                                    tin = cand_text
-                                    break
-                        if tin: break
-
-                # Fallback to the old method: looking for an isolated <i> tag with exactly 9 digits
-                if not tin:
-                    i_tags = soup.find_all('i')
-                    for i in i_tags:
-                        text = i.text.strip()
-                        import re
-                        if re.match(r'^\d{9}$', text):
-                            tin = text
-                            break
-                        
-                # 2. Extract Total Amount (Jami to'lov)
-                for idx, td in enumerate(tds):
-                    if td.text and ("Jami to`lov:" in td.text or "Jami to'lov:" in td.text or "Итого:" in td.text):
-                        # The user's provided HTML shows the amount is in the IMMEDIATE next td element
-                        if idx + 1 < len(tds):
-                            candidate = tds[idx + 1].text.strip()
-                            # Clean up spaces and commas e.g., "30,000.00" -> "30000.00"
-                            cand_clean = candidate.replace(',', '').replace(' ', '')
-                            try:
-                                total_amount = float(cand_clean)
-                                break
-                            except ValueError:
-                                # Look a bit further just in case there are empty cells
-                                for offset in range(2, 4):
-                                    if idx + offset < len(tds):
-                                        c = tds[idx + offset].text.strip().replace(',', '').replace(' ', '')
-                                        try:
-                                            total_amount = float(c)
-                                            break
-                                        except ValueError:
-                                            pass
-                        if total_amount is not None:
-                            break
-        except requests.RequestException:
-            pass # Request failed, fallback to URL logic below
-            
-        # 3. Final validation
+        # Extract the TIN (labelled STIR/INN cell, or an isolated <i>) and the
+        # Total Amount (Jami to'lov) in one pass over the page
+        page = read_receipt_page(response.text) if response.status_code == 200 else None
+        archive_receipt_page(url, response, attempts, page)
+
+        if response.status_code != 200:
+            raise SoliqVerificationError(
+                f"Soliq responded with HTTP {response.status_code} while fetching the receipt.",
+                attempts=attempts, retryable=True
+            )
+
+        # Check if receipt is marked as fake by Soliq
+        if page['fraudulent']:
+             raise SoliqVerificationError("This receipt is marked as fraudulent (qalbaki) by Soliq.")
+
+        tin, total_amount = page['tin'], page['total_amount']
+
+        # Final validation
         if not tin:
              raise SoliqVerificationError("Could not locate the TIN (Tax ID) on the digital receipt HTML. Scraping might be blocked or HTML format changed.")
         if total_amount is None:
@@ -119,6 +418,7 @@ def verify_soliq_receipt(url):
 
         return {
             "receipt_id": f"soliq_{tin}_{receipt_number}_{datetime_str}",
+            "qr_identity": receipt_qr_identity(url),
             "receipt_number": receipt_number,
             "tin": tin,
             "total_amount": total_amount,
@@ -126,10 +426,387 @@ def verify_soliq_receipt(url):
         }
 
     except requests.RequestException as e:
-        raise SoliqVerificationError(f"Network error when verifying receipt: {str(e)}")
+        raise SoliqVerificationError(
+            f"Network error when verifying receipt: {str(e)}", attempts=getattr(e, 'attempts', None), retryable=True
+        )
     except ValueError:
         raise SoliqVerificationError("Invalid QR code format. Missing or malformed data.")
     except Exception as e:
         if isinstance(e, SoliqVerificationError):
             raise
         raise SoliqVerificationError(str(e))
+
+
+def receipt_from_qr(url):
+    """
+    Receipt data read from the QR parameters alone, without contacting Soliq:
+    `t` is the seller's TIN and `s` the receipt total. Shaped like the result
+    of `verify_soliq_receipt`, plus the `qr_code` to confirm it with later.
+    Raises SoliqVerificationError when the QR doesn't carry usable values.
+    """
+    query_params = parse_qs(urlparse(url.strip()).query)
+    tin = query_params.get('t', [''])[0].strip()
+    receipt_number = query_params.get('r', [''])[0].strip()
+    datetime_str = query_params.get('c', [''])[0].strip()
+    total = query_params.get('s', [''])[0].strip().replace(',', '').replace(' ', '')
+
+    if not TIN_RE.match(tin) or not receipt_number or not re.match(r'^\d{14}$', datetime_str):
+        raise SoliqVerificationError("This QR code can't be verified offline.")
+    try:
+        total_amount = float(total)
+    except ValueError:
+        raise SoliqVerificationError("This QR code can't be verified offline.")
+    # Past MAX_AMOUNT the total wouldn't fit the receipt and ledger columns
+    if not math.isfinite(total_amount) or not 0 < total_amount <= MAX_AMOUNT:
+        raise SoliqVerificationError("This QR code can't be verified offline.")
+
+    return {
+        "receipt_id": f"soliq_{tin}_{receipt_number}_{datetime_str}",
+        "qr_identity": receipt_qr_identity(url),
+        "qr_code": url,
+        "receipt_number": receipt_number,
+        "tin": tin,
+        "total_amount": total_amount,
+        "created_at": f"{datetime_str[:4]}-{datetime_str[4:6]}-{datetime_str[6:8]}T{datetime_str[8:10]}:{datetime_str[10:12]}:{datetime_str[12:14]}Z"
+    }
+
+
+class ReceiptRedemptionError(Exception):
+    """A verified receipt that can't be redeemed, with the API error it maps to."""
+
+    def __init__(self, error_code, message, status_code):
+        self.error_code = error_code
+        self.message = message
+        self.status_code = status_code
+        super().__init__(self.message)
+
+
+def ensure_receipt_not_redeemed(qr_code):
+    """
+    Rejects a QR code whose receipt was already redeemed, from its `r`/`c`
+    alone, so replays and double taps never reach Soliq.
+    """
+    identity = receipt_qr_identity(qr_code)
+    if identity and RedeemedReceipt.objects.filter(qr_identity=identity).exists():
+        raise ReceiptRedemptionError("RECEIPT_ALREADY_REDEEMED", "This receipt has already been redeemed.", 409)
+
+
+def resolve_receipt_restaurant(parsed_data, restaurant_id=None):
+    """
+    The restaurant a verified receipt is redeemed at.
+    Raises ReceiptRedemptionError when it doesn't match the receipt's TIN.
+    """
+    tin = parsed_data['tin']
+
+    # If the mobile app provides the restaurant ID they are attempting to scan for,
+    # we strictly match the TIN of that specific restaurant against the TIN on the receipt
+    if restaurant_id:
+        try:
+            restaurant = Restaurant.objects.get(id=restaurant_id)
+        except Restaurant.DoesNotExist:
+            raise ReceiptRedemptionError(
+                "RESTAURANT_NOT_FOUND", "The requesting restaurant could not be found.", 404
+            )
+
+        # Compare the exact TIN from the QR to the known TIN of the requested restaurant
+        if str(restaurant.tin) != str(tin):
+            raise ReceiptRedemptionError(
+                "RESTAURANT_MISMATCH",
+                "This receipt's tax identification number (TIN) does not match the chosen restaurant.",
+                422
+            )
+    else:
+        # Fallback if the mobile app didn't send a specific restaurant ID,
+        # we try to see if ANY registered restaurant matches this TIN.
+        try:
+            restaurant = Restaurant.objects.get(tin=tin)
+        except Restaurant.DoesNotExist:
+            raise ReceiptRedemptionError(
+                "RESTAURANT_MISMATCH", "This receipt does not belong to any registered restaurant.", 422
+            )
+
+    return restaurant
+
+
+def claim_receipt(receipt):
+    """
+    Inserts the unsaved RedeemedReceipt `receipt` unless its receipt_id or
+    qr_identity is already taken. The unique constraints decide between
+    concurrent redemptions within this one statement, so no existence check
+    is needed beforehand.
+    Returns whether the receipt was inserted.
+    """
+    if not _can_insert_ignoring_conflicts():
+        try:
+            with transaction.atomic():
+                receipt.save(force_insert=True)
+        except IntegrityError:
+            return False
+        return True
+
+    meta = RedeemedReceipt._meta
+    qn = connection.ops.quote_name
+    fields = [field for field in meta.concrete_fields if not field.primary_key]
+    values = [field.get_db_prep_save(field.pre_save(receipt, add=True), connection) for field in fields]
+    sql = (
+        f"INSERT INTO {qn(meta.db_table)} ({', '.join(qn(field.column) for field in fields)}) "
+        f"VALUES ({', '.join(['%s'] * len(fields))}) "
+        f"ON CONFLICT DO NOTHING RETURNING {qn(meta.pk.column)}"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, values)
+        row = cursor.fetchone()
+    if row is None:
+        return False
+    receipt.pk = row[0]
+    receipt._state.adding = False
+    return True
+
+
+def _can_insert_ignoring_conflicts():
+    # INSERT ... ON CONFLICT DO NOTHING RETURNING is PostgreSQL and SQLite 3.35+ syntax
+    return connection.vendor == 'postgresql' or (
+        connection.vendor == 'sqlite' and connection.features.can_return_columns_from_insert
+    )
+
+
+def credit_receipt(user, parsed_data, restaurant, pending=False):
+    """
+    Records the redemption and credits the cashback to `user`. Must run
+    inside the caller's transaction. Raises ReceiptRedemptionError, having
+    written nothing, when the receipt was already redeemed.
+    With `pending=True` the cashback is only recorded as a pending
+    transaction; `confirm_pending_cashback` credits it once Soliq confirms
+    the receipt.
+    Returns the response data of `POST receipt/verify/`.
+    """
+    # Extract data from the parsed QR code receipt
+    receipt_id = parsed_data['receipt_id']
+    total_amount = to_amount(parsed_data['total_amount'])
+
+    cashback_earned = to_amount(total_amount * restaurant.cashback_percentage / 100)
+
+    claimed = claim_receipt(RedeemedReceipt(
+        receipt_id=receipt_id,
+        qr_identity=parsed_data.get('qr_identity'),
+        receipt_number=parsed_data['receipt_number'],
+        user=user,
+        restaurant=restaurant,
+        total_paid=total_amount,
+        cashback_amount=cashback_earned
+    ))
+    if not claimed:
+        raise ReceiptRedemptionError("RECEIPT_ALREADY_REDEEMED", "This receipt has already been redeemed.", 409)
+
+    if pending or cashback_earned <= 0:
+        balance_before = balance_after = wallet_balance(user.id)
+    else:
+        balance_before, balance_after = credit_wallet(user.id, cashback_earned)
+
+    txn_id = f"txn_{uuid.uuid4().hex[:10]}"
+    WalletTransaction.objects.create(
+        transaction_id=txn_id,
+        user=user,
+        type='cashback_add',
+        amount=cashback_earned,
+        balance_before=balance_before,
+        balance_after=balance_after,
+        receipt_id=receipt_id,
+        restaurant_id=restaurant.id,
+        status='pending' if pending else 'completed',
+        metadata={'qr_code': parsed_data['qr_code']} if pending else None
+    )
+
+    return {
+        "receipt_id": receipt_id,
+        "receipt_number": parsed_data['receipt_number'],
+        "total_amount": float(total_amount),
+        "restaurant_name": restaurant.name,
+        "created_at": parsed_data['created_at'],
+        "tin": parsed_data['tin'],
+        "already_redeemed": False,
+        "total_paid": float(total_amount),
+        "cashback_earned": float(cashback_earned),
+        "cashback_status": 'pending' if pending else 'completed',
+        "transaction_id": txn_id,
+        "new_wallet_balance": float(balance_after),
+    }
+
+
+def redeem_receipt(user, parsed_data, restaurant_id=None, pending=False):
+    """
+    Credits the cashback for a verified receipt to `user`'s wallet and returns
+    the response data of `POST receipt/verify/`.
+    Raises ReceiptRedemptionError when the restaurant doesn't match the receipt
+    or the receipt was already redeemed.
+    """
+    restaurant = resolve_receipt_restaurant(parsed_data, restaurant_id)
+
+    with transaction.atomic():
+        return credit_receipt(user, parsed_data, restaurant, pending=pending)
+
+
+def verify_receipts_concurrently(qr_codes, refresh=False):
+    """
+    Runs verify_soliq_receipt for every QR URL on a bounded thread pool.
+    Receipts already redeemed, or repeated within the batch, are rejected
+    from their QR identity without a fetch.
+    Returns `(parsed data, None)` or `(None, SoliqVerificationError or
+    ReceiptRedemptionError)` per URL, in input order.
+    """
+    identities = [receipt_qr_identity(qr_code) for qr_code in qr_codes]
+    redeemed = set(
+        RedeemedReceipt.objects.filter(qr_identity__in=[i for i in identities if i]).values_list('qr_identity', flat=True)
+    )
+    results = [None] * len(qr_codes)
+    to_fetch = []
+    seen = set()
+    for index, identity in enumerate(identities):
+        if identity in redeemed or identity in seen:
+            results[index] = (None, ReceiptRedemptionError(
+                "RECEIPT_ALREADY_REDEEMED", "This receipt has already been redeemed.", 409
+            ))
+            continue
+        if identity:
+            seen.add(identity)
+        to_fetch.append(index)
+
+    # Pool threads queue their pages with the caller's, which stores them
+    pages = getattr(_archive, 'pages', None)
+
+    def verify(index):
+        _archive.pages = pages
+        try:
+            return verify_soliq_receipt(qr_codes[index], refresh=refresh), None
+        except SoliqVerificationError as e:
+            return None, e
+        finally:
+            _archive.pages = None
+
+    if to_fetch:
+        workers = max(1, min(len(to_fetch), settings.SOLIQ_BATCH_WORKERS))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for index, result in zip(to_fetch, executor.map(verify, to_fetch)):
+                results[index] = result
+    return results
+
+
+def redeem_receipts(user, verified, restaurant_id=None):
+    """
+    Redeems a batch of verifications from `verify_receipts_concurrently`
+    in a single transaction. Each receipt gets its own savepoint, so one
+    failure doesn't undo the others.
+    Returns one result dict per receipt, in order.
+    """
+    results = [None] * len(verified)
+    restaurants = {}
+    seen = set()
+    for index, (parsed_data, error) in enumerate(verified):
+        if isinstance(error, ReceiptRedemptionError):
+            results[index] = {"success": False, "error_code": error.error_code, "message": error.message}
+            continue
+        if error is not None:
+            error_code = "SOLIQ_UNAVAILABLE" if isinstance(error, SoliqUnavailableError) else "INVALID_FORMAT"
+            results[index] = {"success": False, "error_code": error_code, "message": error.message}
+            continue
+        if parsed_data['receipt_id'] in seen:
+            results[index] = {
+                "success": False, "error_code": "RECEIPT_ALREADY_REDEEMED",
+                "message": "This receipt has already been redeemed."
+            }
+            continue
+        seen.add(parsed_data['receipt_id'])
+        try:
+            restaurants[index] = resolve_receipt_restaurant(parsed_data, restaurant_id)
+        except ReceiptRedemptionError as e:
+            results[index] = {"success": False, "error_code": e.error_code, "message": e.message}
+
+    if restaurants:
+        with transaction.atomic():
+            for index, restaurant in restaurants.items():
+                try:
+                    with transaction.atomic():
+                        data = credit_receipt(user, verified[index][0], restaurant)
+                except ReceiptRedemptionError as e:
+                    results[index] = {"success": False, "error_code": e.error_code, "message": e.message}
+                else:
+                    results[index] = {"success": True, "data": data}
+    return results
+
+
+def run_receipt_job(job):
+    """
+    Verifies and redeems a claimed ReceiptVerificationJob, recording the
+    outcome the synchronous endpoint would have returned.
+    """
+    try:
+        ensure_receipt_not_redeemed(job.qr_code)
+        with archiving_receipt_pages():
+            parsed_data = verify_soliq_receipt(job.qr_code)
+        job.result = redeem_receipt(job.user, parsed_data, job.restaurant_id)
+        job.status = 'completed'
+        job.http_status = 200
+    except SoliqUnavailableError as e:
+        job.status, job.error_code, job.message, job.http_status = 'failed', "SOLIQ_UNAVAILABLE", e.message, 503
+    except SoliqVerificationError as e:
+        job.status, job.error_code, job.message, job.http_status = 'failed', "INVALID_FORMAT", e.message, 400
+    except ReceiptRedemptionError as e:
+        job.status, job.error_code, job.message, job.http_status = 'failed', e.error_code, e.message, e.status_code
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'result', 'error_code', 'message', 'http_status', 'finished_at'])
+    return job
+
+
+def confirm_pending_cashback(txn, max_attempts=5):
+    """
+    Settles a cashback the fast path recorded as pending from the QR
+    parameters alone. The receipt is scraped as usual; when Soliq shows the
+    same receipt and total the cashback is credited and the transaction
+    completed, otherwise the transaction is marked failed and the receipt
+    stays redeemed, so the same QR can't be tried again. Soliq being
+    unreachable leaves it pending, up to `max_attempts` tries, after which
+    it fails and the receipt is released. Passes made while the Soliq
+    circuit breaker is open aren't counted.
+    Returns the transaction's status afterwards.
+    """
+    qr_code = txn.metadata['qr_code']
+    reason = None
+    retry = False
+    try:
+        with archiving_receipt_pages():
+            parsed_data = verify_soliq_receipt(qr_code)
+    except SoliqUnavailableError:
+        # The breaker is open and Soliq wasn't asked, so this pass doesn't
+        # count as an attempt
+        return txn.status
+    except SoliqVerificationError as e:
+        retry = e.retryable
+        reason = e.message
+    else:
+        expected = receipt_from_qr(qr_code)
+        if parsed_data['receipt_id'] != txn.receipt_id or abs(parsed_data['total_amount'] - expected['total_amount']) > 0.01:
+            reason = "The receipt on Soliq doesn't match its QR code."
+
+    with transaction.atomic():
+        txn = WalletTransaction.objects.select_for_update().get(pk=txn.pk)
+        if txn.status != 'pending':
+            # Settled by another worker in the meantime
+            return txn.status
+
+        metadata = dict(txn.metadata)
+        metadata['confirmation_attempts'] = metadata.get('confirmation_attempts', 0) + 1
+        if reason is None:
+            if txn.amount > 0:
+                txn.balance_before, txn.balance_after = credit_wallet(txn.user_id, txn.amount)
+            txn.status = 'completed'
+        elif retry and metadata['confirmation_attempts'] < max_attempts:
+            metadata['last_error'] = reason
+        else:
+            metadata['reversal_reason'] = reason
+            txn.status = 'failed'
+            if retry:
+                # Never checked against Soliq, so the receipt may be genuine
+                RedeemedReceipt.objects.filter(receipt_id=txn.receipt_id).delete()
+        txn.metadata = metadata
+        txn.save(update_fields=['balance_before', 'balance_after', 'status', 'metadata'])
+    return txn.status
@@ -0,0 +1,79 @@
+from django.core.management import call_command
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_delete, m2m_changed
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .catalog import bump_catalog_version
+from .models import Restaurant, RestaurantImage, RestaurantMenuImage, RestaurantTombstone, Review, Tag
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def refresh_restaurant_rating(sender, instance, **kwargs):
+    # Reviews removed as part of deleting their restaurant need no refresh.
+    if isinstance(kwargs.get('origin'), Restaurant):
+        return
+    Restaurant.update_rating_aggregates(instance.restaurant_id)
+
+
+@receiver(post_save, sender=Restaurant)
+@receiver(post_delete, sender=Restaurant)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=RestaurantImage)
+@receiver(post_delete, sender=RestaurantImage)
+@receiver(post_save, sender=RestaurantMenuImage)
+@receiver(post_delete, sender=RestaurantMenuImage)
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+@receiver(m2m_changed, sender=Restaurant.tags.through)
+def invalidate_catalog_cache(sender, **kwargs):
+    if kwargs.get('action', 'post_').startswith('pre_'):
+        return
+    # Bump after commit so a concurrent request can't re-cache the old rows
+    # under the new version.
+    transaction.on_commit(bump_catalog_version)
+
+
+def touch_restaurants(restaurant_ids):
+    Restaurant.objects.filter(pk__in=restaurant_ids).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=RestaurantImage)
+@receiver(post_delete, sender=RestaurantImage)
+@receiver(post_save, sender=RestaurantMenuImage)
+@receiver(post_delete, sender=RestaurantMenuImage)
+def touch_restaurant_for_image(sender, instance, **kwargs):
+    if isinstance(kwargs.get('origin'), Restaurant):
+        return
+    touch_restaurants([instance.restaurant_id])
+
+
+@receiver(m2m_changed, sender=Restaurant.tags.through)
+def touch_restaurants_for_tag_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action.startswith('post_'):
+            touch_restaurants([instance.pk])
+    elif action in ('post_add', 'post_remove'):
+        touch_restaurants(pk_set)
+    elif action == 'pre_clear':
+        # tag.restaurants.clear() only reveals the affected restaurants beforehand
+        touch_restaurants(instance.restaurants.values('pk'))
+
+
+@receiver(pre_delete, sender=Tag)
+def touch_restaurants_for_tag_delete(sender, instance, **kwargs):
+    # Deleting a tag removes it from restaurants without an m2m_changed signal
+    touch_restaurants(instance.restaurants.values('pk'))
+
+
+@receiver(post_delete, sender=Restaurant)
+def record_restaurant_tombstone(sender, instance, **kwargs):
+    RestaurantTombstone.objects.create(restaurant_id=instance.pk)
+
+
+def create_cache_table(using, **kwargs):
+    # Connected to post_migrate in ApiConfig.ready(), so `migrate` also
+    # creates the database cache table. A no-op for other cache backends.
+    call_command('createcachetable', database=using, verbosity=0)
@@ -0,0 +1,117 @@
+"""
+A local stand-in for the Soliq receipt site, serving the recorded pages in
+api/testdata/soliq/ over HTTP with configurable latency and failures.
+
+    with SoliqStandIn(latency=0.2, error_rate=0.1) as standin:
+        verify_soliq_receipt(standin.receipt_url('uz_labelled_stir.html'))
+
+Used by the receipt corpus tests and the `benchmark_soliq` command; it is
+not wired into any URL or setting.
+"""
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlparse
+
+CORPUS_DIR = Path(__file__).resolve().parent / 'testdata' / 'soliq'
+
+
+def load_corpus():
+    """Returns `{page name: (html, expected outcome)}` from the recorded corpus."""
+    expected = json.loads((CORPUS_DIR / 'expected.json').read_text(encoding='utf-8'))
+    return {
+        name: ((CORPUS_DIR / name).read_text(encoding='utf-8'), outcome)
+        for name, outcome in expected.items()
+    }
+
+
+class SoliqStandInHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out as separate writes; without this the client's
+    # delayed ACK adds ~40 ms to every keep-alive response
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        standin = self.server.standin
+        standin.count_request()
+        if standin.latency:
+            time.sleep(max(0.0, random.gauss(standin.latency, standin.latency * standin.jitter)))
+
+        if standin.reset_rate and random.random() < standin.reset_rate:
+            # Drop the connection without a response, like a reset from upstream
+            self.close_connection = True
+            return
+        if standin.error_rate and random.random() < standin.error_rate:
+            self.send_body(502, b'<html><body>502 Bad Gateway</body></html>')
+            return
+
+        page = standin.pages.get(urlparse(self.path).path.lstrip('/'))
+        if page is None:
+            self.send_body(404, b'<html><body>Not found</body></html>')
+            return
+        self.send_body(200, page.encode('utf-8'))
+
+    def send_body(self, status, body):
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class SoliqStandIn:
+    """
+    Serves `/<page name>?r=...&c=...` from the corpus on a free local port.
+    `latency` is the mean response delay in seconds (normally distributed with
+    `jitter` as the relative spread); `error_rate` and `reset_rate` are the
+    share of requests answered with a 502 or a dropped connection.
+    """
+
+    def __init__(self, latency=0.0, jitter=0.2, error_rate=0.0, reset_rate=0.0, pages=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.reset_rate = reset_rate
+        self.pages = pages if pages is not None else {name: html for name, (html, _) in load_corpus().items()}
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    def count_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def start(self):
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), SoliqStandInHandler)
+        self._server.daemon_threads = True
+        self._server.standin = self
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def receipt_url(self, page, receipt_number='12345', created='20240115123045'):
+        """A QR-style URL for a corpus page; vary `receipt_number` to avoid the receipt cache."""
+        return f"{self.base_url}/{page}?t=EZ000000000001&r={receipt_number}&c={created}&s=000000000000"
@@ -0,0 +1,305 @@
+from unittest import mock
+
+import cloudinary
+import cloudinary_storage.storage  # noqa: F401 - configures cloudinary on import
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from .models import Restaurant, RestaurantImage, RestaurantMenuImage, Review, Tag
+
+User = get_user_model()
+
+
+def create_restaurants(count, tags=(), reviewer=None):
+    restaurants = []
+    for i in range(count):
+        restaurant = Restaurant.objects.create(id=f"rest_{i}", tin=f"{100000000 + i}", name=f"Restaurant {i:03d}")
+        restaurant.tags.set(tags)
+        RestaurantImage.objects.create(restaurant=restaurant, image=f"restaurant_media/{i}.jpg")
+        RestaurantMenuImage.objects.create(restaurant=restaurant, image=f"restaurant_menus/{i}.jpg")
+        if reviewer is not None:
+            Review.objects.create(user=reviewer, restaurant=restaurant, rating=(i % 5) + 1)
+        restaurants.append(restaurant)
+    return restaurants
+
+
+@mock.patch.object(cloudinary.config(), 'cloud_name', 'marsilino-test')
+class RestaurantCatalogQueryBudgetTests(APITestCase):
+    # restaurants, tags, media, menu images, reviews and the liked IDs
+    QUERY_BUDGET = 6
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(phone_number="+998901000001", password="pw")
+        self.tags = [Tag.objects.create(id="halal", name="Halal"), Tag.objects.create(id="cafe", name="Cafe")]
+
+    def assert_list_queries(self, url, expected_count):
+        # Authentication itself is not part of the catalog budget
+        self.client.force_authenticate(self.user)
+        with self.assertNumQueries(self.QUERY_BUDGET):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['data']), expected_count)
+        return response
+
+    def test_restaurant_list_query_count_is_constant(self):
+        create_restaurants(2, tags=self.tags, reviewer=self.user)
+        self.assert_list_queries(reverse('restaurant-list'), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Restaurant.objects.all().delete()
+            create_restaurants(12, tags=self.tags, reviewer=self.user)
+        self.assert_list_queries(reverse('restaurant-list'), 12)
+
+    def test_liked_restaurant_list_query_count_is_constant(self):
+        restaurants = create_restaurants(8, tags=self.tags, reviewer=self.user)
+        self.user.liked_restaurants.set(restaurants[:5])
+        response = self.assert_list_queries(reverse('liked-restaurant-list'), 5)
+        self.assertTrue(all(item['is_liked'] for item in response.json()['data']))
+
+    def test_is_liked_uses_preloaded_ids(self):
+        restaurants = create_restaurants(3)
+        self.user.liked_restaurants.add(restaurants[1])
+        self.client.force_authenticate(self.user)
+
+        data = self.client.get(reverse('restaurant-list')).json()['data']
+
+        self.assertEqual([item['is_liked'] for item in data], [False, True, False])
+
+
+class RestaurantCursorPaginationTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.halal = Tag.objects.create(id="halal", name="Halal")
+        for i in range(5):
+            restaurant = Restaurant.objects.create(id=f"rest_{i}", tin=f"{100000000 + i}", name=f"Restaurant {i}")
+            if i % 2 == 0:
+                restaurant.tags.add(self.halal)
+
+    def test_unpaginated_by_default(self):
+        body = self.client.get(reverse('restaurant-list')).json()
+        self.assertEqual(len(body['data']), 5)
+        self.assertNotIn('next', body)
+
+    def test_cursor_pages_walk_the_whole_catalog_in_name_order(self):
+        names = []
+        body = self.client.get(reverse('restaurant-list'), {'limit': 2}).json()
+        while True:
+            self.assertTrue(body['success'])
+            names.extend(item['name'] for item in body['data'])
+            if not body['next']:
+                break
+            body = self.client.get(body['next']).json()
+
+        self.assertEqual(names, [f"Restaurant {i}" for i in range(5)])
+
+    def test_cursor_pagination_keeps_filters(self):
+        body = self.client.get(reverse('restaurant-list'), {'limit': 2, 'tags': 'halal'}).json()
+        self.assertEqual([item['id'] for item in body['data']], ['rest_0', 'rest_2'])
+        self.assertIn('tags=halal', body['next'])
+
+        body = self.client.get(body['next']).json()
+        self.assertEqual([item['id'] for item in body['data']], ['rest_4'])
+        self.assertIsNone(body['next'])
+
+        body = self.client.get(reverse('restaurant-list'), {'limit': 2, 'id': 'rest_3'}).json()
+        self.assertEqual([item['id'] for item in body['data']], ['rest_3'])
+
+
+class CatalogCacheTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(phone_number="+998901000001", password="pw", language='uz')
+        self.halal = Tag.objects.create(id="halal", name_ru="Халяль", name_uz="Halol", name_en="Halal")
+        self.cafe = Tag.objects.create(id="cafe", name_ru="Кафе", name_uz="Kafe", name_en="Cafe")
+        self.first = Restaurant.objects.create(id="rest_1", tin="100000001", name="First")
+        self.second = Restaurant.objects.create(id="rest_2", tin="100000002", name="Second")
+        self.first.tags.set([self.halal, self.cafe])
+
+    def test_cached_response_is_served_without_queries(self):
+        self.client.get(reverse('restaurant-list'))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('restaurant-list'))
+        self.assertEqual(len(response.json()['data']), 2)
+
+    def test_tags_filter_is_normalized(self):
+        self.client.get(reverse('restaurant-list'), {'tags': 'halal,cafe'})
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('restaurant-list'), {'tags': 'cafe, halal,cafe'})
+        self.assertEqual([item['id'] for item in response.json()['data']], ['rest_1'])
+
+    def test_unused_query_parameters_share_the_cache_entry(self):
+        self.client.get(reverse('restaurant-list'), {'tags': 'halal'})
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('restaurant-list'), {'tags': 'halal', 'x': 'random', 'utm_source': 'ad'})
+        self.assertEqual([item['id'] for item in response.json()['data']], ['rest_1'])
+
+        # Parameters the view reads still get their own entry
+        response = self.client.get(reverse('restaurant-list'), {'id': 'rest_2'})
+        self.assertEqual([item['id'] for item in response.json()['data']], ['rest_2'])
+
+    def tag_names(self, **headers):
+        data = self.client.get(reverse('tag-list'), **headers).json()['data']
+        return {item['id']: item['name'] for item in data}
+
+    def test_cache_is_keyed_by_language(self):
+        self.assertEqual(self.tag_names(HTTP_ACCEPT_LANGUAGE='ru')['halal'], "Халяль")
+        self.assertEqual(self.tag_names(HTTP_ACCEPT_LANGUAGE='en')['halal'], "Halal")
+
+        # Authenticated users get their preferred language
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.tag_names(HTTP_ACCEPT_LANGUAGE='en')['halal'], "Halol")
+
+    def test_is_liked_is_overlaid_per_user(self):
+        self.client.get(reverse('restaurant-list'), HTTP_ACCEPT_LANGUAGE='uz')
+        self.user.liked_restaurants.add(self.second)
+        self.client.force_authenticate(self.user)
+
+        # Only the liked IDs are loaded; the catalog itself comes from the cache
+        with self.assertNumQueries(1):
+            data = self.client.get(reverse('restaurant-list')).json()['data']
+        self.assertEqual([item['is_liked'] for item in data], [False, True])
+
+        self.client.force_authenticate(None)
+        data = self.client.get(reverse('restaurant-list')).json()['data']
+        self.assertEqual([item['is_liked'] for item in data], [False, False])
+
+    def test_catalog_changes_invalidate_the_cache(self):
+        self.client.get(reverse('restaurant-list'))
+        self.client.get(reverse('tag-list'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.second.name = "Renamed"
+            self.second.save()
+        names = [item['name'] for item in self.client.get(reverse('restaurant-list')).json()['data']]
+        self.assertIn("Renamed", names)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.second.tags.add(self.halal)
+        response = self.client.get(reverse('restaurant-list'), {'tags': 'halal'})
+        self.assertEqual(len(response.json()['data']), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Review.objects.create(user=self.user, restaurant=self.first, rating=4)
+        data = self.client.get(reverse('restaurant-list')).json()['data']
+        self.assertEqual(data[0]['average_rating'], 4.0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cafe.delete()
+        self.assertEqual(len(self.client.get(reverse('tag-list')).json()['data']), 1)
+
+
+class CatalogETagTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(phone_number="+998901000001", password="pw")
+        self.tag = Tag.objects.create(id="halal", name="Halal")
+        self.restaurant = Restaurant.objects.create(id="rest_1", tin="100000001", name="First")
+
+    def test_matching_etag_returns_not_modified_without_serializing(self):
+        for name in ('restaurant-list', 'tag-list'):
+            response = self.client.get(reverse(name))
+            etag = response['ETag']
+            self.assertTrue(etag.startswith('"'))
+
+            with mock.patch('api.views.get_cached_catalog') as get_cached_catalog, self.assertNumQueries(0):
+                response = self.client.get(reverse(name), HTTP_IF_NONE_MATCH=etag)
+            get_cached_catalog.assert_not_called()
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response['ETag'], etag)
+            self.assertEqual(response.content, b'')
+
+    def test_etag_changes_with_catalog_language_and_likes(self):
+        etag = self.client.get(reverse('restaurant-list'))['ETag']
+
+        self.assertNotEqual(self.client.get(reverse('restaurant-list'), HTTP_ACCEPT_LANGUAGE='en')['ETag'], etag)
+        self.assertNotEqual(self.client.get(reverse('restaurant-list'), {'tags': 'halal'})['ETag'], etag)
+
+        self.client.force_authenticate(self.user)
+        user_etag = self.client.get(reverse('restaurant-list'), HTTP_ACCEPT_LANGUAGE='ru')['ETag']
+        self.user.liked_restaurants.add(self.restaurant)
+        response = self.client.get(reverse('restaurant-list'), HTTP_ACCEPT_LANGUAGE='ru', HTTP_IF_NONE_MATCH=user_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['data'][0]['is_liked'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.restaurant.name = "Renamed"
+            self.restaurant.save()
+        response = self.client.get(reverse('restaurant-list'), HTTP_ACCEPT_LANGUAGE='ru', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['data'][0]['name'], "Renamed")
+
+
+class RestaurantTagFilterTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        tags = {tag_id: Tag.objects.create(id=tag_id, name=tag_id) for tag_id in ('halal', 'cafe', 'terrace')}
+        for restaurant_id, tag_ids in (('rest_1', ['halal', 'cafe', 'terrace']), ('rest_2', ['halal', 'cafe']), ('rest_3', ['terrace']), ('rest_4', [])):
+            restaurant = Restaurant.objects.create(id=restaurant_id, tin=restaurant_id, name=restaurant_id)
+            restaurant.tags.set([tags[tag_id] for tag_id in tag_ids])
+
+    def filtered_ids(self, **params):
+        data = self.client.get(reverse('restaurant-list'), params).json()['data']
+        return [item['id'] for item in data]
+
+    def test_all_of_tags_by_default(self):
+        self.assertEqual(self.filtered_ids(tags='halal'), ['rest_1', 'rest_2'])
+        self.assertEqual(self.filtered_ids(tags='halal,cafe'), ['rest_1', 'rest_2'])
+        self.assertEqual(self.filtered_ids(tags='halal,cafe,terrace'), ['rest_1'])
+        self.assertEqual(self.filtered_ids(tags='halal,unknown'), [])
+
+    def test_any_of_tags(self):
+        self.assertEqual(self.filtered_ids(tags='cafe,terrace', tags_match='any'), ['rest_1', 'rest_2', 'rest_3'])
+        self.assertEqual(self.filtered_ids(tags='unknown', tags_match='any'), [])
+
+    def test_repeated_tags_are_counted_once(self):
+        self.assertEqual(self.filtered_ids(tags='terrace,terrace'), ['rest_1', 'rest_3'])
+
+    def test_tag_filter_runs_without_distinct(self):
+        queryset = Restaurant.objects.with_tags(['halal', 'cafe', 'terrace'])
+        self.assertFalse(queryset.query.distinct)
+        self.assertEqual(list(queryset.values_list('pk', flat=True)), ['rest_1'])
+
+
+@mock.patch.object(cloudinary.config(), 'cloud_name', 'marsilino-test')
+class RestaurantSparseFieldsTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(phone_number="+998901000001", password="pw")
+        self.restaurants = create_restaurants(3, tags=[Tag.objects.create(id="halal", name="Halal")], reviewer=self.user)
+
+    def test_card_view_selects_only_card_columns(self):
+        with self.assertNumQueries(1) as context:
+            response = self.client.get(reverse('restaurant-list'), {'view': 'card'})
+        item = response.json()['data'][0]
+        self.assertEqual(set(item), {'id', 'name', 'logo', 'cashback_percentage', 'average_rating'})
+        self.assertEqual(item['average_rating'], 1.0)
+
+        sql = context.captured_queries[0]['sql']
+        self.assertIn('"rating_sum"', sql)
+        self.assertNotIn('"description', sql)
+        self.assertNotIn('"location_description_en"', sql)
+
+    def test_fields_limit_serialized_fields_and_prefetches(self):
+        self.user.liked_restaurants.add(self.restaurants[0])
+        self.client.force_authenticate(self.user)
+
+        # restaurants, tags and the liked IDs
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('restaurant-list'), {'fields': 'tags,is_liked,unknown'})
+        data = response.json()['data']
+        self.assertEqual(set(data[0]), {'id', 'tags', 'is_liked'})
+        self.assertEqual([item['is_liked'] for item in data], [True, False, False])
+        self.assertEqual(data[0]['tags'][0]['id'], 'halal')
+
+    def test_card_view_works_with_pagination_and_liked_overlay(self):
+        self.user.liked_restaurants.add(self.restaurants[0])
+        self.client.force_authenticate(self.user)
+        body = self.client.get(reverse('restaurant-list'), {'view': 'card', 'limit': 2}).json()
+        self.assertEqual(len(body['data']), 2)
+        self.assertNotIn('is_liked', body['data'][0])
+
+        body = self.client.get(body['next']).json()
+        self.assertEqual([item['id'] for item in body['data']], ['rest_2'])
@@ -0,0 +1,84 @@
+from unittest import mock
+
+import cloudinary
+import cloudinary_storage.storage  # noqa: F401 - configures cloudinary on import
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from .models import Restaurant, RestaurantMenuImage, Review, Tag
+
+User = get_user_model()
+
+
+@mock.patch.object(cloudinary.config(), 'cloud_name', 'marsilino-test')
+class RestaurantChangesTests(APITestCase):
+    def setUp(self):
+        self.halal = Tag.objects.create(id="halal", name="Halal")
+        self.first = Restaurant.objects.create(id="rest_1", tin="100000001", name="First")
+        self.second = Restaurant.objects.create(id="rest_2", tin="100000002", name="Second")
+        self.first.tags.add(self.halal)
+        # Pretend everything was last synced long ago
+        past = timezone.now() - timezone.timedelta(days=1)
+        Restaurant.objects.update(updated_at=past)
+        Tag.objects.update(updated_at=past)
+        self.since = (timezone.now() - timezone.timedelta(hours=1)).isoformat()
+
+    def get_changes(self, since=None):
+        params = {'since': since} if since else {}
+        response = self.client.get(reverse('restaurant-changes'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()['data']
+
+    def test_full_sync_without_since(self):
+        data = self.get_changes()
+        self.assertEqual([item['id'] for item in data['upserted']], ['rest_1', 'rest_2'])
+        self.assertEqual(data['deleted'], [])
+        self.assertTrue(data['server_time'].endswith('Z'))
+
+    def test_nothing_changed(self):
+        data = self.get_changes(self.since)
+        self.assertEqual(data['upserted'], [])
+        self.assertEqual(data['deleted'], [])
+
+    def test_restaurant_and_related_changes_are_upserted(self):
+        self.second.save()
+        self.assertEqual([item['id'] for item in self.get_changes(self.since)['upserted']], ['rest_2'])
+
+        Restaurant.objects.update(updated_at=timezone.now() - timezone.timedelta(days=1))
+        RestaurantMenuImage.objects.create(restaurant=self.first, image="restaurant_menus/1.jpg")
+        self.assertEqual([item['id'] for item in self.get_changes(self.since)['upserted']], ['rest_1'])
+
+        Restaurant.objects.update(updated_at=timezone.now() - timezone.timedelta(days=1))
+        self.halal.name = "Halol"
+        self.halal.save()
+        self.assertEqual([item['id'] for item in self.get_changes(self.since)['upserted']], ['rest_1'])
+
+        Restaurant.objects.update(updated_at=timezone.now() - timezone.timedelta(days=1))
+        Tag.objects.update(updated_at=timezone.now() - timezone.timedelta(days=1))
+        self.second.tags.add(self.halal)
+        self.assertEqual([item['id'] for item in self.get_changes(self.since)['upserted']], ['rest_2'])
+
+        Restaurant.objects.update(updated_at=timezone.now() - timezone.timedelta(days=1))
+        user = User.objects.create_user(phone_number="+998901000001", password="pw")
+        Review.objects.create(user=user, restaurant=self.first, rating=5)
+        self.assertEqual([item['id'] for item in self.get_changes(self.since)['upserted']], ['rest_1'])
+
+    def test_deleted_restaurants_are_reported(self):
+        self.second.delete()
+        data = self.get_changes(self.since)
+        self.assertEqual(data['upserted'], [])
+        self.assertEqual(data['deleted'], ['rest_2'])
+
+        Restaurant.objects.create(id="rest_2", tin="100000002", name="Second again")
+        data = self.get_changes(self.since)
+        self.assertEqual([item['id'] for item in data['upserted']], ['rest_2'])
+        self.assertEqual(data['deleted'], [])
+
+    def test_since_accepts_unencoded_offset_and_rejects_garbage(self):
+        self.assertEqual(self.get_changes(self.since.replace('+', ' '))['upserted'], [])
+
+        response = self.client.get(reverse('restaurant-changes'), {'since': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error_code'], 'INVALID_SINCE')
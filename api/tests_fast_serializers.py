@@ -0,0 +1,78 @@
+from decimal import Decimal
+from unittest import mock
+
+import cloudinary
+import cloudinary_storage.storage  # noqa: F401 - configures cloudinary on import
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from .models import Restaurant, RestaurantImage, RestaurantMenuImage, Review, Tag, WalletTransaction
+
+User = get_user_model()
+
+
+@mock.patch.object(cloudinary.config(), 'cloud_name', 'marsilino-test')
+class FastSerializerParityTests(APITestCase):
+    """The fast serializers must render exactly the bytes DRF renders."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(phone_number="+998901000001", password="pw", language='en')
+        other = User.objects.create_user(phone_number="+998901000002", password="pw")
+        halal = Tag.objects.create(id="halal", name_ru="Халяль", name_en="Halal", icon_url="https://example.com/h.png")
+        Tag.objects.create(id="cafe", name_ru="Кафе", name_en="")
+
+        first = Restaurant.objects.create(
+            id="rest_1", tin="100000001", name_ru="Первый", name_en="First",
+            description_ru="Описание", cashback_percentage=Decimal('7.5'),
+            logo="restaurant_logos/first.png", location_description_en="Near the park",
+        )
+        second = Restaurant.objects.create(id="rest_2", tin="100000002", name_ru="Второй", cashback_percentage=Decimal('0.10'))
+        first.tags.set([halal])
+        RestaurantImage.objects.create(restaurant=first, image="restaurant_media/a.jpg")
+        RestaurantImage.objects.create(restaurant=first, image="restaurant_media/b.jpg")
+        RestaurantMenuImage.objects.create(restaurant=second, image="restaurant_menus/menu.jpg")
+        Review.objects.create(user=self.user, restaurant=first, rating=5)
+        Review.objects.create(user=other, restaurant=first, rating=2)
+        self.user.liked_restaurants.add(second)
+
+        for i, (kind, amount) in enumerate([('cashback_add', Decimal('1500.5')), ('transfer_out', Decimal('20'))]):
+            WalletTransaction.objects.create(
+                transaction_id=f"txn_{i}", user=self.user, type=kind, amount=amount,
+                balance_before=Decimal('0'), balance_after=amount,
+                receipt_id="soliq_1" if kind == 'cashback_add' else None,
+                card_last_four="1234" if kind == 'transfer_out' else None,
+            )
+
+    def assert_same_bytes(self, url, params=None, **headers):
+        responses = []
+        for enabled in (False, True):
+            cache.clear()
+            with override_settings(API_FAST_SERIALIZATION=enabled):
+                response = self.client.get(url, params or {}, **headers)
+            self.assertEqual(response.status_code, 200)
+            responses.append(response.content)
+        self.assertEqual(responses[0], responses[1])
+
+    def test_restaurant_list(self):
+        url = reverse('restaurant-list')
+        for language in ('ru', 'en', 'uz'):
+            self.assert_same_bytes(url, HTTP_ACCEPT_LANGUAGE=language)
+        self.assert_same_bytes(url, {'view': 'card'})
+        self.assert_same_bytes(url, {'fields': 'tags,media,reviews,is_liked'})
+        self.assert_same_bytes(url, {'limit': 1})
+
+        self.client.force_authenticate(self.user)
+        self.assert_same_bytes(url)
+        self.assert_same_bytes(url, {'tags': 'halal', 'include_reviews': 'false'})
+
+    def test_tag_list(self):
+        for language in ('ru', 'en'):
+            self.assert_same_bytes(reverse('tag-list'), HTTP_ACCEPT_LANGUAGE=language)
+
+    def test_wallet_transaction_list(self):
+        self.client.force_authenticate(self.user)
+        self.assert_same_bytes(reverse('wallet-transactions'))
+        self.assert_same_bytes(reverse('wallet-transactions'), {'limit': 1, 'page': 2})
@@ -0,0 +1,68 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from .models import Restaurant, Review
+
+User = get_user_model()
+
+
+class RestaurantRatingAggregateTests(APITestCase):
+    def setUp(self):
+        self.restaurant = Restaurant.objects.create(id="rest_1", tin="123456789", name="Test")
+        self.alice = User.objects.create_user(phone_number="+998901000001", password="pw")
+        self.bob = User.objects.create_user(phone_number="+998901000002", password="pw")
+
+    def test_review_changes_keep_aggregates_exact(self):
+        Review.objects.create(user=self.alice, restaurant=self.restaurant, rating=5)
+        review = Review.objects.create(user=self.bob, restaurant=self.restaurant, rating=2)
+        self.restaurant.refresh_from_db()
+        self.assertEqual(self.restaurant.total_reviews, 2)
+        self.assertEqual(self.restaurant.average_rating, 3.5)
+        self.assertEqual(self.restaurant.rating_histogram, {1: 0, 2: 1, 3: 0, 4: 0, 5: 1})
+
+        review.rating = 4
+        review.save()
+        self.restaurant.refresh_from_db()
+        self.assertEqual(self.restaurant.average_rating, 4.5)
+        self.assertEqual(self.restaurant.rating_histogram, {1: 0, 2: 0, 3: 0, 4: 1, 5: 1})
+
+        review.delete()
+        self.restaurant.refresh_from_db()
+        self.assertEqual(self.restaurant.total_reviews, 1)
+        self.assertEqual(self.restaurant.average_rating, 5.0)
+
+    def test_reading_rating_costs_no_queries(self):
+        Review.objects.create(user=self.alice, restaurant=self.restaurant, rating=3)
+        restaurant = Restaurant.objects.get(pk=self.restaurant.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(restaurant.average_rating, 3.0)
+            self.assertEqual(restaurant.total_reviews, 1)
+
+    def test_rate_endpoint_returns_updated_aggregates(self):
+        Review.objects.create(user=self.bob, restaurant=self.restaurant, rating=1)
+        self.client.force_authenticate(self.alice)
+        url = reverse('restaurant-rate', args=[self.restaurant.id])
+
+        response = self.client.post(url, {'rating': 4})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['data']['average_rating'], 2.5)
+        self.assertEqual(response.json()['data']['total_reviews'], 2)
+
+        response = self.client.post(url, {'rating': 5})
+        self.assertEqual(response.json()['data']['average_rating'], 3.0)
+        self.assertEqual(response.json()['data']['total_reviews'], 2)
+
+    def test_rebuild_command_repairs_drift(self):
+        Review.objects.create(user=self.alice, restaurant=self.restaurant, rating=4)
+        Restaurant.objects.filter(pk=self.restaurant.pk).update(rating_sum=0, rating_count=0, rating_4_count=0)
+
+        call_command('rebuild_rating_aggregates', stdout=StringIO())
+
+        self.restaurant.refresh_from_db()
+        self.assertEqual(self.restaurant.total_reviews, 1)
+        self.assertEqual(self.restaurant.average_rating, 4.0)
+        self.assertEqual(self.restaurant.rating_4_count, 1)
@@ -0,0 +1,71 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from .models import RedeemedReceipt, Restaurant, WalletTransaction
+from .soliq_standin import SoliqStandIn
+
+User = get_user_model()
+
+
+class ReceiptVerifyBatchTests(APITestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.standin = SoliqStandIn(latency=0.3, jitter=0).start()
+        cls.addClassCleanup(cls.standin.stop)
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(phone_number="+998901112233", password="pw")
+        self.client.force_authenticate(self.user)
+        Restaurant.objects.create(id="rest_1", tin="305123456", name="Marsilino", cashback_percentage=10)
+
+    def test_receipts_are_fetched_concurrently_and_credited_once(self):
+        qr_codes = [self.standin.receipt_url('uz_labelled_stir.html', receipt_number=str(n)) for n in range(1, 5)]
+
+        started = time.monotonic()
+        response = self.client.post(reverse('receipt-verify-batch'), {'qr_codes': qr_codes}, format='json')
+        elapsed = time.monotonic() - started
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()['data']
+        self.assertEqual(data['redeemed_count'], 4)
+        self.assertEqual(data['total_cashback_earned'], 4000.0)
+        self.assertEqual(data['new_wallet_balance'], 4000.0)
+        # Four 0.3s fetches; sequential would take 1.2s
+        self.assertLess(elapsed, 0.9)
+
+        balances = list(
+            WalletTransaction.objects.filter(user=self.user).order_by('balance_after').values_list('balance_after', flat=True)
+        )
+        self.assertEqual([float(b) for b in balances], [1000.0, 2000.0, 3000.0, 4000.0])
+
+    def test_per_receipt_results(self):
+        qr_codes = [
+            self.standin.receipt_url('uz_labelled_stir.html', receipt_number='1'),
+            self.standin.receipt_url('uz_labelled_stir.html', receipt_number='1'),
+            self.standin.receipt_url('fraudulent.html', receipt_number='2'),
+            self.standin.receipt_url('ru_inn_itogo.html', receipt_number='3'),
+        ]
+
+        results = self.client.post(reverse('receipt-verify-batch'), {'qr_codes': qr_codes}, format='json').json()['data']['results']
+
+        self.assertEqual([r['qr_code'] for r in results], qr_codes)
+        self.assertTrue(results[0]['success'])
+        self.assertEqual(results[0]['data']['cashback_earned'], 1000.0)
+        self.assertEqual(
+            [r.get('error_code') for r in results[1:]],
+            ['RECEIPT_ALREADY_REDEEMED', 'INVALID_FORMAT', 'RESTAURANT_MISMATCH']
+        )
+        self.assertEqual(RedeemedReceipt.objects.count(), 1)
+
+    def test_rejects_invalid_batches(self):
+        url = reverse('receipt-verify-batch')
+        self.assertEqual(self.client.post(url, {'qr_codes': []}, format='json').json()['error_code'], 'MISSING_DATA')
+        with self.settings(SOLIQ_BATCH_MAX_RECEIPTS=2):
+            response = self.client.post(url, {'qr_codes': ['a', 'b', 'c']}, format='json')
+        self.assertEqual(response.json()['error_code'], 'TOO_MANY_RECEIPTS')
@@ -0,0 +1,141 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from . import services
+from .models import RedeemedReceipt, Restaurant, WalletTransaction
+from .tests_soliq import QR_URL, fake_response
+
+User = get_user_model()
+
+FAST_QR_URL = "https://ofd.soliq.uz/check?t=123456789&r=12345&c=20240115123045&s=30000.00"
+
+
+class ReceiptFastPathTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(phone_number="+998901112233", password="pw")
+        self.client.force_authenticate(self.user)
+        Restaurant.objects.create(id="rest_1", tin="123456789", name="First", cashback_percentage=5)
+        self.session = mock.Mock()
+        self.session.get.return_value = fake_response(200)
+        patcher = mock.patch.object(services, 'get_soliq_session', return_value=self.session)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def verify_fast(self, qr_code=FAST_QR_URL):
+        return self.client.post(reverse('receipt-verify'), {'qr_code_url': qr_code, 'fast': True}, format='json')
+
+    def confirm(self, *args):
+        call_command('confirm_pending_receipts', '--once', *args, stdout=StringIO())
+        return WalletTransaction.objects.get(user=self.user)
+
+    def test_fast_verify_records_pending_cashback_without_soliq(self):
+        response = self.verify_fast()
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()['data']
+        self.assertEqual(data['cashback_status'], 'pending')
+        self.assertEqual(data['cashback_earned'], 1500.0)
+        self.assertEqual(data['new_wallet_balance'], 0.0)
+        self.session.get.assert_not_called()
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.wallet_balance, 0)
+        self.assertEqual(WalletTransaction.objects.get(user=self.user).status, 'pending')
+
+        # The receipt is taken until the cashback is settled
+        response = self.verify_fast()
+        self.assertEqual(response.json()['error_code'], 'RECEIPT_ALREADY_REDEEMED')
+
+    def test_confirmation_credits_matching_receipt(self):
+        self.verify_fast()
+
+        txn = self.confirm()
+
+        self.assertEqual(txn.status, 'completed')
+        self.assertEqual((txn.balance_before, txn.balance_after), (0, 1500))
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.wallet_balance, 1500)
+        self.assertEqual(self.client.get(reverse('wallet')).json()['data']['total_earned'], 1500.0)
+
+    def test_confirmation_reverses_mismatched_total(self):
+        self.verify_fast(FAST_QR_URL.replace("s=30000.00", "s=900000.00"))
+
+        txn = self.confirm()
+
+        self.assertEqual(txn.status, 'failed')
+        self.assertIn('reversal_reason', txn.metadata)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.wallet_balance, 0)
+        self.assertTrue(RedeemedReceipt.objects.exists())
+
+    def test_rejected_receipt_cannot_be_redeemed_again(self):
+        forged_qr = FAST_QR_URL.replace("s=30000.00", "s=900000.00")
+        self.verify_fast(forged_qr)
+        self.confirm()
+
+        for response in (
+            self.verify_fast(forged_qr),
+            self.verify_fast(),
+            self.client.post(reverse('receipt-verify'), {'qr_code_url': FAST_QR_URL}, format='json'),
+        ):
+            self.assertEqual(response.status_code, 409)
+            self.assertEqual(response.json()['error_code'], 'RECEIPT_ALREADY_REDEEMED')
+        self.assertEqual(WalletTransaction.objects.filter(user=self.user).count(), 1)
+
+    def test_confirmation_reverses_fraudulent_receipt(self):
+        self.session.get.return_value = fake_response(200, text="<p>Chek qalbaki ravishda yaratilgan</p>")
+        self.verify_fast()
+
+        self.assertEqual(self.confirm().status, 'failed')
+        self.assertTrue(RedeemedReceipt.objects.exists())
+
+    def test_unreachable_soliq_is_retried_then_given_up(self):
+        self.session.get.return_value = fake_response(404)
+        self.verify_fast()
+
+        txn = self.confirm('--max-attempts', '2')
+        self.assertEqual(txn.status, 'pending')
+        self.assertEqual(txn.metadata['confirmation_attempts'], 1)
+
+        txn = self.confirm('--max-attempts', '2')
+        self.assertEqual(txn.status, 'failed')
+        self.assertFalse(RedeemedReceipt.objects.exists())
+
+    def test_open_breaker_does_not_use_up_attempts(self):
+        self.verify_fast()
+
+        with mock.patch.object(services, 'verify_soliq_receipt', side_effect=services.SoliqUnavailableError(30)):
+            for _ in range(3):
+                txn = self.confirm('--max-attempts', '2')
+        self.assertEqual(txn.status, 'pending')
+        self.assertNotIn('confirmation_attempts', txn.metadata)
+        self.assertTrue(RedeemedReceipt.objects.exists())
+
+        self.assertEqual(self.confirm('--max-attempts', '2').status, 'completed')
+
+    def test_qr_without_offline_values_falls_back_to_soliq(self):
+        response = self.verify_fast(QR_URL)
+
+        self.assertEqual(response.json()['data']['cashback_status'], 'completed')
+        self.session.get.assert_called_once()
+
+    def test_qr_total_too_large_to_store_falls_back_to_soliq(self):
+        response = self.verify_fast(FAST_QR_URL.replace("s=30000.00", "s=1e15"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['data']['cashback_status'], 'completed')
+        self.session.get.assert_called_once()
+
+    @override_settings(SOLIQ_FAST_PATH_ENABLED=False)
+    def test_fast_path_can_be_switched_off(self):
+        response = self.verify_fast()
+
+        self.assertEqual(response.json()['data']['cashback_status'], 'completed')
+        self.session.get.assert_called_once()
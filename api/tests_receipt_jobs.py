@@ -0,0 +1,86 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from . import services
+from .models import ReceiptVerificationJob, Restaurant
+from .tests_soliq import QR_URL, fake_response
+
+User = get_user_model()
+
+
+class ReceiptVerificationJobTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(phone_number="+998901112233", password="pw")
+        self.client.force_authenticate(self.user)
+        Restaurant.objects.create(id="rest_1", tin="123456789", name="First", cashback_percentage=5)
+        self.session = mock.Mock()
+        self.session.get.return_value = fake_response(200)
+        patcher = mock.patch.object(services, 'get_soliq_session', return_value=self.session)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def queue(self, **data):
+        response = self.client.post(reverse('receipt-verify'), {'qr_code_url': QR_URL, 'async': True, **data}, format='json')
+        self.assertEqual(response.status_code, 202)
+        return response
+
+    def process(self):
+        call_command('process_receipt_jobs', '--once', stdout=StringIO())
+
+    def test_async_verify_is_queued_then_completed(self):
+        response = self.queue()
+        job_id = response.json()['data']['job_id']
+        self.assertEqual(response.json()['data']['status'], 'pending')
+        self.assertTrue(response['Location'].endswith(f"/receipt/verify/{job_id}/"))
+        self.session.get.assert_not_called()
+
+        status_url = reverse('receipt-verify-job', args=[job_id])
+        self.assertEqual(self.client.get(status_url).json()['data']['status'], 'pending')
+
+        self.process()
+
+        data = self.client.get(status_url).json()['data']
+        self.assertEqual(data['status'], 'completed')
+        self.assertEqual(data['result']['cashback_earned'], 1500.0)
+        self.assertEqual(data['result']['new_wallet_balance'], 1500.0)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.wallet_balance, 1500)
+
+    def test_failed_job_keeps_the_sync_error(self):
+        Restaurant.objects.create(id="rest_2", tin="999999999", name="Second")
+        job_id = self.queue(restaurant_id="rest_2").json()['data']['job_id']
+
+        self.process()
+
+        data = self.client.get(reverse('receipt-verify-job', args=[job_id])).json()['data']
+        self.assertEqual(data['status'], 'failed')
+        self.assertEqual(data['error_code'], 'RESTAURANT_MISMATCH')
+        self.assertEqual(data['http_status'], 422)
+
+    def test_stale_jobs_are_reclaimed_then_given_up(self):
+        job_id = self.queue().json()['data']['job_id']
+        ReceiptVerificationJob.objects.filter(job_id=job_id).update(status='processing', started_at="2020-01-01T00:00:00Z", attempts=1)
+
+        self.process()
+        job = ReceiptVerificationJob.objects.get(job_id=job_id)
+        self.assertEqual((job.status, job.attempts), ('completed', 2))
+
+        ReceiptVerificationJob.objects.filter(job_id=job_id).update(status='processing', started_at="2020-01-01T00:00:00Z", attempts=3)
+        self.process()
+        self.assertEqual(ReceiptVerificationJob.objects.get(job_id=job_id).error_code, 'VERIFICATION_TIMEOUT')
+
+    def test_jobs_are_private(self):
+        job_id = self.queue().json()['data']['job_id']
+        other = User.objects.create_user(phone_number="+998909998877", password="pw")
+        self.client.force_authenticate(other)
+
+        response = self.client.get(reverse('receipt-verify-job', args=[job_id]))
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json()['error_code'], 'JOB_NOT_FOUND')
@@ -0,0 +1,95 @@
+import random
+import re
+
+from bs4 import BeautifulSoup
+from django.test import SimpleTestCase
+
+from .receipt_parser import extract_receipt_fields
+
+
+def legacy_extract(html):
+    """The BeautifulSoup lookup `extract_receipt_fields` replaced, kept as the reference."""
+    soup = BeautifulSoup(html, 'html.parser')
+    tin = None
+    total_amount = None
+    tds = soup.find_all('td')
+    for idx, td in enumerate(tds):
+        text = td.text.strip()
+        if 'STIR' in text or 'INN' in text or 'СТИР' in text or 'ИНН' in text:
+            for offset in range(1, 4):
+                if idx + offset < len(tds):
+                    cand_text = tds[idx + offset].text.strip()
+                    if re.match(r'^\d{9}$', cand_text) or re.match(r'^\d{14}$', cand_text):
+                        tin = cand_text
+                        break
+            if tin:
+                break
+    if not tin:
+        for i in soup.find_all('i'):
+            text = i.text.strip()
+            if re.match(r'^\d{9}$', text):
+                tin = text
+                break
+    for idx, td in enumerate(tds):
+        if td.text and ("Jami to`lov:" in td.text or "Jami to'lov:" in td.text or "Итого:" in td.text):
+            if idx + 1 < len(tds):
+                candidate = tds[idx + 1].text.strip()
+                cand_clean = candidate.replace(',', '').replace(' ', '')
+                try:
+                    total_amount = float(cand_clean)
+                    break
+                except ValueError:
+                    for offset in range(2, 4):
+                        if idx + offset < len(tds):
+                            c = tds[idx + offset].text.strip().replace(',', '').replace(' ', '')
+                            try:
+                                total_amount = float(c)
+                                break
+                            except ValueError:
+                                pass
+                if total_amount is not None:
+                    break
+    return tin, total_amount
+
+
+FRAGMENTS = [
+    '<td>Komitent STIR:</td>', '<td>INN</td>', '<td>СТИР</td>', '<td>ИНН:</td>',
+    '<td>123456789</td>', '<td> 12345678901234 </td>', '<td>98765432</td>', '<td></td>', '<td/>',
+    '<td>Jami to`lov:</td>', "<td>Jami to'lov:</td>", '<td>Итого:</td>',
+    '<td>30,000.00</td>', '<td>1 250 000.50</td>', '<td>so`m</td>', '<td>&nbsp;</td>',
+    '<i>555666777</i>', '<i>12</i>', '<td><i>444555666</i></td>', '<td>7<b>77</b>888999</td>',
+    '<td>', '</td>', '<tr>', '</tr>', '<table>', '</table>', '<b>', '</b>', '<br>',
+    '<td><script>var STIR = 1;</script>x</td>', '<style>td{}</style>', '<!-- INN 111222333 -->',
+    '<td>Jami to`lov:<td>42</td></td>', '<td>Jami to&#96;lov:</td>', '<td>1&#44;000</td>',
+]
+
+
+class ReceiptParserTests(SimpleTestCase):
+    def assertMatchesLegacy(self, html):
+        self.assertEqual(extract_receipt_fields(html), legacy_extract(html), html)
+
+    def test_known_layouts(self):
+        self.assertEqual(
+            extract_receipt_fields(
+                '<table><tr><td>Komitent STIR:</td><td>123456789</td></tr>'
+                '<tr><td>Jami to`lov:</td><td>30,000.00</td></tr></table>'
+            ),
+            ('123456789', 30000.0),
+        )
+        self.assertEqual(
+            extract_receipt_fields('<p><i>987654321</i></p><table><tr><td>Итого:</td><td></td><td>1 500</td></table>'),
+            ('987654321', 1500.0),
+        )
+        self.assertEqual(extract_receipt_fields('<html><body>blocked</body></html>'), (None, None))
+
+    def test_stops_early_on_large_pages(self):
+        head = '<table><tr><td>STIR</td><td>123456789</td></tr><tr><td>Итого:</td><td>10</td></tr></table>'
+        # Tens of thousands of unclosed cells after the values; parsing them
+        # all would take seconds
+        html = head + '<td>' * 50000 + 'INN 111111111'
+        self.assertEqual(extract_receipt_fields(html), ('123456789', 10.0))
+
+    def test_matches_legacy_on_generated_pages(self):
+        rng = random.Random(1234)
+        for _ in range(500):
+            self.assertMatchesLegacy(''.join(rng.choice(FRAGMENTS) for _ in range(rng.randint(1, 25))))
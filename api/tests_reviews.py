@@ -0,0 +1,62 @@
+import base64
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from .models import Restaurant, Review
+
+User = get_user_model()
+
+
+class RestaurantReviewListTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.restaurant = Restaurant.objects.create(id="rest_1", tin="100000001", name="First")
+        created_at = timezone.now()
+        for i in range(5):
+            user = User.objects.create_user(phone_number=f"+99890100000{i}", password="pw")
+            Review.objects.create(user=user, restaurant=self.restaurant, rating=i + 1)
+        # Two reviews share a timestamp so the id has to break the tie
+        Review.objects.filter(rating__in=[2, 3]).update(created_at=created_at)
+
+    def test_keyset_pages_cover_every_review_once(self):
+        url = reverse('restaurant-reviews', args=[self.restaurant.id])
+        body = self.client.get(url, {'limit': 2}).json()
+        ratings = []
+        while True:
+            self.assertTrue(body['success'])
+            self.assertLessEqual(len(body['data']), 2)
+            ratings.extend(item['rating'] for item in body['data'])
+            if not body['next']:
+                break
+            body = self.client.get(body['next']).json()
+
+        expected = list(
+            Review.objects.order_by('-created_at', '-id').values_list('rating', flat=True)
+        )
+        self.assertEqual(ratings, expected)
+
+    def test_invalid_cursor_and_unknown_restaurant(self):
+        url = reverse('restaurant-reviews', args=[self.restaurant.id])
+        overflowing = base64.urlsafe_b64encode(f"{timezone.now().isoformat()}|{2 ** 64}".encode()).decode()
+        for cursor in ('garbage', overflowing):
+            response = self.client.get(url, {'cursor': cursor})
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json()['error_code'], 'INVALID_CURSOR')
+
+        response = self.client.get(reverse('restaurant-reviews', args=['missing']))
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json()['error_code'], 'RESTAURANT_NOT_FOUND')
+
+    def test_catalog_can_drop_embedded_reviews(self):
+        item = self.client.get(reverse('restaurant-list')).json()['data'][0]
+        self.assertEqual(len(item['reviews']), 5)
+
+        with self.assertNumQueries(4):
+            item = self.client.get(reverse('restaurant-list'), {'include_reviews': 'false'}).json()['data'][0]
+        self.assertNotIn('reviews', item)
+        self.assertEqual(item['total_reviews'], 5)
+        self.assertEqual(item['average_rating'], 3.0)
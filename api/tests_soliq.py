@@ -0,0 +1,379 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import requests
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from . import services
+from .checks import check_shared_cache
+from .circuit_breaker import CircuitOpenError
+from .models import RedeemedReceipt, Restaurant, WalletTransaction
+from .services import (
+    ReceiptRedemptionError, SoliqUnavailableError, SoliqVerificationError, fetch_soliq_page, receipt_cache_key,
+    redeem_receipt, verify_soliq_receipt
+)
+from .soliq_standin import SoliqStandIn
+
+User = get_user_model()
+
+QR_URL = "https://ofd.soliq.uz/epi?t=EZ000000000001&r=12345&c=20240115123045&s=999"
+
+RECEIPT_HTML = """
+<html><body><table>
+<tr><td>Komitent STIR:</td><td>123456789</td></tr>
+<tr><td>Jami to`lov:</td><td>30,000.00</td></tr>
+</table></body></html>
+"""
+
+
+def fake_response(status_code, text=RECEIPT_HTML):
+    return mock.Mock(status_code=status_code, text=text)
+
+
+@override_settings(SOLIQ_MAX_RETRIES=2, SOLIQ_BACKOFF_FACTOR=0.1)
+@mock.patch('api.services.time.sleep')
+class SoliqFetchTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.session = mock.Mock()
+        patcher = mock.patch.object(services, 'get_soliq_session', return_value=self.session)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_retries_server_errors_then_parses(self, sleep):
+        self.session.get.side_effect = [fake_response(502), fake_response(200)]
+
+        data = verify_soliq_receipt(QR_URL)
+
+        self.assertEqual(data['tin'], '123456789')
+        self.assertEqual(data['total_amount'], 30000.0)
+        self.assertEqual(self.session.get.call_count, 2)
+        self.assertEqual(sleep.call_count, 1)
+
+    def test_connection_errors_exhaust_retries(self, sleep):
+        self.session.get.side_effect = requests.ConnectionError("connection reset")
+
+        with self.assertRaises(SoliqVerificationError) as ctx:
+            verify_soliq_receipt(QR_URL)
+
+        self.assertIn("Network error", ctx.exception.message)
+        self.assertEqual(self.session.get.call_count, 3)
+        self.assertEqual([a['error'] for a in ctx.exception.attempts], ['ConnectionError'] * 3)
+
+    def test_read_timeout_is_not_retried(self, sleep):
+        self.session.get.side_effect = requests.ReadTimeout("slow")
+
+        with self.assertRaises(SoliqVerificationError):
+            verify_soliq_receipt(QR_URL)
+
+        self.assertEqual(self.session.get.call_count, 1)
+        sleep.assert_not_called()
+
+    def test_client_errors_are_reported_without_retry(self, sleep):
+        self.session.get.return_value = fake_response(404)
+
+        with self.assertRaises(SoliqVerificationError) as ctx:
+            verify_soliq_receipt(QR_URL)
+
+        self.assertIn("HTTP 404", ctx.exception.message)
+        self.assertEqual(self.session.get.call_count, 1)
+
+    def test_attempts_are_timed(self, sleep):
+        self.session.get.side_effect = [fake_response(503), fake_response(503), fake_response(503)]
+
+        response, attempts = fetch_soliq_page(QR_URL)
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual([a['status'] for a in attempts], [503, 503, 503])
+        self.assertTrue(all(a['elapsed_ms'] >= 0 for a in attempts))
+
+
+class ReceiptCacheTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(phone_number="+998901112233", password="pw")
+        self.client.force_authenticate(self.user)
+        Restaurant.objects.create(id="rest_1", tin="123456789", name="First", cashback_percentage=5)
+        self.session = mock.Mock()
+        self.session.get.return_value = fake_response(200)
+        patcher = mock.patch.object(services, 'get_soliq_session', return_value=self.session)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_key_ignores_host_and_extra_params(self):
+        self.assertEqual(
+            receipt_cache_key(QR_URL),
+            receipt_cache_key("http://other.host/check?c=20240115123045&r=12345"),
+        )
+        self.assertIsNone(receipt_cache_key("https://ofd.soliq.uz/epi?t=1"))
+
+    def test_scrape_then_verify_fetches_once(self):
+        scrape = self.client.post(reverse('receipt-scrape'), {'qr_code_url': QR_URL}, format='json')
+        verify = self.client.post(reverse('receipt-verify'), {'qr_code_url': QR_URL}, format='json')
+
+        self.assertEqual(scrape.status_code, 200)
+        self.assertEqual(verify.status_code, 200)
+        self.assertEqual(scrape.json()['data']['receipt_id'], verify.json()['data']['receipt_id'])
+        self.assertEqual(self.session.get.call_count, 1)
+
+    def test_refresh_bypasses_cache(self):
+        self.client.post(reverse('receipt-scrape'), {'qr_code_url': QR_URL}, format='json')
+        self.client.post(reverse('receipt-scrape'), {'qr_code_url': QR_URL, 'refresh': True}, format='json')
+
+        self.assertEqual(self.session.get.call_count, 2)
+
+    @override_settings(SOLIQ_MAX_RETRIES=0)
+    def test_failures_are_cached_briefly(self):
+        self.session.get.return_value = fake_response(404)
+
+        for _ in range(2):
+            response = self.client.post(reverse('receipt-scrape'), {'qr_code_url': QR_URL}, format='json')
+            self.assertEqual(response.status_code, 422)
+            self.assertIn("HTTP 404", response.json()['message'])
+        self.assertEqual(self.session.get.call_count, 1)
+
+
+@override_settings(SOLIQ_MAX_RETRIES=0, SOLIQ_BREAKER_MIN_CALLS=3, SOLIQ_BREAKER_OPEN_SECONDS=30)
+class SoliqCircuitBreakerTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(phone_number="+998901112233", password="pw")
+        self.client.force_authenticate(self.user)
+        self.session = mock.Mock()
+        patcher = mock.patch.object(services, 'get_soliq_session', return_value=self.session)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def trip(self):
+        self.session.get.side_effect = requests.ConnectionError("refused")
+        for number in range(3):
+            with self.assertRaises(SoliqVerificationError):
+                verify_soliq_receipt(QR_URL.replace('r=12345', f'r={number}'))
+        self.session.get.reset_mock()
+
+    def test_open_circuit_fails_fast(self):
+        self.trip()
+
+        with self.assertRaises(SoliqUnavailableError):
+            verify_soliq_receipt(QR_URL)
+        self.session.get.assert_not_called()
+
+        response = self.client.post(reverse('receipt-verify'), {'qr_code_url': QR_URL}, format='json')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()['error_code'], 'SOLIQ_UNAVAILABLE')
+        self.assertTrue(1 <= int(response['Retry-After']) <= 30)
+
+        health = self.client.get(reverse('health-soliq')).json()['data']
+        self.assertEqual(health['state'], 'open')
+
+    def test_single_probe_closes_circuit(self):
+        self.trip()
+        self.session.get.side_effect = None
+        self.session.get.return_value = fake_response(200)
+
+        with mock.patch('api.circuit_breaker.time.time', return_value=time.time() + 31):
+            breaker = services.get_soliq_breaker()
+            generation = breaker.before_call()
+            # Only one caller probes while the circuit is half open
+            with self.assertRaises(CircuitOpenError):
+                breaker.before_call()
+            breaker.record(generation, True, 0.1)
+
+            self.assertEqual(verify_soliq_receipt(QR_URL)['tin'], '123456789')
+        self.assertEqual(breaker.snapshot()['state'], 'closed')
+
+    def test_failed_probe_reopens_circuit(self):
+        self.trip()
+
+        with mock.patch('api.circuit_breaker.time.time', return_value=time.time() + 31):
+            with self.assertRaises(SoliqVerificationError) as ctx:
+                verify_soliq_receipt(QR_URL)
+            self.assertNotIsInstance(ctx.exception, SoliqUnavailableError)
+            self.assertEqual(self.session.get.call_count, 1)
+            self.assertEqual(services.get_soliq_breaker().snapshot()['state'], 'open')
+
+
+class SharedCacheCheckTests(SimpleTestCase):
+    def test_per_process_cache_fails_the_deploy_check(self):
+        locmem = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        database = {'default': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'cache'}}
+
+        with override_settings(DEBUG=False, CACHES=locmem):
+            self.assertEqual([error.id for error in check_shared_cache(None)], ['api.E001'])
+        with override_settings(DEBUG=False, CACHES=database):
+            self.assertEqual(check_shared_cache(None), [])
+        with override_settings(DEBUG=True, CACHES=locmem):
+            self.assertEqual(check_shared_cache(None), [])
+
+
+class DuplicateReceiptTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(phone_number="+998901112233", password="pw")
+        self.client.force_authenticate(self.user)
+        Restaurant.objects.create(id="rest_1", tin="123456789", name="First", cashback_percentage=5)
+        self.session = mock.Mock()
+        self.session.get.return_value = fake_response(200)
+        patcher = mock.patch.object(services, 'get_soliq_session', return_value=self.session)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_replayed_qr_is_rejected_before_fetching(self):
+        self.assertEqual(self.client.post(reverse('receipt-verify'), {'qr_code_url': QR_URL}, format='json').status_code, 200)
+        self.assertEqual(RedeemedReceipt.objects.get().qr_identity, "12345:20240115123045")
+
+        replay = "http://ofd.soliq.uz/check?c=20240115123045&r=12345"
+        for data in ({'qr_code_url': replay, 'refresh': True}, {'qr_code_url': replay, 'async': True}):
+            response = self.client.post(reverse('receipt-verify'), data, format='json')
+            self.assertEqual(response.status_code, 409)
+            self.assertEqual(response.json()['error_code'], 'RECEIPT_ALREADY_REDEEMED')
+
+        results = self.client.post(
+            reverse('receipt-verify-batch'), {'qr_codes': [replay, QR_URL.replace('r=12345', 'r=2')] * 2}, format='json'
+        ).json()['data']['results']
+        self.assertEqual(
+            [r.get('error_code') for r in results],
+            ['RECEIPT_ALREADY_REDEEMED', None, 'RECEIPT_ALREADY_REDEEMED', 'RECEIPT_ALREADY_REDEEMED']
+        )
+        # One fetch for the first redemption and one for the new receipt in the batch
+        self.assertEqual(self.session.get.call_count, 2)
+
+    def test_receipt_claimed_after_the_early_check_is_a_conflict(self):
+        parsed_data = verify_soliq_receipt(QR_URL)
+        # Redeemed by a concurrent request once this one is past ensure_receipt_not_redeemed
+        other = User.objects.create_user(phone_number="+998901112244", password="pw")
+        services.redeem_receipt(other, parsed_data)
+
+        with self.assertRaises(services.ReceiptRedemptionError) as ctx:
+            services.redeem_receipt(self.user, parsed_data)
+
+        self.assertEqual((ctx.exception.error_code, ctx.exception.status_code), ('RECEIPT_ALREADY_REDEEMED', 409))
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.wallet_balance, self.user.total_earned), (0, 0))
+        self.assertFalse(WalletTransaction.objects.filter(user=self.user).exists())
+
+    def test_claim_receipt_is_decided_by_either_unique_key(self):
+        restaurant = Restaurant.objects.get()
+
+        def receipt(receipt_id, qr_identity):
+            return RedeemedReceipt(
+                receipt_id=receipt_id, qr_identity=qr_identity, receipt_number="1",
+                user=self.user, restaurant=restaurant, total_paid=100, cashback_amount=5
+            )
+
+        first = receipt("soliq_1", "1:1")
+        self.assertTrue(services.claim_receipt(first))
+        self.assertEqual(RedeemedReceipt.objects.get().pk, first.pk)
+        self.assertFalse(services.claim_receipt(receipt("soliq_1", "2:2")))
+        self.assertFalse(services.claim_receipt(receipt("soliq_2", "1:1")))
+        self.assertEqual(RedeemedReceipt.objects.count(), 1)
+
+    def test_wallet_add_duplicate_is_a_conflict(self):
+        data = {'receipt_id': "soliq_1", 'restaurant_id': "rest_1", 'total_paid': 100, 'cashback_amount': 5}
+        self.assertEqual(self.client.post(reverse('wallet-add'), data, format='json').status_code, 200)
+
+        response = self.client.post(reverse('wallet-add'), data, format='json')
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['error_code'], 'RECEIPT_ALREADY_REDEEMED')
+        self.assertEqual(WalletTransaction.objects.count(), 1)
+
+        # The conflict is reported ahead of an unknown restaurant
+        response = self.client.post(reverse('wallet-add'), dict(data, restaurant_id="rest_404"), format='json')
+        self.assertEqual(response.status_code, 409)
+        response = self.client.post(reverse('wallet-add'), dict(data, receipt_id="soliq_2", restaurant_id="rest_404"), format='json')
+        self.assertEqual(response.status_code, 422)
+
+    def test_wallet_add_requires_receipt_id(self):
+        data = {'restaurant_id': "rest_1", 'total_paid': 100, 'cashback_amount': 5}
+        for receipt_id in (None, "", 42):
+            payload = data if receipt_id is None else dict(data, receipt_id=receipt_id)
+            response = self.client.post(reverse('wallet-add'), payload, format='json')
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json()['error_code'], 'INVALID_DATA')
+        self.assertFalse(RedeemedReceipt.objects.exists())
+
+
+class SingleFlightTests(APITestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.standin = SoliqStandIn(latency=0.3, jitter=0).start()
+        cls.addClassCleanup(cls.standin.stop)
+
+    def setUp(self):
+        cache.clear()
+        self.standin.requests = 0
+        self.url = self.standin.receipt_url('uz_labelled_stir.html')
+
+    def test_concurrent_verifications_share_one_fetch(self):
+        with ThreadPoolExecutor(max_workers=6) as executor:
+            results = list(executor.map(lambda _: verify_soliq_receipt(self.url, refresh=True), range(6)))
+
+        self.assertEqual(self.standin.requests, 1)
+        self.assertEqual({r['receipt_id'] for r in results}, {"soliq_305123456_12345_20240115123045"})
+
+    def test_waits_for_a_fetch_in_another_process(self):
+        key = receipt_cache_key(self.url)
+        cache.set(f"{key}:lock", True)
+        data = {'receipt_id': 'soliq_1_12345_20240115123045'}
+
+        def other_process_finishes():
+            time.sleep(0.2)
+            cache.set(key, {'ok': True, 'data': data})
+            cache.delete(f"{key}:lock")
+
+        finisher = threading.Thread(target=other_process_finishes)
+        finisher.start()
+        self.assertEqual(verify_soliq_receipt(self.url), data)
+        finisher.join()
+        self.assertEqual(self.standin.requests, 0)
+
+    def test_followers_get_the_leaders_unexpected_error(self):
+        key = receipt_cache_key(self.url)
+        release = threading.Event()
+
+        def broken_fetch(url, key, refresh):
+            release.wait(5)
+            raise RuntimeError("cache backend down")
+
+        with mock.patch.object(services, '_fetch_across_processes', side_effect=broken_fetch):
+            leader = ThreadPoolExecutor(max_workers=1)
+            leader_result = leader.submit(verify_soliq_receipt, self.url)
+            while key not in services._flights:
+                time.sleep(0.01)
+            threading.Timer(0.1, release.set).start()
+
+            with self.assertRaisesMessage(RuntimeError, "cache backend down"):
+                verify_soliq_receipt(self.url)
+            with self.assertRaises(RuntimeError):
+                leader_result.result()
+            leader.shutdown()
+
+    @override_settings(SOLIQ_SINGLE_FLIGHT_TIMEOUT=1, SOLIQ_MAX_RETRIES=2, SOLIQ_CONNECT_TIMEOUT=3, SOLIQ_READ_TIMEOUT=10)
+    def test_lock_outlives_the_slowest_fetch(self):
+        self.assertGreater(services._single_flight_timeout(), 3 * 13)
+
+        with mock.patch.object(services.cache, 'add', wraps=cache.add) as add:
+            verify_soliq_receipt(self.url)
+        self.assertGreater(add.call_args.kwargs['timeout'], services.soliq_fetch_budget())
+
+    def test_lost_race_on_insert_is_a_duplicate(self):
+        user = User.objects.create_user(phone_number="+998901112233", password="pw")
+        restaurant = Restaurant.objects.create(id="rest_1", tin="305123456", name="First")
+        parsed = verify_soliq_receipt(self.url)
+        # Same QR identity redeemed under another receipt ID, as a concurrent request would
+        RedeemedReceipt.objects.create(
+            receipt_id="soliq_other", qr_identity=parsed['qr_identity'], receipt_number="12345",
+            user=user, restaurant=restaurant, total_paid=1, cashback_amount=0
+        )
+
+        with self.assertRaises(ReceiptRedemptionError) as ctx:
+            redeem_receipt(user, parsed)
+        self.assertEqual((ctx.exception.error_code, ctx.exception.status_code), ('RECEIPT_ALREADY_REDEEMED', 409))
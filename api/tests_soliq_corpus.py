@@ -0,0 +1,129 @@
+import zlib
+from contextlib import nullcontext
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+
+from .models import ReceiptPageArchive
+from .receipt_parser import extract_receipt_fields
+from .services import (
+    SoliqVerificationError, archiving_receipt_pages, verify_receipts_concurrently, verify_soliq_receipt
+)
+from .soliq_standin import SoliqStandIn, load_corpus
+from .tests_receipt_parser import legacy_extract
+
+
+@override_settings(SOLIQ_BACKOFF_FACTOR=0)
+class SoliqCorpusTests(TestCase):
+    """Recorded Soliq layouts, verified end to end against the local stand-in."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.corpus = load_corpus()
+        cls.standin = SoliqStandIn().start()
+        cls.addClassCleanup(cls.standin.stop)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_pages_verify_to_expected_results(self):
+        # Each page gets its own receipt number, the receipt cache is keyed on it
+        for number, (name, (_, expected)) in enumerate(self.corpus.items(), start=1):
+            url = self.standin.receipt_url(name, receipt_number=str(number))
+            with self.subTest(page=name):
+                if 'error' in expected:
+                    with self.assertRaises(SoliqVerificationError) as ctx:
+                        verify_soliq_receipt(url)
+                    self.assertIn(expected['error'], ctx.exception.message)
+                else:
+                    data = verify_soliq_receipt(url)
+                    self.assertEqual(data['tin'], expected['tin'])
+                    self.assertEqual(data['total_amount'], expected['total_amount'])
+                    self.assertEqual(data['receipt_id'], f"soliq_{expected['tin']}_{number}_20240115123045")
+
+    def test_parser_matches_legacy_on_corpus(self):
+        for name, (html, _) in self.corpus.items():
+            with self.subTest(page=name):
+                self.assertEqual(extract_receipt_fields(html), legacy_extract(html))
+
+    @override_settings(SOLIQ_MAX_RETRIES=1)
+    def test_upstream_failures(self):
+        with SoliqStandIn(error_rate=1.0) as failing:
+            with self.assertRaises(SoliqVerificationError) as ctx:
+                verify_soliq_receipt(failing.receipt_url('uz_labelled_stir.html'))
+            self.assertIn("HTTP 502", ctx.exception.message)
+            self.assertEqual(failing.requests, 2)
+
+        with SoliqStandIn(reset_rate=1.0) as resetting:
+            with self.assertRaises(SoliqVerificationError) as ctx:
+                verify_soliq_receipt(resetting.receipt_url('uz_labelled_stir.html', receipt_number='2'))
+            self.assertIn("Network error", ctx.exception.message)
+            self.assertEqual(len(ctx.exception.attempts), 2)
+
+    def test_fetched_pages_are_archived_and_reparsed_offline(self):
+        for number, name in enumerate(self.corpus, start=1):
+            with self.assertRaises(SoliqVerificationError) if 'error' in self.corpus[name][1] else nullcontext():
+                with archiving_receipt_pages():
+                    verify_soliq_receipt(self.standin.receipt_url(name, receipt_number=str(number)))
+
+        archived = ReceiptPageArchive.objects.get(qr_identity="1:20240115123045")
+        html = zlib.decompress(bytes(archived.compressed_page)).decode('utf-8')
+        self.assertEqual(html, self.corpus['uz_labelled_stir.html'][0])
+        self.assertEqual(archived.outcome, {'fraudulent': False, 'tin': '305123456', 'total_amount': 10000.0})
+        self.assertEqual(ReceiptPageArchive.objects.count(), len(self.corpus))
+
+        requests_before = self.standin.requests
+        out = StringIO()
+        call_command('reparse_receipt_archive', '--workers', '2', stdout=out)
+        self.assertIn(f"Re-parsed {len(self.corpus)} archived page(s)", out.getvalue())
+        self.assertIn("0 reading(s) changed", out.getvalue())
+
+        # An outcome recorded by an older parser is reported, and replaced with --update
+        ReceiptPageArchive.objects.filter(pk=archived.pk).update(outcome={'fraudulent': False, 'tin': None, 'total_amount': None})
+        out = StringIO()
+        call_command('reparse_receipt_archive', '--workers', '2', '--update', stdout=out)
+        self.assertIn(f"page {archived.pk}:", out.getvalue())
+        archived.refresh_from_db()
+        self.assertEqual(archived.outcome['tin'], '305123456')
+        self.assertEqual(self.standin.requests, requests_before)
+
+    def test_batch_pages_are_archived_by_the_caller(self):
+        urls = [self.standin.receipt_url('uz_labelled_stir.html', receipt_number=str(number)) for number in range(1, 5)]
+        verify_soliq_receipt(urls[0])
+        self.assertFalse(ReceiptPageArchive.objects.exists())
+
+        with archiving_receipt_pages():
+            results = verify_receipts_concurrently(urls, refresh=True)
+            # Stored once the block exits, on this thread's connection
+            self.assertFalse(ReceiptPageArchive.objects.exists())
+
+        self.assertTrue(all(error is None for _, error in results))
+        self.assertEqual(
+            sorted(ReceiptPageArchive.objects.values_list('qr_identity', flat=True)),
+            [f"{number}:20240115123045" for number in range(1, 5)]
+        )
+
+    def test_reparse_since(self):
+        html = self.corpus['uz_labelled_stir.html'][0].encode('utf-8')
+        for day in (1, 2):
+            page = ReceiptPageArchive.objects.create(
+                qr_identity=f"{day}:1", url="http://soliq/", status_code=200, elapsed_ms=1, attempts=1,
+                page_size=len(html), compressed_page=zlib.compress(html), outcome={}
+            )
+            ReceiptPageArchive.objects.filter(pk=page.pk).update(fetched_at=f"2024-01-0{day}T12:00:00Z")
+
+        out = StringIO()
+        call_command('reparse_receipt_archive', '--workers', '1', '--since', '2024-01-02', stdout=out)
+        self.assertIn("Re-parsed 1 archived page(s)", out.getvalue())
+
+        with self.assertRaisesMessage(CommandError, "--since"):
+            call_command('reparse_receipt_archive', '--since', 'last tuesday', stdout=StringIO())
+
+    def test_reparse_needs_a_worker(self):
+        for option in ('--workers', '--batch'):
+            for value in ('0', '-2'):
+                with self.assertRaisesMessage(CommandError, f"{option} must be at least 1"):
+                    call_command('reparse_receipt_archive', option, value, stdout=StringIO())
@@ -0,0 +1,262 @@
+import base64
+import datetime
+import threading
+from collections import Counter
+from decimal import Decimal
+from io import StringIO
+from unittest import skipUnless
+from urllib.parse import parse_qs, urlparse
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from .models import Restaurant, WalletTransaction
+from .wallet import InsufficientBalanceError, credit_wallet, debit_wallet
+
+User = get_user_model()
+
+
+class WalletTotalsTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(phone_number="+998901112233", password="pw")
+        self.client.force_authenticate(self.user)
+        Restaurant.objects.create(id="rest_1", tin="123456789", name="First", cashback_percentage=5)
+
+    def add_cashback(self, receipt_id, amount):
+        response = self.client.post(reverse('wallet-add'), {
+            'receipt_id': receipt_id, 'restaurant_id': 'rest_1', 'total_paid': amount * 20, 'cashback_amount': amount
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+
+    def wallet(self):
+        # force_authenticate hands the view this very instance
+        self.user.refresh_from_db()
+        return self.client.get(reverse('wallet')).json()['data']
+
+    def test_totals_follow_wallet_updates(self):
+        self.add_cashback("soliq_1", 1500)
+        self.add_cashback("soliq_2", 500)
+        response = self.client.post(reverse('wallet-transfer'), {'amount': 700, 'card_last_four': '1234'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        # A rejected transfer doesn't count
+        self.client.post(reverse('wallet-transfer'), {'amount': 99999, 'card_last_four': '1234'}, format='json')
+
+        data = self.wallet()
+        self.assertEqual(data['balance'], 1300.0)
+        self.assertEqual(data['total_earned'], 2000.0)
+        self.assertEqual(data['total_transferred'], 700.0)
+
+    def test_transfer_amount_must_be_a_number(self):
+        self.add_cashback("soliq_1", 1500)
+        for amount, error_code in (('abc', 'INVALID_DATA'), ('NaN', 'INVALID_DATA'), ('1e400', 'INVALID_DATA'),
+                                   ('1e20', 'INVALID_DATA'), (0, 'INSUFFICIENT_BALANCE'),
+                                   (-5, 'INSUFFICIENT_BALANCE'), (1500.01, 'INSUFFICIENT_BALANCE')):
+            response = self.client.post(reverse('wallet-transfer'), {'amount': amount, 'card_last_four': '1234'}, format='json')
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json()['error_code'], error_code)
+        self.assertEqual(self.wallet()['balance'], 1500.0)
+
+    def test_add_rejects_unstorable_and_negative_cashback(self):
+        self.add_cashback("soliq_1", 100)
+        for receipt_id, cashback in (("soliq_2", "1e20"), ("soliq_3", "1e400"), ("soliq_4", -50), ("soliq_5", 0)):
+            response = self.client.post(reverse('wallet-add'), {
+                'receipt_id': receipt_id, 'restaurant_id': 'rest_1', 'total_paid': 100, 'cashback_amount': cashback
+            }, format='json')
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json()['error_code'], 'INVALID_DATA')
+
+        data = self.wallet()
+        self.assertEqual((data['balance'], data['total_earned']), (100.0, 100.0))
+
+    def test_rebuild_fixes_drifted_totals(self):
+        self.add_cashback("soliq_1", 1500)
+        User.objects.filter(pk=self.user.pk).update(total_earned=1, total_transferred=2)
+
+        out = StringIO()
+        call_command('rebuild_wallet_totals', '--check', stdout=out)
+        self.assertIn("Found 1", out.getvalue())
+        self.assertEqual(self.wallet()['total_earned'], 1.0)
+
+        call_command('rebuild_wallet_totals', stdout=StringIO())
+        data = self.wallet()
+        self.assertEqual((data['total_earned'], data['total_transferred']), (1500.0, 0.0))
+
+        out = StringIO()
+        call_command('rebuild_wallet_totals', '--check', stdout=out)
+        self.assertIn("Found 0", out.getvalue())
+
+
+class WalletTransactionHistoryTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(phone_number="+998901112233", password="pw")
+        other = User.objects.create_user(phone_number="+998901112244", password="pw")
+        self.client.force_authenticate(self.user)
+        for index in range(25):
+            for owner in (self.user, other):
+                txn = WalletTransaction.objects.create(
+                    transaction_id=f"txn_{owner.pk}_{index}", user=owner,
+                    type='transfer_out' if index % 5 == 0 else 'cashback_add',
+                    amount=index, balance_before=0, balance_after=index,
+                    status='pending' if index == 7 else 'completed'
+                )
+                # Days 1 to 13 of January, two transactions a day (sharing a timestamp)
+                WalletTransaction.objects.filter(pk=txn.pk).update(
+                    created_at=datetime.datetime(2024, 1, index // 2 + 1, 12, tzinfo=datetime.timezone.utc)
+                )
+
+    def history(self, **params):
+        response = self.client.get(reverse('wallet-transactions'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def ids(self, payload):
+        return [item['transaction_id'] for item in payload['data']]
+
+    def test_cursor_mode_walks_the_same_order_without_count(self):
+        paged = self.history(limit=100)
+        self.assertEqual(paged['total'], 25)
+        expected = self.ids(paged)
+        self.assertEqual(expected[:2], [f"txn_{self.user.pk}_24", f"txn_{self.user.pk}_23"])
+
+        seen, params = [], {'cursor': '', 'limit': 10}
+        while True:
+            payload = self.history(**params)
+            self.assertNotIn('total', payload)
+            seen += self.ids(payload)
+            if not payload['next']:
+                break
+            params['cursor'] = parse_qs(urlparse(payload['next']).query)['cursor'][0]
+        self.assertEqual(seen, expected)
+
+    def test_filters(self):
+        self.assertEqual(len(self.history(type='transfer_out')['data']), 5)
+        self.assertEqual(self.ids(self.history(status='pending')), [f"txn_{self.user.pk}_7"])
+
+        # 2024-01-02 and -03 hold transactions 2 to 5
+        payload = self.history(created_after='2024-01-02', created_before='2024-01-03', cursor='')
+        self.assertEqual(self.ids(payload), [f"txn_{self.user.pk}_{index}" for index in (5, 4, 3, 2)])
+        payload = self.history(created_after='2024-01-13T00:00:00+00:00')
+        self.assertEqual(payload['total'], 1)
+
+    def cursor(self, raw):
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    def test_invalid_cursor(self):
+        for cursor in ('garbage', 'bm90IGEgY3Vyc29y', self.cursor('2020-01-01T00:00:00+00:00|' + '9' * 40),
+                       self.cursor('2020-01-01T00:00:00+00:00|0'), self.cursor('2020-01-01T00:00:00|5')):
+            response = self.client.get(reverse('wallet-transactions'), {'cursor': cursor})
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json()['error_code'], 'INVALID_CURSOR')
+            self.assertFalse(response.json()['success'])
+
+    def test_cursor_bounds_the_index_scan(self):
+        cursor = self.cursor(f"2024-01-05T12:00:00+00:00|{WalletTransaction.objects.order_by('pk').last().pk}")
+        with CaptureQueriesContext(connection) as queries:
+            self.history(cursor=cursor)
+        sql = queries.captured_queries[-1]['sql']
+        # The range on created_at stands outside the OR, so the
+        # (user, -created_at, -id) index is sought rather than scanned
+        self.assertIn(') AND "api_wallettransaction"."created_at" <= ', sql)
+
+    def test_invalid_date(self):
+        response = self.client.get(reverse('wallet-transactions'), {'created_after': '2024-13-45'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error_code'], 'INVALID_DATE')
+
+
+class WalletServiceTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(phone_number="+998901112233", password="pw")
+
+    def test_credit_and_debit_are_exact(self):
+        self.assertEqual(credit_wallet(self.user.pk, 0.1), (Decimal('0.00'), Decimal('0.10')))
+        self.assertEqual(credit_wallet(self.user.pk, '0.2'), (Decimal('0.10'), Decimal('0.30')))
+        self.assertEqual(debit_wallet(self.user.pk, Decimal('0.30')), (Decimal('0.30'), Decimal('0.00')))
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.wallet_balance, 0)
+        self.assertEqual((self.user.total_earned, self.user.total_transferred), (Decimal('0.30'), Decimal('0.30')))
+
+    def test_debit_is_guarded(self):
+        credit_wallet(self.user.pk, 100)
+        with self.assertRaises(InsufficientBalanceError):
+            debit_wallet(self.user.pk, '100.01')
+
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.wallet_balance, self.user.total_transferred), (100, 0))
+
+    def test_amounts_must_be_positive_and_storable(self):
+        credit_wallet(self.user.pk, 100)
+        for amount in (-50, 0, '1e400', '1e10'):
+            with self.assertRaises(ValueError):
+                credit_wallet(self.user.pk, amount)
+            with self.assertRaises(ValueError):
+                debit_wallet(self.user.pk, amount)
+
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.wallet_balance, self.user.total_earned, self.user.total_transferred), (100, 100, 0))
+
+    def test_only_balance_columns_are_written(self):
+        User.objects.filter(pk=self.user.pk).update(full_name="Renamed elsewhere")
+        credit_wallet(self.user.pk, 5)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.full_name, "Renamed elsewhere")
+
+
+@skipUnless(connection.vendor == 'postgresql', "needs concurrent writers, which the SQLite test database doesn't allow")
+class WalletConcurrencyTests(TransactionTestCase):
+    threads = 16
+    rounds = 25
+
+    def test_concurrent_updates_lose_nothing(self):
+        user = User.objects.create_user(phone_number="+998901112233", password="pw")
+        start = threading.Barrier(self.threads)
+        failed_debits = []
+
+        def worker(index):
+            start.wait()
+            try:
+                for round_ in range(self.rounds):
+                    debit = (index + round_) % 3 == 0
+                    try:
+                        with transaction.atomic():
+                            if debit:
+                                before, after = debit_wallet(user.pk, '2.50')
+                            else:
+                                before, after = credit_wallet(user.pk, '1.10')
+                            WalletTransaction.objects.create(
+                                transaction_id=f"txn_{index}_{round_}", user=user,
+                                type='transfer_out' if debit else 'cashback_add',
+                                amount='2.50' if debit else '1.10', balance_before=before, balance_after=after
+                            )
+                    except InsufficientBalanceError:
+                        failed_debits.append((index, round_))
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=worker, args=(index,)) for index in range(self.threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+
+        user.refresh_from_db()
+        ledger = list(WalletTransaction.objects.filter(user=user))
+        self.assertEqual(len(ledger) + len(failed_debits), self.threads * self.rounds)
+        self.assertEqual(user.wallet_balance, user.total_earned - user.total_transferred)
+        self.assertEqual(
+            {'total_earned': user.total_earned, 'total_transferred': user.total_transferred},
+            User.compute_wallet_totals(user.pk)
+        )
+        # Every update started from the balance the previous one left, so the
+        # ledger rows chain from zero to the final balance without gaps
+        self.assertEqual(
+            Counter([txn.balance_before for txn in ledger] + [user.wallet_balance]),
+            Counter([txn.balance_after for txn in ledger] + [Decimal('0.00')])
+        )
+        self.assertTrue(all(txn.balance_after >= 0 for txn in ledger))
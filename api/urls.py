@@ -4,12 +4,15 @@ from .views import (
     WalletTransferView, ReceiptVerifyView, ReceiptScrapeView, MeView, 
     WalletTransactionListView, LikedRestaurantView, FCMDeviceView,
     RegisterView, HealthCheckView, OTPSendView, OTPVerifyView,
-    LikedRestaurantListView, RestaurantRateView, UserCardUpdateView
+    LikedRestaurantListView, RestaurantRateView, UserCardUpdateView,
+    RestaurantChangesView, RestaurantReviewListView, ReceiptVerifyJobView,
+    ReceiptVerifyBatchView, SoliqHealthView
 )
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
 api_patterns = [
     path('health/', HealthCheckView.as_view(), name='health-check'),
+    path('health/soliq/', SoliqHealthView.as_view(), name='health-soliq'),
     path('register/', RegisterView.as_view(), name='api-register'),
     path('registration/', RegisterView.as_view()), # Alias
     path('otp/send/', OTPSendView.as_view(), name='otp-send'),
@@ -21,12 +24,16 @@ api_patterns = [
     
     path('tags/', TagListView.as_view(), name='tag-list'),
     path('restaurants/', RestaurantListView.as_view(), name='restaurant-list'),
+    path('restaurants/changes/', RestaurantChangesView.as_view(), name='restaurant-changes'),
+    path('restaurants/<str:restaurant_id>/reviews/', RestaurantReviewListView.as_view(), name='restaurant-reviews'),
     path('restaurants/<str:restaurant_id>/rate/', RestaurantRateView.as_view(), name='restaurant-rate'),
     path('wallet/', WalletView.as_view(), name='wallet'),
     path('wallet/transactions/', WalletTransactionListView.as_view(), name='wallet-transactions'),
     path('wallet/add/', WalletAddView.as_view(), name='wallet-add'),
     path('wallet/transfer/', WalletTransferView.as_view(), name='wallet-transfer'),
     path('receipt/verify/', ReceiptVerifyView.as_view(), name='receipt-verify'),
+    path('receipt/verify/batch/', ReceiptVerifyBatchView.as_view(), name='receipt-verify-batch'),
+    path('receipt/verify/<str:job_id>/', ReceiptVerifyJobView.as_view(), name='receipt-verify-job'),
     path('receipt/scrape/', ReceiptScrapeView.as_view(), name='receipt-scrape'),
     path('me/', MeView.as_view(), name='me'),
     path('me/card/add/', UserCardUpdateView.as_view(), name='user-card-update'),
@@ -4,16 +4,29 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.views import APIView
 from django.utils import translation, timezone
 from django.db import transaction
-import uuid, math
+import datetime, uuid, math
+import base64, binascii
 from rest_framework_simplejwt.tokens import RefreshToken
 import random
-from .models import Tag, Restaurant, RedeemedReceipt, WalletTransaction, CustomUser, FCMDevice, OTP
+from django.db.models import Q
+from django.utils.dateparse import parse_date, parse_datetime
+from .models import (
+    Tag, Restaurant, RestaurantTombstone, RedeemedReceipt, WalletTransaction,
+    CustomUser, FCMDevice, OTP, Review, ReceiptVerificationJob
+)
 from .serializers import (
     TagSerializer, RestaurantSerializer, WalletTransactionSerializer, 
     FCMDeviceSerializer, RegisterSerializer, UserProfileSerializer,
     OTPSendSerializer, OTPVerifySerializer, ReviewSerializer
 )
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import BasePagination, PageNumberPagination, CursorPagination
+from rest_framework.exceptions import NotFound
+from rest_framework.utils.urls import replace_query_param
+from django.utils.cache import patch_vary_headers
+from django.conf import settings
+from .fast_serializers import RestaurantFastSerializer, TagFastSerializer, WalletTransactionFastSerializer
+from .catalog import catalog_cache_key, catalog_etag, etag_matches, get_cached_catalog
+from modeltranslation.utils import build_localized_fieldname, get_language as get_translation_language
 
 import math
 
@@ -39,54 +52,404 @@ class CustomPagination(PageNumberPagination):
             "pages": self.page.paginator.num_pages
         })
 
-class TagListView(UserLanguageMixin, generics.ListAPIView):
+class RestaurantCursorPagination(CursorPagination):
+    """
+    Opt-in cursor pagination for the restaurant catalog, ordered by name.
+    Only applied when the client sends `cursor` or `limit`, so existing clients
+    keep receiving the full list.
+    """
+    page_size = 20
+    page_size_query_param = 'limit'
+    max_page_size = 100
+    ordering = ('name', 'id')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_query_param not in request.query_params and self.page_size_query_param not in request.query_params:
+            return None
+        return super().paginate_queryset(queryset, request, view)
+
+    def _get_position_from_instance(self, instance, ordering):
+        # `name` is translated and the query orders by the column of the active
+        # language, so the cursor must store that column rather than the
+        # fallback-resolved attribute value.
+        field_name = ordering[0].lstrip('-')
+        localized_name = build_localized_fieldname(field_name, get_translation_language())
+        if isinstance(instance, dict):
+            if localized_name in instance:
+                return str(instance[localized_name])
+        elif hasattr(instance, localized_name):
+            return str(getattr(instance, localized_name))
+        return super()._get_position_from_instance(instance, ordering)
+
+    def get_paginated_response(self, data):
+        return Response({
+            "success": True,
+            "data": data,
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link()
+        })
+
+MAX_BIGINT = 2 ** 63 - 1
+
+class InvalidCursor(NotFound):
+    pass
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset pagination over `(created_at, id)`, newest first. Each page is a
+    range scan from the previous page's last row, so deep pages cost the same
+    as the first one and no COUNT(*) is issued.
+    """
+    page_size = 20
+    page_size_query_param = 'limit'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded:
+            created_at, pk = self.decode_cursor(encoded)
+            # The redundant created_at__lte bounds the index range scan,
+            # which can't be derived from the OR alone
+            queryset = queryset.filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk),
+                created_at__lte=created_at
+            )
+
+        rows = list(queryset.order_by('-created_at', '-pk')[:page_size + 1])
+        page = rows[:page_size]
+        self.next_cursor = self.encode_cursor(page[-1]) if len(rows) > page_size else None
+        return page
+
+    def get_page_size(self, request):
+        try:
+            return min(max(int(request.query_params[self.page_size_query_param]), 1), self.max_page_size)
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def encode_cursor(self, instance):
+        if isinstance(instance, dict):
+            # A values() row of a fast serializer
+            raw = f"{instance['created_at'].isoformat()}|{instance['id']}"
+        else:
+            raw = f"{instance.created_at.isoformat()}|{instance.pk}"
+        return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+    def decode_cursor(self, encoded):
+        try:
+            raw = base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8')
+            created_at, pk = raw.rsplit('|', 1)
+            created_at, pk = parse_datetime(created_at), int(pk)
+            # Cursors are only ever issued with aware datetimes and bigint ids
+            if created_at is None or timezone.is_naive(created_at) or not 0 < pk <= MAX_BIGINT:
+                raise ValueError(raw)
+            return created_at, pk
+        except (TypeError, ValueError, UnicodeError, binascii.Error):
+            raise InvalidCursor(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            "success": True,
+            "data": data,
+            "next": self.get_next_link()
+        })
+
+def invalid_cursor_response():
+    return Response({
+        "success": False,
+        "error_code": "INVALID_CURSOR",
+        "message": "cursor must be the value from a previous page's next link."
+    }, status=400)
+
+class RestaurantCatalogMixin:
+    """Shares the liked restaurant IDs of the current user with the serializer."""
+    def get_liked_restaurant_ids(self):
+        if not hasattr(self, '_liked_restaurant_ids'):
+            user = self.request.user
+            self._liked_restaurant_ids = (
+                set(user.liked_restaurants.values_list('id', flat=True))
+                if user.is_authenticated else set()
+            )
+        return self._liked_restaurant_ids
+
+    # Compact representation for list screens (?view=card)
+    card_fields = ['id', 'name', 'logo', 'cashback_percentage', 'average_rating']
+
+    def get_catalog_fields(self):
+        """
+        The restaurant fields requested with `?view=card` or `?fields=a,b`,
+        minus `reviews` when `include_reviews=false`. None means every field.
+        """
+        params = self.request.query_params
+        all_fields = RestaurantSerializer.Meta.fields
+        if params.get('view') == 'card':
+            fields = list(self.card_fields)
+        elif params.get('fields'):
+            requested = {name.strip() for name in params['fields'].split(',')}
+            # The id is always rendered, clients need it to address the restaurant
+            fields = [name for name in all_fields if name in requested or name == 'id']
+        else:
+            fields = list(all_fields)
+
+        # Clients that only show the aggregate rating can skip embedded reviews
+        if params.get('include_reviews', 'true').lower() in ('false', '0', 'no') and 'reviews' in fields:
+            fields.remove('reviews')
+        return None if fields == list(all_fields) else fields
+
+    def get_catalog_queryset(self):
+        return Restaurant.objects.for_catalog(fields=self.get_catalog_fields())
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault('fields', self.get_catalog_fields())
+        return super().get_serializer(*args, **kwargs)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if getattr(self, 'catalog_cache_name', None):
+            # Cached payloads are shared by every user, `is_liked` is overlaid
+            # afterwards by `personalize`.
+            context['liked_restaurant_ids'] = frozenset()
+        else:
+            context['liked_restaurant_ids'] = self.get_liked_restaurant_ids()
+        return context
+
+class CatalogCacheMixin:
+    """
+    Serves list responses from the shared catalog cache, keyed by the active
+    language and the normalized query string, and answers conditional requests
+    with 304 Not Modified. Subclasses overlay per-user data in `personalize`
+    and describe it in `get_personalization_token` so it is part of the ETag.
+    """
+    catalog_cache_name = None
+
+    def get(self, request, *args, **kwargs):
+        cache_key = catalog_cache_key(self.catalog_cache_name, request)
+        etag = catalog_etag(cache_key, self.get_personalization_token())
+
+        if etag_matches(request, etag):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            payload = get_cached_catalog(
+                cache_key,
+                lambda: super(CatalogCacheMixin, self).get(request, *args, **kwargs).data
+            )
+            response = Response(self.personalize(payload))
+
+        response['ETag'] = etag
+        patch_vary_headers(response, ('Accept-Language', 'Authorization'))
+        return response
+
+    def get_personalization_token(self):
+        return ''
+
+    def personalize(self, payload):
+        return payload
+
+class FastSerializationMixin:
+    """
+    Renders list responses with the values()-based serializer in
+    `fast_serializer_class`, which produces the same JSON as `serializer_class`
+    without building model instances. Turned off with API_FAST_SERIALIZATION.
+    """
+    fast_serializer_class = None
+
+    def get_fast_serializer(self):
+        if self.fast_serializer_class is None or not settings.API_FAST_SERIALIZATION:
+            return None
+        if not hasattr(self, '_fast_serializer'):
+            self._fast_serializer = self.fast_serializer_class(
+                fields=self.get_fast_serializer_fields(), context=self.get_serializer_context()
+            )
+        return self._fast_serializer
+
+    def get_fast_serializer_fields(self):
+        return None
+
+    def get_list_queryset(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        fast_serializer = self.get_fast_serializer()
+        return fast_serializer.prepare(queryset) if fast_serializer else queryset
+
+    def serialize_list(self, rows):
+        fast_serializer = self.get_fast_serializer()
+        if fast_serializer is not None:
+            return fast_serializer.to_representation(rows)
+        return self.get_serializer(rows, many=True).data
+
+class TagListView(UserLanguageMixin, CatalogCacheMixin, FastSerializationMixin, generics.ListAPIView):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
+    fast_serializer_class = TagFastSerializer
     permission_classes = [AllowAny]
+    catalog_cache_name = 'tags'
 
     def list(self, request, *args, **kwargs):
-        queryset = self.filter_queryset(self.get_queryset())
-        serializer = self.get_serializer(queryset, many=True)
+        queryset = self.get_list_queryset()
         return Response({
             "success": True,
-            "data": serializer.data
+            "data": self.serialize_list(queryset)
         })
 
-class RestaurantListView(UserLanguageMixin, generics.ListAPIView):
+class RestaurantListView(UserLanguageMixin, CatalogCacheMixin, RestaurantCatalogMixin, FastSerializationMixin, generics.ListAPIView):
     serializer_class = RestaurantSerializer
+    fast_serializer_class = RestaurantFastSerializer
     permission_classes = [AllowAny]
+    pagination_class = RestaurantCursorPagination
+    catalog_cache_name = 'restaurants'
+
+    def get_fast_serializer_fields(self):
+        return self.get_catalog_fields()
+
+    def get_personalization_token(self):
+        return ','.join(sorted(self.get_liked_restaurant_ids()))
+
+    def personalize(self, payload):
+        liked_ids = self.get_liked_restaurant_ids()
+        if not liked_ids:
+            return payload
+        return {
+            **payload,
+            "data": [
+                {**item, "is_liked": item['id'] in liked_ids} if 'is_liked' in item else item
+                for item in payload['data']
+            ]
+        }
     
     def get_queryset(self):
-        queryset = Restaurant.objects.all()
-        # Add filtering by liked status if requested or pass it in serializer context
+        queryset = self.get_catalog_queryset()
+        # Filter by tags: every listed tag by default, any of them with tags_match=any
         tags_param = self.request.query_params.get('tags')
         if tags_param:
-            tag_ids = [t.strip() for t in tags_param.split(',')]
-            for tag_id in tag_ids:
-                queryset = queryset.filter(tags__id=tag_id)
+            tag_ids = [t.strip() for t in tags_param.split(',') if t.strip()]
+            match = 'any' if self.request.query_params.get('tags_match') == 'any' else 'all'
+            if tag_ids:
+                queryset = queryset.with_tags(tag_ids, match=match)
         
         # Add filtering by specific restaurant ID
         restaurant_id = self.request.query_params.get('id') or self.request.query_params.get('restaurant_id')
         if restaurant_id:
             queryset = queryset.filter(id=restaurant_id)
             
-        return queryset.distinct().order_by('name')
+        return queryset.order_by('name')
 
     def list(self, request, *args, **kwargs):
-        queryset = self.filter_queryset(self.get_queryset())
-        serializer = self.get_serializer(queryset, many=True)
+        queryset = self.get_list_queryset()
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.serialize_list(page))
+
         return Response({
             "success": True,
-            "data": serializer.data
+            "data": self.serialize_list(queryset)
         })
 
-from .services import verify_soliq_receipt, SoliqVerificationError
+class RestaurantChangesView(UserLanguageMixin, RestaurantCatalogMixin, generics.GenericAPIView):
+    """
+    Delta sync for clients that keep a local copy of the catalog.
+    Returns the restaurants changed and the IDs deleted since `since`
+    (ISO 8601, normally the `server_time` of the previous sync), or the whole
+    catalog when `since` is omitted.
+    """
+    serializer_class = RestaurantSerializer
+    permission_classes = [AllowAny]
+    # Rows saved by transactions that commit after a sync may carry a timestamp
+    # slightly before its `server_time`; re-sending that window is harmless
+    # because upserts and deletions are idempotent.
+    sync_overlap = timezone.timedelta(seconds=5)
+
+    def get(self, request):
+        server_time = timezone.now()
+        queryset = self.get_catalog_queryset()
+        deleted_ids = set()
+
+        since_param = request.query_params.get('since')
+        if since_param:
+            # A '+' in the UTC offset arrives as a space when not URL-encoded
+            since = parse_datetime(since_param.strip().replace(' ', '+'))
+            if since is None:
+                return Response({
+                    "success": False,
+                    "error_code": "INVALID_SINCE",
+                    "message": "since must be an ISO 8601 timestamp."
+                }, status=400)
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since)
+            since -= self.sync_overlap
+
+            queryset = queryset.filter(Q(updated_at__gt=since) | Q(tags__updated_at__gt=since)).distinct()
+            deleted_ids = set(
+                RestaurantTombstone.objects.filter(deleted_at__gt=since).values_list('restaurant_id', flat=True)
+            )
+
+        upserted = self.get_serializer(queryset.order_by('name'), many=True).data
+        # A restaurant deleted and re-created within the window is an upsert
+        deleted_ids -= {item['id'] for item in upserted}
+
+        return Response({
+            "success": True,
+            "data": {
+                "upserted": upserted,
+                "deleted": sorted(deleted_ids),
+                "server_time": server_time.isoformat().replace('+00:00', 'Z')
+            }
+        })
+
+class RestaurantReviewListView(UserLanguageMixin, generics.ListAPIView):
+    """Reviews of a restaurant, newest first, keyset-paginated."""
+    serializer_class = ReviewSerializer
+    permission_classes = [AllowAny]
+    pagination_class = KeysetPagination
+
+    def get_queryset(self):
+        return Review.objects.filter(restaurant_id=self.kwargs['restaurant_id'])
+
+    def list(self, request, *args, **kwargs):
+        if not Restaurant.objects.filter(id=self.kwargs['restaurant_id']).exists():
+            return Response({
+                "success": False,
+                "error_code": "RESTAURANT_NOT_FOUND",
+                "message": "Restaurant not found."
+            }, status=404)
+
+        try:
+            page = self.paginate_queryset(self.get_queryset())
+        except InvalidCursor:
+            return invalid_cursor_response()
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+from .wallet import InsufficientBalanceError, credit_wallet, debit_wallet, to_amount
+from .services import (
+    verify_soliq_receipt, verify_receipts_concurrently, ensure_receipt_not_redeemed, redeem_receipt,
+    redeem_receipts, get_soliq_breaker, receipt_from_qr, claim_receipt, archiving_receipt_pages,
+    SoliqVerificationError, SoliqUnavailableError, ReceiptRedemptionError
+)
 
 class HealthCheckView(APIView):
     permission_classes = [AllowAny]
     def get(self, request):
         return Response({"status": "ok", "message": "Backend is running"}, status=200)
 
+class SoliqHealthView(APIView):
+    """State of the Soliq circuit breaker, for monitoring."""
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        breaker = get_soliq_breaker().snapshot()
+        return Response({
+            "success": True,
+            "data": {"enabled": settings.SOLIQ_BREAKER_ENABLED, **breaker}
+        })
+
 class RegisterView(APIView):
     permission_classes = [AllowAny]
     def post(self, request):
@@ -160,9 +523,6 @@ class WalletView(UserLanguageMixin, APIView):
 
     def get(self, request):
         user = request.user
-        transactions = WalletTransaction.objects.filter(user=user, status='completed')
-        total_earned = sum(t.amount for t in transactions if t.type == 'cashback_add')
-        total_transferred = sum(t.amount for t in transactions if t.type == 'transfer_out')
 
         return Response({
             "success": True,
@@ -170,31 +530,93 @@ class WalletView(UserLanguageMixin, APIView):
                 "user_id": str(user.id) if hasattr(user, 'id') else user.phone_number,
                 "balance": float(user.wallet_balance),
                 "currency": "UZS",
-                "total_earned": float(total_earned),
-                "total_transferred": float(total_transferred),
+                "total_earned": float(user.total_earned),
+                "total_transferred": float(user.total_transferred),
                 "last_updated": timezone.now().isoformat()
             }
         })
 
-class WalletTransactionListView(UserLanguageMixin, generics.ListAPIView):
+class WalletTransactionListView(UserLanguageMixin, FastSerializationMixin, generics.ListAPIView):
+    """
+    Transaction history of the user, newest first, filtered by `type`,
+    `status` and a `created_after`/`created_before` range (ISO 8601).
+    Page-numbered by default; sending `cursor` (empty for the first page)
+    switches to keyset pagination, which skips the COUNT(*) and costs the
+    same on every page.
+    """
     serializer_class = WalletTransactionSerializer
+    fast_serializer_class = WalletTransactionFastSerializer
     permission_classes = [IsAuthenticated]
     pagination_class = CustomPagination
+    date_range_params = (('created_after', 'created_at__gte'), ('created_before', 'created_at__lt'))
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            if KeysetPagination.cursor_query_param in self.request.query_params:
+                self._paginator = KeysetPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
 
     def get_queryset(self):
-        return WalletTransaction.objects.filter(user=self.request.user).order_by('-created_at')
+        queryset = WalletTransaction.objects.filter(user=self.request.user)
+        for name in ('type', 'status'):
+            value = self.request.query_params.get(name)
+            if value:
+                queryset = queryset.filter(**{name: value})
+        for name, lookup in self.date_range_params:
+            if name in self.date_range:
+                queryset = queryset.filter(**{lookup: self.date_range[name]})
+        return queryset.order_by('-created_at', '-id')
+
+    def parse_date_range(self, request):
+        """
+        Returns the range bounds by parameter name, or None if one is
+        malformed. A plain date as `created_before` includes that day.
+        """
+        bounds = {}
+        for name, _ in self.date_range_params:
+            value = request.query_params.get(name)
+            if not value:
+                continue
+            # A '+' in the UTC offset arrives as a space when not URL-encoded
+            value = value.strip().replace(' ', '+')
+            try:
+                # parse_datetime() would also take a plain date, as midnight
+                day = parse_date(value)
+                bound = None if day else parse_datetime(value)
+            except ValueError:
+                return None
+            if day is not None:
+                if name == 'created_before':
+                    day += datetime.timedelta(days=1)
+                bound = datetime.datetime.combine(day, datetime.time.min)
+            if bound is None:
+                return None
+            bounds[name] = timezone.make_aware(bound) if timezone.is_naive(bound) else bound
+        return bounds
 
     def list(self, request, *args, **kwargs):
-        queryset = self.filter_queryset(self.get_queryset())
-        page = self.paginate_queryset(queryset)
+        self.date_range = self.parse_date_range(request)
+        if self.date_range is None:
+            return Response({
+                "success": False,
+                "error_code": "INVALID_DATE",
+                "message": "created_after and created_before must be ISO 8601 dates or timestamps."
+            }, status=400)
+
+        queryset = self.get_list_queryset()
+        try:
+            page = self.paginate_queryset(queryset)
+        except InvalidCursor:
+            return invalid_cursor_response()
         if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
+            return self.get_paginated_response(self.serialize_list(page))
 
-        serializer = self.get_serializer(queryset, many=True)
         return Response({
             "success": True,
-            "data": serializer.data
+            "data": self.serialize_list(queryset)
         })
 
 class WalletAddView(UserLanguageMixin, APIView):
@@ -203,21 +625,39 @@ class WalletAddView(UserLanguageMixin, APIView):
     def post(self, request):
         data = request.data
         receipt_id = data.get('receipt_id')
-        total_paid = float(data.get('total_paid', 0))
-        cashback_percentage = float(data.get('cashback_percentage', 0))
-        cashback_amount = float(data.get('cashback_amount', 0))
         restaurant_id = data.get('restaurant_id')
-
-        if RedeemedReceipt.objects.filter(receipt_id=receipt_id).exists():
+        if not isinstance(receipt_id, str) or not receipt_id:
             return Response({
                 "success": False,
-                "error_code": "RECEIPT_ALREADY_REDEEMED",
-                "message": "This receipt has already been used for cashback."
-            }, status=409)
+                "error_code": "INVALID_DATA",
+                "message": "receipt_id is required."
+            }, status=400)
+        try:
+            total_paid = to_amount(data.get('total_paid', 0))
+            cashback_amount = to_amount(data.get('cashback_amount', 0))
+        except ValueError:
+            return Response({
+                "success": False,
+                "error_code": "INVALID_DATA",
+                "message": "total_paid and cashback_amount must be numbers."
+            }, status=400)
+        if cashback_amount <= 0:
+            return Response({
+                "success": False,
+                "error_code": "INVALID_DATA",
+                "message": "cashback_amount must be positive."
+            }, status=400)
 
         try:
             restaurant = Restaurant.objects.get(id=restaurant_id)
         except Restaurant.DoesNotExist:
+            # A replayed receipt is still reported as such first
+            if RedeemedReceipt.objects.filter(receipt_id=receipt_id).exists():
+                return Response({
+                    "success": False,
+                    "error_code": "RECEIPT_ALREADY_REDEEMED",
+                    "message": "This receipt has already been used for cashback."
+                }, status=409)
             return Response({
                 "success": False,
                 "error_code": "RESTAURANT_NOT_FOUND",
@@ -225,25 +665,28 @@ class WalletAddView(UserLanguageMixin, APIView):
             }, status=422)
 
         with transaction.atomic():
-            user = CustomUser.objects.select_for_update().get(id=request.user.id)
-            RedeemedReceipt.objects.create(
+            claimed = claim_receipt(RedeemedReceipt(
                 receipt_id=receipt_id,
                 receipt_number=receipt_id.split('_')[-1] if '_' in receipt_id else receipt_id,
-                user=user,
+                user=request.user,
                 restaurant=restaurant,
                 total_paid=total_paid,
                 cashback_amount=cashback_amount
-            )
+            ))
+            if not claimed:
+                # Nothing was written yet
+                return Response({
+                    "success": False,
+                    "error_code": "RECEIPT_ALREADY_REDEEMED",
+                    "message": "This receipt has already been used for cashback."
+                }, status=409)
 
-            balance_before = user.wallet_balance
-            balance_after = float(balance_before) + cashback_amount
-            user.wallet_balance = balance_after
-            user.save()
+            balance_before, balance_after = credit_wallet(request.user.id, cashback_amount)
 
             txn_id = f"txn_{uuid.uuid4().hex[:10]}"
             WalletTransaction.objects.create(
                 transaction_id=txn_id,
-                user=user,
+                user=request.user,
                 type='cashback_add',
                 amount=cashback_amount,
                 balance_before=balance_before,
@@ -266,47 +709,73 @@ class WalletTransferView(UserLanguageMixin, APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
-        amount = float(request.data.get('amount', 0))
         card_last_four = request.data.get('card_last_four')
+        try:
+            amount = to_amount(request.data.get('amount', 0))
+        except ValueError:
+            return Response({
+                "success": False,
+                "error_code": "INVALID_DATA",
+                "message": "amount must be a number."
+            }, status=400)
 
-        with transaction.atomic():
-            user = CustomUser.objects.select_for_update().get(id=request.user.id)
-            balance_before = float(user.wallet_balance)
-
-            if balance_before < amount or amount <= 0:
-                return Response({
-                    "success": False,
-                    "error_code": "INSUFFICIENT_BALANCE",
-                    "message": "Not enough balance to transfer."
-                }, status=400)
-
-            balance_after = balance_before - amount
-            user.wallet_balance = balance_after
-            user.save()
-
-            txn_id = f"txn_{uuid.uuid4().hex[:10]}"
-            WalletTransaction.objects.create(
-                transaction_id=txn_id,
-                user=user,
-                type='transfer_out',
-                amount=amount,
-                balance_before=balance_before,
-                balance_after=balance_after,
-                card_last_four=card_last_four
-            )
+        try:
+            if amount <= 0:
+                raise InsufficientBalanceError()
+            with transaction.atomic():
+                balance_before, balance_after = debit_wallet(request.user.id, amount)
+
+                txn_id = f"txn_{uuid.uuid4().hex[:10]}"
+                WalletTransaction.objects.create(
+                    transaction_id=txn_id,
+                    user=request.user,
+                    type='transfer_out',
+                    amount=amount,
+                    balance_before=balance_before,
+                    balance_after=balance_after,
+                    card_last_four=card_last_four
+                )
+        except InsufficientBalanceError:
+            return Response({
+                "success": False,
+                "error_code": "INSUFFICIENT_BALANCE",
+                "message": "Not enough balance to transfer."
+            }, status=400)
 
         return Response({
             "success": True,
             "data": {
                 "transaction_id": txn_id,
-                "transferred_amount": amount,
+                "transferred_amount": float(amount),
                 "new_balance": float(balance_after),
                 "card_last_four": card_last_four,
                 "estimated_arrival": (timezone.now() + timezone.timedelta(days=1)).isoformat()
             }
         })
 
+def request_flag(request, name):
+    """Whether a boolean body field like `refresh` or `async` is set."""
+    return str(request.data.get(name, 'false')).lower() in ('true', '1', 'yes')
+
+
+def soliq_unavailable_response(error):
+    return Response({
+        "success": False,
+        "error_code": "SOLIQ_UNAVAILABLE",
+        "message": error.message
+    }, status=503, headers={"Retry-After": str(error.retry_after)})
+
+
 class ReceiptVerifyView(UserLanguageMixin, APIView):
+    """
+    Verifies a receipt with Soliq and credits the cashback.
+    With `async=true` the verification is queued instead: the response is a
+    202 with a job ID to poll at `receipt/verify/<job_id>/`. `refresh=true`
+    bypasses the cached Soliq result for the receipt.
+    With `fast=true` the receipt is read from the QR parameters without
+    contacting Soliq and the cashback is recorded as pending, to be confirmed
+    by `manage.py confirm_pending_receipts`.
+    """
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
@@ -317,104 +786,112 @@ class ReceiptVerifyView(UserLanguageMixin, APIView):
             return Response({"success": False, "error_code": "MISSING_DATA", "message": "qr_code is required"}, status=400)
 
         try:
-            parsed_data = verify_soliq_receipt(qr_code)
-        except SoliqVerificationError as e:
-            return Response({"success": False, "error_code": "INVALID_FORMAT", "message": str(e)}, status=400)
+            ensure_receipt_not_redeemed(qr_code)
+        except ReceiptRedemptionError as e:
+            return Response({"success": False, "error_code": e.error_code, "message": e.message}, status=e.status_code)
 
-        # Extract data from the parsed QR code receipt
-        receipt_id = parsed_data['receipt_id']
-        tin = parsed_data['tin']
-        total_amount = parsed_data['total_amount']
+        if request_flag(request, 'async'):
+            job = ReceiptVerificationJob.objects.create(
+                job_id=f"job_{uuid.uuid4().hex[:12]}",
+                user=request.user,
+                qr_code=qr_code,
+                restaurant_id=req_restaurant_id or None
+            )
+            # Relative to this endpoint, so /v1/ clients get a /v1/ status URL
+            status_url = request.build_absolute_uri(f"{job.job_id}/")
+            return Response({
+                "success": True,
+                "data": {"job_id": job.job_id, "status": job.status, "status_url": status_url}
+            }, status=202, headers={"Location": status_url})
 
-        # If the mobile app provides the restaurant ID they are attempting to scan for,
-        # we strictly match the TIN of that specific restaurant against the TIN on the receipt
-        if req_restaurant_id:
+        parsed_data = None
+        if settings.SOLIQ_FAST_PATH_ENABLED and request_flag(request, 'fast'):
             try:
-                restaurant = Restaurant.objects.get(id=req_restaurant_id)
-            except Restaurant.DoesNotExist:
-                return Response({
-                    "success": False,
-                    "error_code": "RESTAURANT_NOT_FOUND",
-                    "message": "The requesting restaurant could not be found."
-                }, status=404)
+                parsed_data = receipt_from_qr(qr_code)
+            except SoliqVerificationError:
+                # Not enough in the QR code, verify with Soliq instead
+                pass
+        pending = parsed_data is not None
 
-            # Compare the exact TIN from the QR to the known TIN of the requested restaurant
-            if str(restaurant.tin) != str(tin):
-                return Response({
-                    "success": False,
-                    "error_code": "RESTAURANT_MISMATCH",
-                    "message": "This receipt's tax identification number (TIN) does not match the chosen restaurant."
-                }, status=422)
-                
-        else:
-            # Fallback if the mobile app didn't send a specific restaurant ID,
-            # we try to see if ANY registered restaurant matches this TIN.
+        if not pending:
             try:
-                restaurant = Restaurant.objects.get(tin=tin)
-            except Restaurant.DoesNotExist:
-                return Response({
-                    "success": False,
-                    "error_code": "RESTAURANT_MISMATCH",
-                    "message": "This receipt does not belong to any registered restaurant."
-                }, status=422)
+                with archiving_receipt_pages():
+                    parsed_data = verify_soliq_receipt(qr_code, refresh=request_flag(request, 'refresh'))
+            except SoliqUnavailableError as e:
+                return soliq_unavailable_response(e)
+            except SoliqVerificationError as e:
+                return Response({"success": False, "error_code": "INVALID_FORMAT", "message": str(e)}, status=400)
 
-        already_redeemed = RedeemedReceipt.objects.filter(receipt_id=receipt_id).exists()
+        try:
+            data = redeem_receipt(request.user, parsed_data, req_restaurant_id, pending=pending)
+        except ReceiptRedemptionError as e:
+            return Response({"success": False, "error_code": e.error_code, "message": e.message}, status=e.status_code)
 
-        if already_redeemed:
-            return Response({
-                "success": False,
-                "error_code": "RECEIPT_ALREADY_REDEEMED",
-                "message": "This receipt has already been redeemed."
-            }, status=409)
+        return Response({"success": True, "data": data})
 
-        cashback_earned = (float(total_amount) * float(restaurant.cashback_percentage)) / 100.0
 
-        with transaction.atomic():
-            user = CustomUser.objects.select_for_update().get(id=request.user.id)
-            
-            RedeemedReceipt.objects.create(
-                receipt_id=receipt_id,
-                receipt_number=parsed_data['receipt_number'],
-                user=user,
-                restaurant=restaurant,
-                total_paid=total_amount,
-                cashback_amount=cashback_earned
-            )
+class ReceiptVerifyBatchView(UserLanguageMixin, APIView):
+    """
+    Verifies several receipts in one request. The Soliq pages are fetched
+    concurrently and every cashback is credited under one lock of the
+    wallet; `data.results` has one entry per QR code, in request order.
+    """
+    permission_classes = [IsAuthenticated]
 
-            balance_before = user.wallet_balance
-            balance_after = float(balance_before) + cashback_earned
-            user.wallet_balance = balance_after
-            user.save()
+    def post(self, request):
+        qr_codes = request.data.get('qr_codes')
+        req_restaurant_id = request.data.get('restaurant_id')
 
-            txn_id = f"txn_{uuid.uuid4().hex[:10]}"
-            WalletTransaction.objects.create(
-                transaction_id=txn_id,
-                user=user,
-                type='cashback_add',
-                amount=cashback_earned,
-                balance_before=balance_before,
-                balance_after=balance_after,
-                receipt_id=receipt_id,
-                restaurant_id=restaurant.id
-            )
+        if not isinstance(qr_codes, list) or not qr_codes or not all(isinstance(qr, str) and qr for qr in qr_codes):
+            return Response({
+                "success": False,
+                "error_code": "MISSING_DATA",
+                "message": "qr_codes must be a non-empty list of QR code URLs"
+            }, status=400)
+        if len(qr_codes) > settings.SOLIQ_BATCH_MAX_RECEIPTS:
+            return Response({
+                "success": False,
+                "error_code": "TOO_MANY_RECEIPTS",
+                "message": f"At most {settings.SOLIQ_BATCH_MAX_RECEIPTS} receipts can be verified at once."
+            }, status=400)
 
+        with archiving_receipt_pages():
+            verified = verify_receipts_concurrently(qr_codes, refresh=request_flag(request, 'refresh'))
+        results = redeem_receipts(request.user, verified, req_restaurant_id)
+
+        redeemed = [result['data'] for result in results if result['success']]
+        request.user.refresh_from_db(fields=['wallet_balance'])
         return Response({
             "success": True,
             "data": {
-                "receipt_id": receipt_id,
-                "receipt_number": parsed_data['receipt_number'],
-                "total_amount": float(total_amount),
-                "restaurant_name": restaurant.name,
-                "created_at": parsed_data['created_at'],
-                "tin": tin,
-                "already_redeemed": False,
-                "total_paid": float(total_amount),
-                "cashback_earned": float(cashback_earned),
-                "new_wallet_balance": float(balance_after),
+                "results": [{"qr_code": qr_code, **result} for qr_code, result in zip(qr_codes, results)],
+                "redeemed_count": len(redeemed),
+                "total_cashback_earned": sum(item['cashback_earned'] for item in redeemed),
+                "new_wallet_balance": float(request.user.wallet_balance),
             }
         })
 
 
+class ReceiptVerifyJobView(UserLanguageMixin, APIView):
+    """Status of an async receipt verification; `data.result` is filled once it completes."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, job_id):
+        try:
+            job = ReceiptVerificationJob.objects.get(job_id=job_id, user=request.user)
+        except ReceiptVerificationJob.DoesNotExist:
+            return Response({
+                "success": False,
+                "error_code": "JOB_NOT_FOUND",
+                "message": "Receipt verification job not found."
+            }, status=404)
+
+        data = {"job_id": job.job_id, "status": job.status, "result": job.result}
+        if job.status == 'failed':
+            data.update({"error_code": job.error_code, "message": job.message, "http_status": job.http_status})
+        return Response({"success": True, "data": data})
+
+
 class ReceiptScrapeView(UserLanguageMixin, APIView):
     """
     A standalone endpoint specifically for scraping data from a Soliq QR code URL.
@@ -433,7 +910,8 @@ class ReceiptScrapeView(UserLanguageMixin, APIView):
             }, status=400)
 
         try:
-            parsed_data = verify_soliq_receipt(qr_code)
+            with archiving_receipt_pages():
+                parsed_data = verify_soliq_receipt(qr_code, refresh=request_flag(request, 'refresh'))
             return Response({
                 "success": True,
                 "data": {
@@ -443,6 +921,8 @@ class ReceiptScrapeView(UserLanguageMixin, APIView):
                     "created_at": parsed_data['created_at']
                 }
             })
+        except SoliqUnavailableError as e:
+            return soliq_unavailable_response(e)
         except SoliqVerificationError as e:
             return Response({
                 "success": False, 
@@ -525,12 +1005,12 @@ class UserCardUpdateView(UserLanguageMixin, APIView):
                 "message": str(e)
             }, status=400)
 
-class LikedRestaurantListView(UserLanguageMixin, generics.ListAPIView):
+class LikedRestaurantListView(UserLanguageMixin, RestaurantCatalogMixin, generics.ListAPIView):
     serializer_class = RestaurantSerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return self.request.user.liked_restaurants.all()
+        return self.get_catalog_queryset().filter(liked_by=self.request.user)
 
     def list(self, request, *args, **kwargs):
         queryset = self.filter_queryset(self.get_queryset())
@@ -616,13 +1096,17 @@ class RestaurantRateView(UserLanguageMixin, APIView):
         if serializer.is_valid():
             rating = serializer.validated_data['rating']
             
-            # Update or create the review for this specific user and restaurant
+            # Update or create the review for this specific user and restaurant.
+            # The rating aggregates are refreshed in the same transaction by the
+            # Review post_save signal.
             from .models import Review
-            review, created = Review.objects.update_or_create(
-                user=request.user,
-                restaurant=restaurant,
-                defaults={'rating': rating}
-            )
+            with transaction.atomic():
+                review, created = Review.objects.update_or_create(
+                    user=request.user,
+                    restaurant=restaurant,
+                    defaults={'rating': rating}
+                )
+                restaurant.refresh_from_db(fields=['rating_sum', 'rating_count'])
             
             return Response({
                 "success": True,
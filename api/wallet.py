@@ -0,0 +1,114 @@
+"""
+Wallet balance changes as single conditional UPDATEs of the user row.
+
+The row is locked only for the duration of the UPDATE and the rest of the
+caller's transaction, and only the balance columns are written, instead of
+locking the user with SELECT ... FOR UPDATE and saving every column. Amounts
+are Decimals rounded to the cent. Call these inside the transaction that
+writes the matching WalletTransaction, so the ledger and the balance commit
+together.
+"""
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+
+from django.db import connection
+
+from .models import CustomUser
+
+CENT = Decimal('0.01')
+# The largest value the max_digits=12, decimal_places=2 amount columns hold
+MAX_AMOUNT = Decimal('9999999999.99')
+
+
+class InsufficientBalanceError(Exception):
+    pass
+
+
+def to_amount(value):
+    """
+    `value` as a Decimal rounded to the cent. Raises ValueError when it isn't
+    a finite number the amount columns can hold.
+    """
+    try:
+        amount = Decimal(str(value))
+        if amount.is_finite():
+            # Signals InvalidOperation past the context's precision
+            amount = amount.quantize(CENT, rounding=ROUND_HALF_UP)
+    except InvalidOperation:
+        raise ValueError(f"Invalid amount: {value!r}")
+    if not amount.is_finite() or abs(amount) > MAX_AMOUNT:
+        raise ValueError(f"Invalid amount: {value!r}")
+    return amount
+
+
+def credit_wallet(user_id, amount, counter='total_earned'):
+    """
+    Adds `amount` to the balance and to the `counter` total of the user.
+    Raises ValueError unless `amount` is positive.
+    Returns `(balance_before, balance_after)` for the ledger row.
+    """
+    amount = _positive_amount(amount)
+    return _change_balance(user_id, amount, counter, amount)
+
+
+def debit_wallet(user_id, amount, counter='total_transferred'):
+    """
+    Takes `amount` from the balance and adds it to the `counter` total of
+    the user. Raises InsufficientBalanceError, leaving the wallet untouched,
+    when the balance doesn't cover it, and ValueError unless `amount` is
+    positive.
+    Returns `(balance_before, balance_after)` for the ledger row.
+    """
+    amount = _positive_amount(amount)
+    result = _change_balance(user_id, -amount, counter, amount, minimum=amount)
+    if result is None:
+        raise InsufficientBalanceError(f"Balance of user {user_id} is below {amount}")
+    return result
+
+
+def wallet_balance(user_id):
+    return to_amount(CustomUser.objects.values_list('wallet_balance', flat=True).get(pk=user_id))
+
+
+def _positive_amount(value):
+    amount = to_amount(value)
+    if amount <= 0:
+        raise ValueError(f"Amount must be positive: {value!r}")
+    return amount
+
+
+def _change_balance(user_id, delta, counter, counter_delta, minimum=None):
+    qn = connection.ops.quote_name
+    balance, counter = qn('wallet_balance'), qn(counter)
+    sql = (
+        f"UPDATE {qn(CustomUser._meta.db_table)} "
+        f"SET {balance} = {balance} + %s, {counter} = {counter} + %s "
+        f"WHERE {qn(CustomUser._meta.pk.column)} = %s"
+    )
+    params = [delta, counter_delta, user_id]
+    if minimum is not None:
+        # The guard is evaluated on the locked row, so concurrent debits
+        # can't both pass it
+        sql += f" AND {balance} >= %s"
+        params.append(minimum)
+
+    with connection.cursor() as cursor:
+        if _can_return_from_update():
+            cursor.execute(f"{sql} RETURNING {balance}", params)
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            balance_after = to_amount(row[0])
+        else:
+            cursor.execute(sql, params)
+            if cursor.rowcount == 0:
+                return None
+            # The row stays locked by the UPDATE until the transaction ends
+            balance_after = wallet_balance(user_id)
+    return balance_after - delta, balance_after
+
+
+def _can_return_from_update():
+    # UPDATE ... RETURNING is PostgreSQL and SQLite 3.35+ syntax
+    return connection.vendor == 'postgresql' or (
+        connection.vendor == 'sqlite' and connection.features.can_return_columns_from_insert
+    )
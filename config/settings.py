@@ -191,3 +191,67 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(days=30),
     'AUTH_HEADER_TYPES': ('Bearer',),
 }
+
+# Cache
+# The Soliq circuit breaker, the single-flight receipt fetch locks and the
+# catalog version counter must be shared by every gunicorn worker, so deployed
+# instances default to the database cache, whose table `migrate` creates. Point
+# CACHE_BACKEND/CACHE_LOCATION at redis or memcached to move it off the
+# database. Local development keeps a per-process local memory cache.
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache' if DEBUG else 'django.core.cache.backends.db.DatabaseCache'
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'marsilino' if DEBUG else 'marsilino_cache'),
+    }
+}
+
+# Seconds a cached restaurant/tag catalog response is served before it is rebuilt.
+# Catalog changes invalidate it earlier through the catalog version counter.
+CATALOG_CACHE_TIMEOUT = int(os.environ.get('CATALOG_CACHE_TIMEOUT', 300))
+
+# Render the restaurant, tag and wallet transaction lists with the values()-based
+# serializers in api/fast_serializers.py instead of DRF ModelSerializers.
+API_FAST_SERIALIZATION = os.environ.get('API_FAST_SERIALIZATION', 'True') == 'True'
+
+# Soliq receipt verification (api/services.py)
+# Connections are pooled per worker process; timeouts are (connect, read) seconds.
+SOLIQ_POOL_SIZE = int(os.environ.get('SOLIQ_POOL_SIZE', 10))
+SOLIQ_CONNECT_TIMEOUT = float(os.environ.get('SOLIQ_CONNECT_TIMEOUT', 3.05))
+SOLIQ_READ_TIMEOUT = float(os.environ.get('SOLIQ_READ_TIMEOUT', 10))
+# Retries after connection failures and 5xx responses, backing off
+# SOLIQ_BACKOFF_FACTOR * 2**n seconds (jittered) between attempts.
+SOLIQ_MAX_RETRIES = int(os.environ.get('SOLIQ_MAX_RETRIES', 2))
+SOLIQ_BACKOFF_FACTOR = float(os.environ.get('SOLIQ_BACKOFF_FACTOR', 0.3))
+# Parsed receipts are cached per QR `r`/`c` so the scrape and verify endpoints
+# share one Soliq fetch; failures are cached briefly to absorb retries.
+SOLIQ_RECEIPT_CACHE_TIMEOUT = int(os.environ.get('SOLIQ_RECEIPT_CACHE_TIMEOUT', 600))
+SOLIQ_RECEIPT_NEGATIVE_CACHE_TIMEOUT = int(os.environ.get('SOLIQ_RECEIPT_NEGATIVE_CACHE_TIMEOUT', 30))
+# `POST receipt/verify/batch/`: most receipts per request, and concurrent Soliq fetches per request
+SOLIQ_BATCH_MAX_RECEIPTS = int(os.environ.get('SOLIQ_BATCH_MAX_RECEIPTS', 20))
+SOLIQ_BATCH_WORKERS = int(os.environ.get('SOLIQ_BATCH_WORKERS', 8))
+# Circuit breaker around Soliq fetches, shared by all workers through the cache.
+# Within a window of SOLIQ_BREAKER_WINDOW seconds and at least
+# SOLIQ_BREAKER_MIN_CALLS fetches, the circuit opens when the share of failed
+# or slow fetches reaches its rate; it stays open SOLIQ_BREAKER_OPEN_SECONDS
+# before a single probe fetch is let through.
+SOLIQ_BREAKER_ENABLED = os.environ.get('SOLIQ_BREAKER_ENABLED', 'True') == 'True'
+SOLIQ_BREAKER_FAILURE_RATE = float(os.environ.get('SOLIQ_BREAKER_FAILURE_RATE', 0.5))
+SOLIQ_BREAKER_SLOW_CALL_SECONDS = float(os.environ.get('SOLIQ_BREAKER_SLOW_CALL_SECONDS', 8))
+SOLIQ_BREAKER_SLOW_CALL_RATE = float(os.environ.get('SOLIQ_BREAKER_SLOW_CALL_RATE', 0.8))
+SOLIQ_BREAKER_MIN_CALLS = int(os.environ.get('SOLIQ_BREAKER_MIN_CALLS', 10))
+SOLIQ_BREAKER_WINDOW = int(os.environ.get('SOLIQ_BREAKER_WINDOW', 60))
+SOLIQ_BREAKER_OPEN_SECONDS = int(os.environ.get('SOLIQ_BREAKER_OPEN_SECONDS', 30))
+# Concurrent verifications of one receipt share a single fetch; the others wait
+# at most this many seconds for it, and never less than the worst-case fetch
+# with all retries (see `services.soliq_fetch_budget`).
+SOLIQ_SINGLE_FLIGHT_TIMEOUT = float(os.environ.get('SOLIQ_SINGLE_FLIGHT_TIMEOUT', 30))
+# Every fetched Soliq page is stored zlib-compressed in ReceiptPageArchive for
+# offline re-parsing (`manage.py reparse_receipt_archive`).
+SOLIQ_ARCHIVE_ENABLED = os.environ.get('SOLIQ_ARCHIVE_ENABLED', 'True') == 'True'
+SOLIQ_ARCHIVE_COMPRESSION_LEVEL = int(os.environ.get('SOLIQ_ARCHIVE_COMPRESSION_LEVEL', 6))
+# `fast=true` on receipt/verify/ credits a pending cashback from the QR
+# parameters; `manage.py confirm_pending_receipts` settles it against Soliq.
+SOLIQ_FAST_PATH_ENABLED = os.environ.get('SOLIQ_FAST_PATH_ENABLED', 'True') == 'True'